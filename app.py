@@ -1,10 +1,24 @@
-from flask import Flask, render_template, jsonify, Response
-import cv2
-import torch
-from gtts import gTTS
-import os
-import platform
+from flask import Flask, render_template, jsonify, Response, request
 import threading
+import json
+import os
+from pipeline import NavigationPipeline, DetectionBoard
+from motion_gate import MotionGatedDetector
+from video_hub import FrameHub
+from model_registry import LazyModule, class_names, warm_up
+from detections import CORRIDOR, corridor_roi
+from inference_size import RoiDetector, InferenceSizePolicy
+from phrase_cache import play_phrase, prewarm_in_background
+from metrics import metrics
+from session_recorder import recorder_from_env
+from session_manager import SessionManager, AdmissionError, checked_source
+from frame_governor import FrameGovernor, device_hints
+from audio_cues import get_engine as audio_cues
+from distance import estimator as distance_estimator
+from free_path import FreePathGatedDetector
+
+# Heavy modules are imported on first use so the server can answer right away
+cv2 = LazyModule("cv2")
 
 app = Flask(__name__)
 
@@ -12,98 +26,149 @@ app = Flask(__name__)
 camera_running = False
 cap = None
 show_camera = False
-
-# Load YOLOv5 model
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s')
-
-# Function to generate a beep sound
-def beep():
-    system_platform = platform.system()
-    if system_platform == "Windows":
-        import winsound
-        winsound.Beep(1000, 500)  # Frequency: 1000Hz, Duration: 500ms
-    else:
-        os.system('echo -e "\a"')  # Linux/Mac
+pipeline = None
+path_gate = None
+path_blocked_announced = False  # An unnamed obstacle is announced once per blockage
+
+# Detect on the walking corridor at native resolution, within this latency budget per inference
+INFERENCE_BUDGET_MS = 80
+path_detector = RoiDetector(roi=CORRIDOR, policy=InferenceSizePolicy(budget_ms=INFERENCE_BUDGET_MS))
+
+# Streams for other users (local devices, video files, RTSP sources). Each session has its
+# own pipeline, detection board and video hub, so sessions never touch each other's state.
+# Our own detector runs go through it too, so admission control counts them
+sessions = SessionManager(inference_budget_ms=INFERENCE_BUDGET_MS)
+
+# Set INFERENCE_WORKERS=N to run the detector in N worker processes (see inference_pool), so
+# the navigation pipeline and the sessions infer in parallel instead of taking turns
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", "0"))
+inference_pool = None
+
+def start_inference_pool(workers):
+    # Workers load the model in the background; the first detection waits until they are ready
+    global inference_pool
+    from inference_pool import InferencePool
+    inference_pool = InferencePool(workers=workers)
+    path_detector.model = inference_pool
+    sessions.use_model(inference_pool, parallel=workers)
+
+# The YOLOv5 model is shared between modules and loaded on first use (see model_registry)
+
+# The sentences we say most, synthesized in the background at startup so they play instantly
+PREWARM_PHRASES = ["There is a {} in front of you.", "I don't see any object.", "Something is blocking your path."]
+
+# Function to play a beep, panned towards the closest object and faster the closer it is
+def beep(detections=None, frame_shape=None):
+    if detections is None or not len(detections):
+        audio_cues().play("alert")
+        return
+    distances = distance_estimator(detections, frame_shape)
+    if not audio_cues().cue_closest(distances, distance_estimator.bearings(detections.boxes, frame_shape)):
+        audio_cues().play("alert")  # None of them could be placed on the ground
 
 # Function to speak object names (cross-platform)
 def speak(text):
     try:
-        if os.path.exists("object.mp3"):
-            os.remove("object.mp3")
-
-        tts = gTTS(text=text, lang='en')
-        tts.save("object.mp3")
-
-        if platform.system() == "Windows":
-            from playsound import playsound
-            playsound("object.mp3")
-        else:
-            os.system("mpg321 object.mp3")
-
-        if os.path.exists("object.mp3"):
-            os.remove("object.mp3")
+        # Repeated phrases are served from the phrase cache, no synthesis or temp file
+        if not play_phrase(text):
+            print(f"Could not speak: {text}")
     except Exception as e:
         print(f"Error in speak(): {str(e)}")
 
+# Function to detect all objects in the defined path
+def detect_in_path(frame):
+    # Perform object detection on the path region (middle 20% width and 80% height of the
+    # frame), cropped at native resolution; boxes come back in full-frame coordinates
+    detections = sessions.run_shared(path_detector, frame).with_confidence(0.5)  # Confidence threshold
+
+    if detections:
+        print("Detected: " + ", ".join(f"{label} (Confidence: {conf:.2f})"
+                                       for label, conf in zip(detections.labels, detections.confidences)))
+    return detections
+
 # Function to identify all objects in the defined path
 def identify_object_in_path(frame):
     try:
-        # Define the path (middle 20% width and 80% height of the frame)
-        height, width, _ = frame.shape
-        path_x1 = int(width * 0.4)  # 20% from left
-        path_x2 = int(width * 0.6)  # 20% from right
-        path_y1 = int(height * 0.1)  # 10% from top
-        path_y2 = int(height * 0.9)  # 10% from bottom
-
-        # Draw the path on the frame
-        cv2.rectangle(frame, (path_x1, path_y1), (path_x2, path_y2), (0, 255, 0), 2)
+        return detect_in_path(frame).labels
+    except Exception as e:
+        print(f"Error in identify_object_in_path(): {str(e)}")
+        return None
 
-        # Crop the frame to the path region
-        path_frame = frame[path_y1:path_y2, path_x1:path_x2]
+# Draw the path on the frame
+def draw_path(frame):
+    path_x1, path_y1, path_x2, path_y2 = corridor_roi(frame.shape)
+    cv2.rectangle(frame, (path_x1, path_y1), (path_x2, path_y2), (0, 255, 0), 2)
 
-        # Perform object detection on the path region
-        results = model(path_frame)
-        detections = results.xyxy[0].numpy()
+# The navigation engine publishes every detection result here; readers never touch the camera
+detection_board = DetectionBoard()
 
-        detected_objects = []
+# Every /video_feed client is served from this hub: one overlay and one JPEG encode per frame
+video_hub = FrameHub(overlay=draw_path)
+metrics.gauge("video_viewers", lambda: video_hub.subscribers)
 
-        for detection in detections:
-            x1, y1, x2, y2, conf, cls = detection
-            if conf > 0.5:  # Confidence threshold
-                label = model.names[int(cls)]
-                detected_objects.append(label)
-                print(f"Detected: {label} (Confidence: {conf:.2f})")
+# Infer at a rate set by the hazard level: slow in an empty corridor, fast when something is close
+governor = FrameGovernor(hints=device_hints)
 
-        return detected_objects
-    except Exception as e:
-        print(f"Error in identify_object_in_path(): {str(e)}")
-        return None
+# Capture stage: open the shared camera
+def open_camera():
+    global cap
+    cap = cv2.VideoCapture(0)
+    return cap
+
+# Feedback stage: beep and speak if objects are detected
+def announce_objects(packet):
+    global path_blocked_announced
+    detected_objects = packet.detections.labels
+    # Judged from the path state of this packet's frame, not the newest capture
+    unnamed = path_gate is not None and path_gate.unnamed_obstacle(packet.detections,
+                                                                   getattr(packet, "path_state", None))
+    if detected_objects:
+        beep(packet.detections, packet.frame.shape)
+        speak(f"There is a {', '.join(detected_objects)} in front of you.")
+    elif unnamed and not path_blocked_announced:
+        # The free-path check sees something the detector has no class for
+        beep()
+        speak("Something is blocking your path.")
+    path_blocked_announced = unnamed and (path_blocked_announced or not detected_objects)
+
+# Show the camera feed if enabled
+def show_frame(packet):
+    if show_camera:
+        frame = packet.frame.copy()
+        draw_path(frame)
+        cv2.imshow("Camera Feed", frame)
+        cv2.waitKey(1)
+
+# Build the navigation engine; benchmarks/replay_pipeline.py replays recordings through it too
+def build_pipeline(open_capture=open_camera, recorder=None, governor=None):
+    global path_gate, path_blocked_announced
+    path_blocked_announced = False
+    # Capture, detection and speech run on separate threads so speech never holds the camera
+    # Reuse the last result while the scene is static instead of re-running the detector
+    gated = MotionGatedDetector(detect_in_path)
+    # Check the corridor for free space on every frame; the detector only runs to name what blocks it
+    path_gate = FreePathGatedDetector(gated)
+    return NavigationPipeline(open_capture, path_gate, announce_objects, display=show_frame,
+                              on_capture=on_frame, board=detection_board, describe=path_gate.describe,
+                              recorder=recorder, governor=governor)
 
 # Function to run navigation system
 def run_navigation():
-    global camera_running, cap, show_camera
-    cap = cv2.VideoCapture(0)
-    while camera_running:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Identify objects in the path
-        detected_objects = identify_object_in_path(frame)
-
-        # Trigger beep and speak if objects are detected
-        if detected_objects:
-            beep()
-            speak(f"There is a {', '.join(detected_objects)} in front of you.")
-
-        # Show the camera feed if enabled
-        if show_camera:
-            cv2.imshow("Camera Feed", frame)
-            cv2.waitKey(1)
-
-    if cap:
-        cap.release()
+    global camera_running, pipeline
+    # Set NAV_RECORD_DIR to record the session for replay (NAV_RECORD_MAX_MB for a rolling buffer)
+    recorder = recorder_from_env()
+    pipeline = build_pipeline(recorder=recorder, governor=governor)
+    pipeline.run()
+    if recorder is not None:
+        recorder.close()
+        print(f"Recorded {recorder.records} frames to {recorder.directory} ({recorder.dropped} dropped)")
+
+    camera_running = False
     cv2.destroyAllWindows()
+    print(pipeline.latency_report())
+    print(f"Motion gate: {path_gate.detect.gate.stats()}")
+    print(f"Free path: {path_gate.stats()}")
+    print(f"Frame governor: {governor.status()}")
     print("Navigation stopped.")
 
 # Route for the home page
@@ -127,6 +192,8 @@ def stop():
     global camera_running
     if camera_running:
         camera_running = False
+        if pipeline:
+            pipeline.stop()
         return "Navigation stopped!"
     return "Navigation is not running!"
 
@@ -137,50 +204,161 @@ def toggle_camera():
     show_camera = not show_camera
     return f"Camera view {'enabled' if show_camera else 'disabled'}."
 
-# Route to identify the object in front
+# Route for Prometheus-style stage timings and counters
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Route to switch instrumentation on or off at runtime
+@app.route('/toggle_metrics')
+def toggle_metrics():
+    return f"Metrics {'enabled' if metrics.toggle() else 'disabled'}."
+
+# Route to inspect the frame governor, e.g. /governor?history=50 for its recent decisions
+@app.route('/governor')
+def governor_status():
+    history = request.args.get('history', 0, type=int)
+    status = governor.status()
+    if history:
+        status["decisions"] = list(governor.decisions)[-history:]
+    return jsonify(status)
+
+# Capture stage hook: serve video and check the corridor on every frame, not only on inferred ones
+def on_frame(packet):
+    video_hub.publish(packet.frame)
+    state = path_gate.observe(packet)
+    if state.blocked:
+        # The closer the blocked part of the corridor, the faster frames go to the detector
+        governor.boost(1.0 - state.clearance)
+
+# Route to inspect the latest free-path check (occupancy grid of the walking corridor)
+@app.route('/free_path')
+def free_path_status():
+    if path_gate is None or path_gate.state is None:
+        return jsonify({"error": "No free-path check yet."})
+    return jsonify(dict(path_gate.state.to_dict(), **path_gate.stats()))
+
+# Route to identify the object in front, answered from the latest detection,
+# e.g. /identify_object?max_age=1.0 to refuse results older than a second
 @app.route('/identify_object')
 def identify_object():
-    global cap
-    if cap is None or not cap.isOpened():
-        return jsonify({"error": "Camera is not running."})
+    return jsonify(identify_from_snapshot(request.args.get('max_age', type=float)))
 
-    ret, frame = cap.read()
-    if not ret:
-        return jsonify({"error": "Failed to capture frame."})
+def identify_from_snapshot(max_age=None):
+    if not camera_running:
+        return {"error": "Camera is not running."}
+
+    snapshot = detection_board.latest(max_age)
+    if snapshot is None:
+        return {"error": "No recent detection available."}
 
-    detected_objects = identify_object_in_path(frame)
+    detected_objects = [obj["label"] for obj in snapshot["objects"]]
     if detected_objects:
-        speak(f"There is a {', '.join(detected_objects)} in front of you.")
-        return jsonify({"objects": detected_objects})
+        text = f"There is a {', '.join(detected_objects)} in front of you."
     else:
-        speak("I don't see any object.")
-        return jsonify({"objects": None})
+        text = "I don't see any object."
+    # Speak in the background so the request returns immediately
+    threading.Thread(target=speak, args=(text,), daemon=True).start()
+    return {"objects": detected_objects or None, "version": snapshot["version"],
+            "timestamp": snapshot["timestamp"], "age": round(snapshot["age"], 3),
+            "detections": snapshot["objects"]}
+
+def snapshot_json(snapshot):
+    # The monotonic capture time only means something inside this process
+    return json.dumps({key: value for key, value in snapshot.items() if key != "captured_at"})
+
+# Route to stream detection results as Server-Sent Events (or ?format=ndjson for chunked JSON lines)
+@app.route('/detections')
+def detections_stream():
+    fmt = request.args.get('format', 'sse')
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/event-stream'
+    return Response(generate_detections(fmt), mimetype=mimetype, headers={'Cache-Control': 'no-cache'})
+
+def generate_detections(fmt='sse', keepalive=15.0, board=None):
+    board = board or detection_board
+    version = 0
+    while True:
+        snapshot = board.wait(version, timeout=keepalive)
+        if snapshot is None:
+            # Keep idle connections open through proxies
+            yield ": keep-alive\n\n" if fmt != 'ndjson' else "\n"
+            continue
+        version = snapshot["version"]
+        payload = snapshot_json(snapshot)
+        if fmt == 'ndjson':
+            yield payload + "\n"
+        else:
+            yield f"id: {version}\nevent: detection\ndata: {payload}\n\n"
 
-# Route to stream camera feed
+# Route to stream camera feed, e.g. /video_feed?quality=60&fps=10
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
-
-def generate_frames():
-    global cap, show_camera
-    while show_camera:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Draw the path on the frame
-        height, width, _ = frame.shape
-        path_x1 = int(width * 0.4)
-        path_x2 = int(width * 0.6)
-        path_y1 = int(height * 0.1)
-        path_y2 = int(height * 0.9)
-        cv2.rectangle(frame, (path_x1, path_y1), (path_x2, path_y2), (0, 255, 0), 2)
-
-        # Encode the frame as JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        frame = buffer.tobytes()
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    quality = request.args.get('quality', type=int)
+    max_fps = request.args.get('fps', type=float)
+    return Response(generate_frames(quality, max_fps), mimetype='multipart/x-mixed-replace; boundary=frame')
+
+def generate_frames(quality=None, max_fps=None):
+    # Frames come from the navigation capture thread; clients never read the camera themselves
+    return video_hub.stream(quality=quality, max_fps=max_fps, active=lambda: show_camera)
+
+# Route to list sessions and the measured inference capacity
+@app.route('/sessions')
+def list_sessions():
+    return jsonify(sessions.status())
+
+# Route to start a session, e.g. /sessions/alice/start?source=rtsp://127.0.0.1:8554/cam&fps=5&priority=0
+@app.route('/sessions/<session_id>/start')
+def start_session(session_id):
+    max_fps = request.args.get('fps', 5.0, type=float)
+    priority = request.args.get('priority', 1, type=int)
+    try:
+        source = checked_source(request.args.get('source', '0'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        session = sessions.start(session_id, source, max_fps, priority, overlay=draw_path)
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 409
+    except AdmissionError as e:
+        return jsonify({"error": str(e), "capacity_fps": round(sessions.capacity_fps, 2)}), 503
+    return jsonify(session.status())
+
+# Route to stop one session
+@app.route('/sessions/<session_id>/stop')
+def stop_session(session_id):
+    try:
+        sessions.stop(session_id)
+    except KeyError as e:
+        return jsonify({"error": e.args[0]}), 404
+    return jsonify({"stopped": session_id})
+
+# Route to stream one session's detections (same formats as /detections)
+@app.route('/sessions/<session_id>/detections')
+def session_detections(session_id):
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": f"No session {session_id}"}), 404
+    fmt = request.args.get('format', 'sse')
+    mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'text/event-stream'
+    return Response(generate_detections(fmt, board=session.board), mimetype=mimetype,
+                    headers={'Cache-Control': 'no-cache'})
+
+# Route to stream one session's video (same parameters as /video_feed)
+@app.route('/sessions/<session_id>/video_feed')
+def session_video_feed(session_id):
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": f"No session {session_id}"}), 404
+    frames = session.hub.stream(quality=request.args.get('quality', type=int),
+                                max_fps=request.args.get('fps', type=float), active=lambda: session.running)
+    return Response(frames, mimetype='multipart/x-mixed-replace; boundary=frame')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    if INFERENCE_WORKERS > 0:
+        start_inference_pool(INFERENCE_WORKERS)
+    else:
+        # Load the model and run one inference in the background while the server starts
+        warm_up()
+    prewarm_in_background(PREWARM_PHRASES, class_names())
+    # The reloader would run this module a second time, with a second worker pool and warm-up
+    app.run(debug=True, use_reloader=False)
\ No newline at end of file
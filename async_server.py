@@ -0,0 +1,294 @@
+"""
+Asyncio (aiohttp) server mode for app.py.
+
+Serves the same routes as the Flask app (`/start`, `/stop`, `/toggle_camera`, `/metrics`,
+`/identify_object`, `/video_feed`, `/detections`) plus a `/ws` WebSocket for
+control commands and detection telemetry. Viewers are coroutines, not
+threads, so hundreds of idle connections cost almost nothing; capture and
+inference keep running on the navigation pipeline's own threads, and the
+remaining blocking work (JPEG encoding, speech) goes to an executor.
+
+    python async_server.py --host 0.0.0.0 --port 5000
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import threading
+
+from aiohttp import web, WSMsgType
+
+import app as nav
+from metrics import metrics
+from model_registry import warm_up
+
+TEMPLATE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "index.html")
+BOUNDARY = "frame"
+
+
+class VersionSignal:
+    """
+    Bridge a blocking "wait for the next version" call into asyncio.
+
+    One background thread blocks in `wait_next(after, timeout)` and wakes every
+    waiting coroutine on the event loop when the version changes, so any number
+    of async clients share a single waiting thread.
+    """
+
+    def __init__(self, loop, wait_next, name):
+        self.loop = loop
+        self.wait_next = wait_next
+        self.version = 0
+        self._event = asyncio.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            version = self.wait_next(self.version, 1.0)
+            if version is not None and version > self.version:
+                self.loop.call_soon_threadsafe(self._publish, version)
+
+    def _publish(self, version):
+        self.version = version
+        event, self._event = self._event, asyncio.Event()
+        event.set()
+
+    async def wait(self, after_version, timeout=None):
+        """Return the latest version once it is newer than `after_version` (or on timeout)."""
+        if self.version > after_version:
+            return self.version
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.version
+
+    def stop(self):
+        self._stop.set()
+
+
+def _board_version(after, timeout):
+    snapshot = nav.detection_board.wait(after, timeout)
+    return snapshot["version"] if snapshot else None
+
+
+async def on_startup(application):
+    loop = asyncio.get_running_loop()
+    application["frames"] = VersionSignal(loop, nav.video_hub.wait_for, "async-frames")
+    application["detections"] = VersionSignal(loop, _board_version, "async-detections")
+
+
+async def on_cleanup(application):
+    application["frames"].stop()
+    application["detections"].stop()
+    nav.stop()
+
+
+async def home(request):
+    if os.path.exists(TEMPLATE_PATH):
+        return web.FileResponse(TEMPLATE_PATH)
+    raise web.HTTPNotFound()
+
+
+async def start(request):
+    return web.Response(text=nav.start())
+
+
+async def stop(request):
+    return web.Response(text=nav.stop())
+
+
+async def toggle_camera(request):
+    return web.Response(text=nav.toggle_camera())
+
+
+async def metrics_endpoint(request):
+    return web.Response(text=metrics.render_prometheus(), headers={"Content-Type": "text/plain; version=0.0.4"})
+
+
+async def toggle_metrics(request):
+    return web.Response(text=nav.toggle_metrics())
+
+
+def parse_max_age(value):
+    """A client's `max_age` in seconds, or None if it sent none. Raises ValueError if it is not a number >= 0."""
+    if value is None or value == "":
+        return None
+    try:
+        max_age = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"max_age must be a number of seconds, not {value!r}") from None
+    if not math.isfinite(max_age) or max_age < 0:
+        raise ValueError(f"max_age must be a number of seconds, not {value!r}")
+    return max_age
+
+
+async def identify_object(request):
+    try:
+        max_age = parse_max_age(request.query.get("max_age"))
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+    return web.json_response(nav.identify_from_snapshot(max_age))
+
+
+async def video_feed(request):
+    quality = int(request.query["quality"]) if "quality" in request.query else None
+    max_fps = float(request.query["fps"]) if "fps" in request.query else None
+    interval = 1.0 / max_fps if max_fps else 0.0
+
+    response = web.StreamResponse(headers={"Content-Type": f"multipart/x-mixed-replace; boundary={BOUNDARY}"})
+    await response.prepare(request)
+    request.app["viewers"] += 1
+    try:
+        await _stream_frames(response, request.app["frames"], quality, interval)
+    finally:
+        request.app["viewers"] -= 1
+    return response
+
+
+async def _stream_frames(response, frames, quality, interval):
+    loop = asyncio.get_running_loop()
+    last_seq = 0
+    while nav.show_camera:
+        if await frames.wait(last_seq, timeout=1.0) <= last_seq:
+            continue
+        # Reuse the shared encode when another client already paid for it
+        encoded = nav.video_hub.peek_jpeg(quality) or await loop.run_in_executor(None, nav.video_hub.get_jpeg, quality)
+        seq, jpeg = encoded
+        if jpeg is None:
+            continue
+        last_seq = seq
+        try:
+            await response.write(b"--" + BOUNDARY.encode() + b"\r\nContent-Type: image/jpeg\r\n\r\n" + jpeg + b"\r\n")
+        except ConnectionResetError:
+            break
+        if interval:
+            await asyncio.sleep(interval)
+
+
+async def detections_stream(request):
+    ndjson = request.query.get("format") == "ndjson"
+    signal = request.app["detections"]
+    response = web.StreamResponse(headers={
+        "Content-Type": "application/x-ndjson" if ndjson else "text/event-stream",
+        "Cache-Control": "no-cache",
+    })
+    await response.prepare(request)
+    version = 0
+    try:
+        while True:
+            latest = await signal.wait(version, timeout=15.0)
+            snapshot = nav.detection_board.latest() if latest > version else None
+            if snapshot is None:
+                await response.write(b"\n" if ndjson else b": keep-alive\n\n")
+                continue
+            version = snapshot["version"]
+            payload = nav.snapshot_json(snapshot)
+            chunk = payload + "\n" if ndjson else f"id: {version}\nevent: detection\ndata: {payload}\n\n"
+            await response.write(chunk.encode())
+    except ConnectionResetError:
+        pass
+    return response
+
+
+def status(application):
+    pipeline = nav.pipeline
+    return {
+        "type": "status",
+        "camera_running": nav.camera_running,
+        "show_camera": nav.show_camera,
+        "viewers": nav.video_hub.subscribers + application["viewers"],
+        "latency_ms": pipeline.last_latency if pipeline else {},
+        "dropped_frames": pipeline.dropped_frames if pipeline else 0,
+    }
+
+
+def identify_command(msg):
+    try:
+        max_age = parse_max_age(msg.get("max_age"))
+    except ValueError as e:
+        return {"type": "error", "cmd": "identify", "error": str(e)}
+    return dict(nav.identify_from_snapshot(max_age), type="identify")
+
+
+# WebSocket commands: {"cmd": "start" | "stop" | "toggle_camera" | "identify" | "status"}
+COMMANDS = {
+    "start": lambda msg: {"type": "result", "cmd": "start", "message": nav.start()},
+    "stop": lambda msg: {"type": "result", "cmd": "stop", "message": nav.stop()},
+    "toggle_camera": lambda msg: {"type": "result", "cmd": "toggle_camera", "message": nav.toggle_camera()},
+    "identify": identify_command,
+}
+
+
+async def websocket(request):
+    """Control channel plus telemetry: pushes every detection snapshot and a status message every second."""
+    ws = web.WebSocketResponse(heartbeat=30.0)
+    await ws.prepare(request)
+    signal = request.app["detections"]
+
+    async def push_telemetry():
+        loop = asyncio.get_running_loop()
+        version = 0
+        next_status = 0.0
+        while not ws.closed:
+            latest = await signal.wait(version, timeout=1.0)
+            if latest > version:
+                snapshot = nav.detection_board.latest()
+                if snapshot is not None:
+                    version = snapshot["version"]
+                    await ws.send_str(json.dumps(dict(json.loads(nav.snapshot_json(snapshot)), type="detection")))
+            if loop.time() >= next_status:
+                next_status = loop.time() + 1.0
+                await ws.send_json(status(request.app))
+
+    telemetry = asyncio.create_task(push_telemetry())
+    try:
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            try:
+                command = json.loads(msg.data)
+                name = command.get("cmd")
+                if name == "status":
+                    await ws.send_json(status(request.app))
+                    continue
+                handler = COMMANDS[name]
+            except (ValueError, KeyError, AttributeError):
+                await ws.send_json({"type": "error", "error": "Unknown command."})
+                continue
+            await ws.send_json(handler(command))
+    finally:
+        telemetry.cancel()
+    return ws
+
+
+def create_app():
+    application = web.Application()
+    application["viewers"] = 0
+    application.router.add_get("/", home)
+    application.router.add_get("/start", start)
+    application.router.add_get("/stop", stop)
+    application.router.add_get("/toggle_camera", toggle_camera)
+    application.router.add_get("/identify_object", identify_object)
+    application.router.add_get("/metrics", metrics_endpoint)
+    application.router.add_get("/toggle_metrics", toggle_metrics)
+    application.router.add_get("/video_feed", video_feed)
+    application.router.add_get("/detections", detections_stream)
+    application.router.add_get("/ws", websocket)
+    application.on_startup.append(on_startup)
+    application.on_cleanup.append(on_cleanup)
+    return application
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the navigation server on asyncio.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args()
+
+    # Load the model and run one inference in the background while the server starts
+    warm_up()
+    web.run_app(create_app(), host=args.host, port=args.port)
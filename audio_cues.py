@@ -0,0 +1,439 @@
+import heapq
+import itertools
+import math
+import os
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+from metrics import metrics
+from speech_engine import PRIORITY_WARNING, PRIORITY_INFO, PRIORITY_STATUS
+
+SAMPLE_RATE = 22050
+ALERT_SOUND_PATH = 'alert_sound.wav'
+
+# Distance bands: (up to meters, pitch Hz, beeps per cue, seconds before the band's cue may repeat)
+DISTANCE_BANDS = (
+    (1.0, 1320.0, 3, 0.0),
+    (2.0, 990.0, 2, 0.4),
+    (4.0, 740.0, 1, 1.0),
+    (math.inf, 554.0, 1, 2.5),
+)
+PAN_STEPS = 9          # Stereo positions from hard left to hard right
+PAN_RANGE = 31.0       # Bearing in degrees that maps to a hard left/right pan (half the lens FOV)
+BEEP_SECONDS = 0.09
+BEEP_GAP = 0.06
+
+DEFAULT_MAX_AGE = 1.0  # Seconds a cue may wait before it no longer describes the scene
+
+
+def tone(frequency, duration, sample_rate=SAMPLE_RATE):
+    """Mono sine tone with a short raised-cosine fade in and out, so it starts and stops without clicks."""
+    t = np.arange(int(duration * sample_rate), dtype=np.float32) / sample_rate
+    signal = np.sin(2.0 * np.pi * frequency * t)
+    fade = min(int(0.005 * sample_rate), len(t) // 2)
+    if fade:
+        ramp = 0.5 - 0.5 * np.cos(np.linspace(0.0, np.pi, fade, dtype=np.float32))
+        signal[:fade] *= ramp
+        signal[-fade:] *= ramp[::-1]
+    return signal
+
+
+def beeps(frequency, count, duration=BEEP_SECONDS, gap=BEEP_GAP, sample_rate=SAMPLE_RATE):
+    """`count` beeps separated by silence, as one mono buffer."""
+    beep = tone(frequency, duration, sample_rate)
+    silence = np.zeros(int(gap * sample_rate), dtype=np.float32)
+    parts = [beep]
+    for _ in range(count - 1):
+        parts += [silence, beep]
+    return np.concatenate(parts)
+
+
+def pan(mono, position):
+    """Constant-power stereo pan; `position` runs from -1 (left) to 1 (right). Returns (n, 2)."""
+    angle = (np.clip(position, -1.0, 1.0) + 1.0) * np.pi / 4.0
+    return np.column_stack([mono * np.cos(angle), mono * np.sin(angle)])
+
+
+def to_pcm(samples, volume=0.8):
+    """Float samples in [-1, 1] -> C-contiguous int16 stereo, as the mixer expects."""
+    if samples.ndim == 1:
+        samples = np.column_stack([samples, samples])
+    return np.ascontiguousarray(np.clip(samples * volume, -1.0, 1.0) * 32767, dtype=np.int16)
+
+
+def load_wav(path, sample_rate=SAMPLE_RATE):
+    """Read a 16-bit WAV file as int16 stereo at `sample_rate`."""
+    with wave.open(path, 'rb') as f:
+        channels, width, rate = f.getnchannels(), f.getsampwidth(), f.getframerate()
+        data = f.readframes(f.getnframes())
+    if width != 2:
+        raise ValueError(f"{path}: only 16-bit WAV files are supported")
+    samples = np.frombuffer(data, dtype=np.int16).reshape(-1, channels).astype(np.float32) / 32767
+    samples = samples[:, :2] if channels > 1 else np.column_stack([samples[:, 0], samples[:, 0]])
+    if rate != sample_rate:
+        positions = np.arange(int(len(samples) * sample_rate / rate)) * rate / sample_rate
+        samples = np.column_stack([np.interp(positions, np.arange(len(samples)), samples[:, c]) for c in (0, 1)])
+    return to_pcm(samples, volume=1.0)
+
+
+def write_wav(path, pcm, sample_rate=SAMPLE_RATE):
+    with wave.open(path, 'wb') as f:
+        f.setnchannels(2)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+
+
+class CueBank:
+    """
+    Every cue buffer, synthesized (or loaded) once at startup.
+
+    Obstacle cues are indexed by distance band and pan step: closer bands are
+    higher pitched and carry more beeps, and the pan follows the obstacle's
+    bearing. Named cues ("alert", "error") come from `alert_sound.wav` if it
+    exists, otherwise they are synthesized too.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, bands=DISTANCE_BANDS, pan_steps=PAN_STEPS, alert_path=ALERT_SOUND_PATH):
+        self.sample_rate = sample_rate
+        self.bands = bands
+        self.pan_steps = pan_steps
+        self.buffers = {}
+        positions = np.linspace(-1.0, 1.0, pan_steps)
+        for band, (_, frequency, count, _) in enumerate(bands):
+            mono = beeps(frequency, count, sample_rate=sample_rate)
+            for step, position in enumerate(positions):
+                self.buffers[("obstacle", band, step)] = to_pcm(pan(mono, position))
+
+        try:
+            self.buffers["alert"] = load_wav(alert_path, sample_rate)
+        except (OSError, EOFError, ValueError, wave.Error):
+            self.buffers["alert"] = to_pcm(tone(880.0, 0.15, sample_rate))
+        self.buffers["error"] = to_pcm(beeps(330.0, 3, duration=0.2, gap=0.1, sample_rate=sample_rate))
+
+    def band(self, distance):
+        # Anything past the last limit (or not a number) falls in the farthest band
+        return next((i for i, (limit, _, _, _) in enumerate(self.bands) if distance < limit), len(self.bands) - 1)
+
+    def pan_step(self, bearing):
+        position = max(-1.0, min(1.0, bearing / PAN_RANGE))
+        return int(round((position + 1.0) / 2.0 * (self.pan_steps - 1)))
+
+    def duration(self, key):
+        return len(self.buffers[key]) / self.sample_rate
+
+
+class PygameOutput:
+    """Plays cue buffers on one pygame mixer channel."""
+
+    def open(self, sample_rate):
+        import pygame
+        pygame.mixer.init(frequency=sample_rate, size=-16, channels=2, buffer=512)
+        self.pygame = pygame
+        self.channel = pygame.mixer.Channel(0)
+
+    def prepare(self, key, pcm):
+        return self.pygame.sndarray.make_sound(pcm)
+
+    def play(self, sound):
+        self.channel.play(sound)
+
+    def busy(self):
+        return self.channel.get_busy()
+
+    def stop(self):
+        self.channel.stop()
+
+    def close(self):
+        self.pygame.mixer.quit()
+
+
+class KivyOutput:
+    """Plays cue buffers with Kivy's SoundLoader (Android); each cue is written to a WAV file once."""
+
+    def open(self, sample_rate):
+        from kivy.core.audio import SoundLoader
+        self.loader = SoundLoader
+        self.sample_rate = sample_rate
+        self.directory = tempfile.mkdtemp(prefix="audio_cues_")
+        self.current = None
+
+    def prepare(self, key, pcm):
+        name = "_".join(str(part) for part in key) if isinstance(key, tuple) else key
+        path = os.path.join(self.directory, f"{name}.wav")
+        write_wav(path, pcm, self.sample_rate)
+        return self.loader.load(path)
+
+    def play(self, sound):
+        self.current = sound
+        sound.play()
+
+    def busy(self):
+        return self.current is not None and self.current.state == 'play'
+
+    def stop(self):
+        if self.current is not None:
+            self.current.stop()
+
+    def close(self):
+        self.stop()
+
+
+class SilentOutput:
+    """Keeps the timing of real playback without a sound device (servers, tests)."""
+
+    def open(self, sample_rate):
+        self.sample_rate = sample_rate
+        self.until = 0.0
+        self.played = []
+
+    def prepare(self, key, pcm):
+        return key, len(pcm) / self.sample_rate
+
+    def play(self, sound):
+        self.played.append(sound[0])
+        self.until = time.monotonic() + sound[1]
+
+    def busy(self):
+        return time.monotonic() < self.until
+
+    def stop(self):
+        self.until = 0.0
+
+    def close(self):
+        pass
+
+
+def open_output(sample_rate):
+    """The first audio output that works here: pygame, then Kivy, then silence."""
+    for output in (PygameOutput(), KivyOutput()):
+        try:
+            output.open(sample_rate)
+            return output
+        except Exception:
+            continue
+    print("No audio output available; cues are silent.")
+    output = SilentOutput()
+    output.open(sample_rate)
+    return output
+
+
+class AudioCue:
+    def __init__(self, key, group, priority, max_age, seq):
+        self.key = key
+        self.group = group
+        self.priority = priority
+        self.deadline = time.monotonic() + max_age if max_age is not None else None
+        self.seq = seq
+
+    def expired(self, now):
+        return self.deadline is not None and now > self.deadline
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class AudioCueEngine:
+    """
+    Plays every audio cue through one mixer thread and a bounded priority queue.
+
+    Interruption rules:
+      - One cue plays at a time, so beeps never overlap.
+      - A waiting cue at `interrupt_priority` or more urgent stops a less urgent
+        cue that is playing.
+      - A waiting cue for the same group (distance band, or cue name) is replaced
+        by the newer one, so only the latest position is played.
+      - A group is not played again within its band's repeat interval; the
+        closer the obstacle, the faster cues repeat.
+      - Cues that waited longer than `max_age`, or the least urgent cue once
+        `max_pending` are waiting, are dropped.
+
+    Args:
+        bank (CueBank, optional): Cue buffers. Synthesized on creation if omitted.
+        output (object, optional): Output with `open`, `prepare`, `play`, `busy`, `stop`
+                                   and `close`. Defaults to the first that works (see `open_output`).
+        interrupt_priority (int): Cues at this priority or more urgent may cut off others.
+        max_pending (int): Queue bound.
+    """
+
+    def __init__(self, bank=None, output=None, interrupt_priority=PRIORITY_WARNING, max_pending=8):
+        self.bank = bank or CueBank()
+        self.output = output
+        self.interrupt_priority = interrupt_priority
+        self.max_pending = max_pending
+
+        self.played = 0
+        self.merged = 0
+        self.expired = 0
+        self.interrupted = 0
+        self.overflowed = 0
+        self.suppressed = 0
+
+        self._heap = []
+        self._pending = {}
+        self._last_played = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._current = None
+        self._interrupt = False
+        self._stopped = False
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._mixer, name="audio-cues", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def cue(self, distance, bearing=0.0, priority=None, max_age=DEFAULT_MAX_AGE):
+        """
+        Queue the cue for an obstacle `distance` meters away at `bearing` degrees (negative is left).
+
+        Returns:
+            bool: True if the cue was queued or replaced a waiting one.
+        """
+        band = self.bank.band(distance)
+        if priority is None:
+            priority = PRIORITY_WARNING if band == 0 else PRIORITY_INFO
+        key = ("obstacle", band, self.bank.pan_step(bearing))
+        return self._queue(key, ("obstacle", band), priority, max_age, self.bank.bands[band][3])
+
+    def cue_closest(self, distances, bearings, max_age=DEFAULT_MAX_AGE):
+        """
+        Cue the closest of several obstacles. Returns False if there are none.
+
+        Distances that are not finite (e.g. boxes above the horizon, which the
+        ground-plane estimate cannot place) are left out.
+        """
+        distances = np.asarray(distances, dtype=np.float64)
+        finite = np.flatnonzero(np.isfinite(distances))
+        if not len(finite):
+            return False
+        i = finite[int(np.argmin(distances[finite]))]
+        return self.cue(float(distances[i]), float(bearings[i]), max_age=max_age)
+
+    def play(self, name, priority=PRIORITY_STATUS, max_age=DEFAULT_MAX_AGE, repeat_after=0.0):
+        """Queue a named cue such as "alert" or "error"."""
+        return self._queue(name, name, priority, max_age, repeat_after)
+
+    def _queue(self, key, group, priority, max_age, repeat_after):
+        with self._cond:
+            if self._stopped:
+                return False
+            last = self._last_played.get(group)
+            if last is not None and time.monotonic() - last < repeat_after:
+                self.suppressed += 1
+                return False
+
+            cue = AudioCue(key, group, priority, max_age, next(self._seq))
+            existing = self._pending.pop(group, None)
+            if existing is not None:
+                # Newest position wins, with the more urgent of the two priorities
+                self._heap.remove(existing)
+                cue.priority = min(cue.priority, existing.priority)
+                self.merged += 1
+            heapq.heappush(self._heap, cue)
+            self._pending[group] = cue
+            if len(self._pending) > self.max_pending:
+                victim = max(self._heap)
+                self._heap.remove(victim)
+                del self._pending[victim.group]
+                self.overflowed += 1
+            heapq.heapify(self._heap)
+
+            current = self._current
+            if current is not None and cue.priority <= self.interrupt_priority and cue.priority < current.priority:
+                self._interrupt = True
+            self._cond.notify()
+            return True
+
+    def clear(self):
+        with self._cond:
+            self._heap = []
+            self._pending = {}
+
+    def wait_ready(self, timeout=None):
+        return self._ready.wait(timeout)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._interrupt = True
+            self._cond.notify()
+        self._thread.join(timeout=2.0)
+
+    def _next_cue(self, timeout):
+        with self._cond:
+            if not self._heap and not self._stopped:
+                self._cond.wait(timeout)
+            now = time.monotonic()
+            while self._heap:
+                cue = heapq.heappop(self._heap)
+                del self._pending[cue.group]
+                if cue.expired(now):
+                    self.expired += 1
+                    continue
+                self._current = cue
+                self._interrupt = False
+                self._last_played[cue.group] = now
+                return cue
+            return None
+
+    def _mixer(self):
+        try:
+            if self.output is None:
+                self.output = open_output(self.bank.sample_rate)
+            else:
+                self.output.open(self.bank.sample_rate)
+            # Hand every buffer to the output once; playback only references them
+            sounds = {key: self.output.prepare(key, pcm) for key, pcm in self.bank.buffers.items()}
+        except Exception as e:
+            print(f"Error starting audio cues: {str(e)}")
+            return
+        finally:
+            self._ready.set()
+
+        while not self._stopped:
+            cue = self._next_cue(timeout=0.1)
+            if cue is None:
+                continue
+            try:
+                self.output.play(sounds[cue.key])
+            except Exception as e:
+                print(f"Error playing audio cue: {str(e)}")
+                self._current = None
+                continue
+            metrics.count("audio_cues")
+
+            while self.output.busy() and not self._interrupt:
+                time.sleep(0.005)
+            with self._cond:
+                if self._interrupt:
+                    self.output.stop()
+                    self.interrupted += 1
+                else:
+                    self.played += 1
+                    # Repeat intervals count from the end of the cue
+                    self._last_played[cue.group] = time.monotonic()
+                self._current = None
+                self._interrupt = False
+
+        self.output.close()
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Shared cue engine, started on first use."""
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = AudioCueEngine()
+        return _default_engine
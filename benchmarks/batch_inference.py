@@ -0,0 +1,95 @@
+"""
+Throughput vs. latency of MicroBatcher against one-frame-at-a-time inference.
+
+Runs offline with the deterministic StandInModel, so the numbers show the
+batching behaviour rather than the speed of a particular network:
+
+    python benchmarks/batch_inference.py --cameras 4 --frames 100
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from object_detection import MicroBatcher, detect_objects_batch  # noqa: E402
+from standin_model import StandInModel  # noqa: E402
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run_cameras(detect, cameras, frames_per_camera, fps, frame):
+    """Drive `detect(frame)` from one thread per camera and collect per-call latencies."""
+    latencies = []
+    lock = threading.Lock()
+
+    def camera():
+        interval = 1.0 / fps if fps else 0.0
+        next_at = time.monotonic()
+        for _ in range(frames_per_camera):
+            start = time.monotonic()
+            detect(frame)
+            elapsed = time.monotonic() - start
+            with lock:
+                latencies.append(elapsed)
+            next_at += interval
+            delay = next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+    threads = [threading.Thread(target=camera) for _ in range(cameras)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.monotonic() - start
+    return wall, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cameras", type=int, default=4, help="concurrent callers")
+    parser.add_argument("--frames", type=int, default=100, help="frames per camera")
+    parser.add_argument("--fps", type=float, default=0, help="per-camera frame rate (0 = as fast as possible)")
+    parser.add_argument("--batch-sizes", default="1,2,4,8", help="comma-separated max batch sizes")
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="batch deadline in milliseconds")
+    parser.add_argument("--call-overhead-ms", type=float, default=20.0, help="stand-in fixed cost per forward pass")
+    parser.add_argument("--per-image-ms", type=float, default=4.0, help="stand-in cost per image")
+    args = parser.parse_args()
+
+    model = StandInModel(call_overhead=args.call_overhead_ms / 1000.0, per_image_cost=args.per_image_ms / 1000.0)
+    frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+
+    print(f"{'mode':<16}{'fps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'batch':>8}")
+
+    # Baseline: every caller runs its own forward pass, serialised like a shared model
+    model_lock = threading.Lock()
+
+    def unbatched(f):
+        with model_lock:
+            return detect_objects_batch([f], detector=model)
+
+    wall, latencies = run_cameras(unbatched, args.cameras, args.frames, args.fps, frame)
+    print(f"{'unbatched':<16}{len(latencies) / wall:>10.1f}"
+          f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}"
+          f"{percentile(latencies, 99) * 1000:>10.1f}{1.0:>8.2f}")
+
+    for size in [int(s) for s in args.batch_sizes.split(",")]:
+        batcher = MicroBatcher(lambda frames: detect_objects_batch(frames, detector=model),
+                               max_batch_size=size, max_wait=args.max_wait_ms / 1000.0)
+        wall, latencies = run_cameras(batcher.detect, args.cameras, args.frames, args.fps, frame)
+        batcher.close()
+        print(f"{'batch<=' + str(size):<16}{len(latencies) / wall:>10.1f}"
+              f"{percentile(latencies, 50) * 1000:>10.1f}{percentile(latencies, 95) * 1000:>10.1f}"
+              f"{percentile(latencies, 99) * 1000:>10.1f}{batcher.mean_batch_size:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
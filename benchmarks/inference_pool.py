@@ -0,0 +1,55 @@
+"""
+Throughput of InferencePool against single-process inference.
+
+Uses StandInModel with `busy=True`, so each forward pass holds the GIL like
+eager PyTorch does and threads alone cannot use more than one core:
+
+    python benchmarks/inference_pool.py --frames 200 --workers 1,2,4,8
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from inference_pool import InferencePool  # noqa: E402
+from object_detection import detect_objects_batch  # noqa: E402
+from standin_model import StandInModel  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200, help="frames to run through each configuration")
+    parser.add_argument("--workers", default=",".join(str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1})),
+                        help="comma-separated worker counts")
+    parser.add_argument("--cost-ms", type=float, default=20.0, help="stand-in CPU time per frame")
+    args = parser.parse_args()
+
+    model_kwargs = {"call_overhead": args.cost_ms / 1000.0, "per_image_cost": 0.0, "busy": True}
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(8)]
+    stream = [frames[i % len(frames)] for i in range(args.frames)]
+
+    model = StandInModel(**model_kwargs)
+    start = time.monotonic()
+    expected = [detect_objects_batch([frame], detector=model)[0] for frame in stream]
+    baseline = args.frames / (time.monotonic() - start)
+    print(f"{'mode':<16}{'fps':>10}{'speedup':>10}")
+    print(f"{'in-process':<16}{baseline:>10.1f}{1.0:>10.2f}")
+
+    for workers in [int(n) for n in args.workers.split(",")]:
+        with InferencePool(workers=workers, source="standin", model_kwargs=model_kwargs) as pool:
+            pool.wait_ready()
+            start = time.monotonic()
+            results = list(pool.imap(stream))
+            fps = args.frames / (time.monotonic() - start)
+        # Results must match in-process inference, in frame order
+        assert all(np.array_equal(a.boxes, b.boxes) for a, b in zip(results, expected)), "results out of order"
+        print(f"{f'{workers} workers':<16}{fps:>10.1f}{fps / baseline:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+End-to-end replay benchmark for the navigation pipeline.
+
+Feeds recorded video files (or a generated clip) through the pipeline that
+app.py's `build_pipeline` builds for `run_navigation`: the free-path check
+on every frame, the motion gate, the corridor detector and the feedback
+stage. Only the outside world is swapped: the deterministic StandInModel
+replaces YOLOv5, spoken sentences are collected instead of synthesized and
+audio cues go to a silent output, so runs are offline and repeatable.
+Stage times come from the app's own instrumentation (see metrics.py):
+
+    python benchmarks/replay_pipeline.py --video walk.mp4
+    python benchmarks/replay_pipeline.py --save-baseline
+    python benchmarks/replay_pipeline.py --check
+    python benchmarks/replay_pipeline.py --fps 30 --governor
+
+By default each frame is handed out as soon as the inference stage has
+taken the previous one, so every frame is processed and `fps` is the
+pipeline's throughput; `--fps` paces frames like a live camera (dropping
+what inference cannot keep up with) to look at latency instead. `--check` compares against the stored baseline (recorded
+in the same mode) and exits non-zero when the frame rate drops or a stage's
+p95 latency grows by more than `--tolerance`.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+from audio_cues import AudioCueEngine, SilentOutput  # noqa: E402
+from inference_size import InferenceSizePolicy  # noqa: E402
+from metrics import metrics  # noqa: E402
+from model_registry import LazyModule  # noqa: E402
+from standin_model import StandInModel  # noqa: E402
+
+cv2 = LazyModule("cv2")
+
+# Instrumented stages of the app (capture, free_path, detect, postprocess, feedback), the whole
+# inference stage (gates plus detector) and the frame's age once its feedback is done
+STAGES = ("capture", "free_path", "detect", "postprocess", "inference", "feedback", "end_to_end")
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "replay_pipeline.json")
+
+
+def percentile(values, q):
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+class StageTimer:
+    """Collects per-stage durations from several threads."""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        if stage not in self.samples:
+            return
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def summary(self):
+        return {stage: {"count": len(values),
+                        "p50_ms": percentile(values, 50) * 1000.0,
+                        "p95_ms": percentile(values, 95) * 1000.0,
+                        "p99_ms": percentile(values, 99) * 1000.0}
+                for stage, values in self.samples.items()}
+
+
+def synthetic_clip(frames=150, width=640, height=480, seed=0):
+    """A walk-like clip: textured background with bright and dark blocks drifting towards the camera."""
+    rng = np.random.default_rng(seed)
+    background = rng.integers(90, 130, (height, width, 3), dtype=np.uint8)
+    clip = []
+    for i in range(frames):
+        frame = background.copy()
+        grow = 1.0 + i / frames
+        for cx, cy, value in ((0.5, 0.5, 250), (0.3, 0.7, 10), (0.7, 0.3, 240)):
+            half_w, half_h = int(width * 0.08 * grow), int(height * 0.08 * grow)
+            x, y = int(width * cx + 2 * np.sin(i / 7.0)), int(height * cy)
+            frame[max(0, y - half_h):y + half_h, max(0, x - half_w):x + half_w] = value
+        clip.append(frame)
+    return clip
+
+
+class ReplayCapture:
+    """
+    `cv2.VideoCapture` stand-in that replays a file or a list of frames.
+
+    Frames are paced at `fps` like a live camera. With `fps=0` a frame is
+    returned once `ready()` says the previous one was taken, so none are
+    dropped. The capture stage includes either wait.
+    """
+
+    def __init__(self, source, fps=0.0, ready=None):
+        self.source = source
+        self.ready = ready
+        self.interval = 1.0 / fps if fps else 0.0
+        self._video = cv2.VideoCapture(source) if isinstance(source, str) else None
+        self._index = 0
+        self._next_at = time.monotonic()
+
+    def isOpened(self):
+        return self._video.isOpened() if self._video is not None else True
+
+    def read(self):
+        if self.interval:
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._next_at = max(self._next_at + self.interval, time.monotonic())
+        elif self.ready is not None:
+            while not self.ready():
+                time.sleep(0.0005)
+
+        if self._video is not None:
+            ret, frame = self._video.read()
+        elif self._index < len(self.source):
+            # The app draws on nothing it captures, but hand out a copy like a camera would
+            ret, frame = True, self.source[self._index].copy()
+        else:
+            ret, frame = False, None
+        self._index += 1
+        return ret, frame
+
+    def release(self):
+        if self._video is not None:
+            self._video.release()
+
+
+def build_replay(source, timer, model, fps, budget_ms, governed):
+    """app.py's navigation pipeline over `source`, with only the model and the audio outputs swapped."""
+    announced = []
+    app.path_detector.model = model
+    app.path_detector.policy = InferenceSizePolicy(budget_ms=budget_ms)
+    app.speak = announced.append  # Speech itself is not replayed, only the sentences app.py builds
+    cues = AudioCueEngine(output=SilentOutput())
+    app.audio_cues = lambda: cues
+
+    # Unpaced, the next frame waits until inference has taken the last one (`pipeline` exists by then)
+    pipeline = app.build_pipeline(lambda: ReplayCapture(source, fps, ready=lambda: not len(pipeline.frames)),
+                                  governor=app.governor if governed else None)
+
+    display, feedback = pipeline.display, pipeline.feedback
+
+    def after_inference(packet):
+        timer.add("inference", packet.stage_times["inference_done"] - packet.stage_times["inference_start"])
+        display(packet)
+
+    def after_feedback(packet):
+        feedback(packet)
+        timer.add("end_to_end", packet.age())
+
+    pipeline.display, pipeline.feedback = after_inference, after_feedback
+    return pipeline, announced, cues
+
+
+def run_replay(source, model, fps=0.0, budget_ms=80.0, governed=False):
+    """Replay one source through the pipeline and return its measurements."""
+    timer = StageTimer()
+    pipeline, announced, cues = build_replay(source, timer, model, fps, budget_ms, governed)
+    metrics.enable(True)
+    metrics.sampler = timer.add
+
+    start = time.monotonic()
+    try:
+        pipeline.run()
+    finally:
+        metrics.sampler = None
+        cues.stop()
+    wall = time.monotonic() - start
+
+    processed = len(timer.samples["inference"])
+    return {
+        "replay_fps": fps,
+        "governed": governed,
+        "frames": pipeline.frames_captured,
+        "processed": processed,
+        "dropped": pipeline.dropped_frames,
+        "announcements": len(announced),
+        "detector_runs": len(timer.samples["detect"]),
+        "fps": processed / wall if wall > 0 else 0.0,
+        "stages": timer.summary(),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """Return a list of regressions of `result` against `baseline`."""
+    modes = [(r.get("replay_fps", 30.0), r.get("governed", False)) for r in (result, baseline)]
+    if modes[0] != modes[1]:
+        return [f"baseline was recorded with replay fps {modes[1][0]:g} and governor {modes[1][1]}, "
+                f"not {modes[0][0]:g} and {modes[0][1]}"]
+    regressions = []
+    if result["fps"] < baseline["fps"] * (1.0 - tolerance):
+        regressions.append(f"fps {result['fps']:.1f} < baseline {baseline['fps']:.1f}")
+    for stage, stats in baseline["stages"].items():
+        current = result["stages"].get(stage)
+        if current is None or not stats["count"]:
+            continue
+        # Sub-millisecond stages are dominated by timer noise; allow a small absolute slack
+        limit = stats["p95_ms"] * (1.0 + tolerance) + 0.5
+        if current["p95_ms"] > limit:
+            regressions.append(f"{stage} p95 {current['p95_ms']:.2f}ms > {limit:.2f}ms")
+    return regressions
+
+
+def print_result(name, result):
+    print(f"\n{name}: {result['fps']:.1f} fps, {result['processed']}/{result['frames']} frames processed, "
+          f"{result['dropped']} dropped, {result['detector_runs']} detector runs, "
+          f"{result['announcements']} announcements")
+    print(f"{'stage':<14}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<14}{stats['count']:>8}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--video", action="append", default=[], help="recorded video file (repeatable)")
+    parser.add_argument("--frames", type=int, default=150, help="length of the generated clip")
+    parser.add_argument("--fps", type=float, default=0.0, help="replay rate (0 = as fast as possible)")
+    parser.add_argument("--governor", action="store_true", help="let app.py's frame governor pick the frames")
+    parser.add_argument("--budget-ms", type=float, default=app.INFERENCE_BUDGET_MS, help="inference latency budget")
+    parser.add_argument("--call-overhead-ms", type=float, default=20.0, help="stand-in fixed cost per forward pass")
+    parser.add_argument("--per-image-ms", type=float, default=4.0, help="stand-in cost per image")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="fail if results regress against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    args = parser.parse_args()
+
+    sources = {os.path.basename(path): path for path in args.video}
+    if not sources:
+        sources["synthetic"] = synthetic_clip(args.frames)
+
+    results = {}
+    for name, source in sources.items():
+        model = StandInModel(call_overhead=args.call_overhead_ms / 1000.0, per_image_cost=args.per_image_ms / 1000.0)
+        results[name] = run_replay(source, model, fps=args.fps, budget_ms=args.budget_ms, governed=args.governor)
+        print_result(name, results[name])
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failures = []
+        for name, result in results.items():
+            if name not in baseline:
+                print(f"\nNo baseline for {name}, skipped")
+                continue
+            failures += [f"{name}: {message}" for message in compare(result, baseline[name], args.tolerance)]
+        if failures:
+            print("\nRegressions:\n  " + "\n  ".join(failures))
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
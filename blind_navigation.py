@@ -1,122 +1,99 @@
 from flask import Flask, render_template, Response
-import cv2
-import torch
-from gtts import gTTS
-import os
-import platform
 import threading
-import speech_recognition as sr
+from pipeline import NavigationPipeline
+from model_registry import LazyModule, class_names, warm_up
+from inference_size import RoiDetector, InferenceSizePolicy
+from voice_command import BackgroundListener
+from phrase_cache import play_phrase, prewarm_in_background
+from distance import estimate_distances, estimator as distance_estimator
+from audio_cues import get_engine as audio_cues
+
+# Heavy modules are imported on first use so the server can answer right away
+cv2 = LazyModule("cv2")
 
 app = Flask(__name__)
 
 # Global variables
 camera_running = False
 cap = None
+pipeline = None
+
+# Latency budget per inference; the model input size is picked to stay within it
+INFERENCE_BUDGET_MS = 120
 
-# Load YOLOv5 model
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s')
+# The YOLOv5 model is shared between modules and loaded on first use (see model_registry)
 
-# Function to generate a beep sound
-def beep():
-    system_platform = platform.system()
-    if system_platform == "Windows":
-        import winsound
-        winsound.Beep(1000, 500)  # Frequency: 1000Hz, Duration: 500ms
-    else:
-        os.system('echo -e "\a"')  # Linux/Mac
+# The sentences we say most, synthesized in the background at startup so they play instantly
+PREWARM_PHRASES = ["There is a {} in front of you.", "I don't see any object in front of you."]
+
+# Function to play a beep, panned towards the closest object and faster the closer it is
+def beep(detections, frame_shape):
+    distances = distance_estimator(detections, frame_shape)
+    audio_cues().cue_closest(distances, distance_estimator.bearings(detections.boxes, frame_shape))
 
 # Function to speak object names
 def speak(text):
-    tts = gTTS(text=text, lang='en')
-    tts.save("object.mp3")
-    os.system("mpg321 object.mp3")  # Use 'mpg321' or any audio player
-
-# Function to listen for speech commands
-def listen_for_command():
-    recognizer = sr.Recognizer()
-    with sr.Microphone() as source:
-        print("Listening for command...")
-        audio = recognizer.listen(source)
-
-    try:
-        command = recognizer.recognize_google(audio).lower()
-        print(f"Command recognized: {command}")
-        return command
-    except sr.UnknownValueError:
-        print("Could not understand the audio.")
-        return None
-    except sr.RequestError:
-        print("Could not request results from the speech recognition service.")
-        return None
-
-# Function to identify the object in front
-def identify_object_in_front(frame):
-    # Perform object detection
-    results = model(frame)
-    detections = results.xyxy[0].numpy()
-
-    # Find the object with the largest bounding box (closest object)
-    largest_area = 0
-    closest_object = None
-
-    for detection in detections:
-        x1, y1, x2, y2, conf, cls = detection
-        if conf > 0.5:  # Confidence threshold
-            label = model.names[int(cls)]
-            area = (x2 - x1) * (y2 - y1)  # Calculate bounding box area
-            if area > largest_area:
-                largest_area = area
-                closest_object = label
-
-    return closest_object
+    # Repeated phrases are served from the phrase cache, no synthesis or temp file
+    if not play_phrase(text):
+        print(f"Could not speak: {text}")
+
+# Function to identify the object in front, from the detections of one frame
+def identify_object_in_front(detections, frame_shape):
+    detections = detections.with_confidence(0.5)  # Confidence threshold
+
+    # Find the closest object by estimated distance
+    closest = detections.closest(estimate_distances(detections, frame_shape))
+    return closest.labels[0] if closest else None
+
+# Capture stage: open the shared camera
+def open_camera():
+    global cap
+    cap = cv2.VideoCapture(0)
+    return cap
+
+# Inference stage: perform object detection
+detector = RoiDetector(policy=InferenceSizePolicy(budget_ms=INFERENCE_BUDGET_MS))
+
+# Feedback stage: check for obstacles and beep for the ones within range
+def announce_obstacles(packet):
+    detections = packet.detections.with_confidence(0.5)  # Confidence threshold
+    if not detections:
+        return
+    print(f"Detected: {', '.join(detections.labels)}")
+
+    # Check which objects are within 2 to 4 feet (0.6 to 1.2 m), from the calibrated
+    # camera and each class's typical size (see distance.py)
+    distances = estimate_distances(detections, packet.frame.shape)
+    in_range = detections.in_band(distances, 0.6, 1.2)
+    for label in in_range.labels:
+        print(f"Beep! {label} detected within 2 to 4 feet.")
+    if in_range:
+        beep(in_range, packet.frame.shape)  # One cue for the closest; the cue engine never overlaps beeps
+    if len(in_range) < len(detections):
+        print(f"{len(detections) - len(in_range)} object(s) detected, but outside 2 to 4 feet range.")
+
+# Answer the "What is in front of me?" command; runs on the voice listener thread, so it
+# answers from the latest inferred frame instead of running the detector itself
+def answer_command(command, transcript):
+    packet = pipeline.latest_packet if pipeline else None
+    if command == "what_is_in_front" and packet is not None:
+        closest_object = identify_object_in_front(packet.detections, packet.frame.shape)
+        if closest_object:
+            speak(f"There is a {closest_object} in front of you.")
+        else:
+            speak("I don't see any object in front of you.")
 
 # Function to run the navigation system
 def run_navigation():
-    global camera_running, cap
-    cap = cv2.VideoCapture(0)
-    while camera_running:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Perform object detection
-        results = model(frame)
-        detections = results.xyxy[0].numpy()
-
-        # Check for obstacles and speak object names
-        for detection in detections:
-            x1, y1, x2, y2, conf, cls = detection
-            if conf > 0.5:  # Confidence threshold
-                label = model.names[int(cls)]
-                print(f"Detected: {label}")
-
-                # Calculate bounding box height
-                bbox_height = y2 - y1
-
-                # Define thresholds for 2 to 4 feet
-                # Adjust these values based on your camera and environment
-                MIN_HEIGHT = 100  # Minimum height for 4 feet
-                MAX_HEIGHT = 200  # Maximum height for 2 feet
-
-                # Check if the object is within 2 to 4 feet
-                if MIN_HEIGHT <= bbox_height <= MAX_HEIGHT:
-                    print(f"Beep! {label} detected within 2 to 4 feet.")
-                    beep()  # Call the beep function
-                else:
-                    print(f"{label} detected, but outside 2 to 4 feet range.")
-
-        # Listen for the "What is in front of me?" command
-        command = listen_for_command()
-        if command and "what is in front of me" in command:
-            closest_object = identify_object_in_front(frame)
-            if closest_object:
-                speak(f"There is a {closest_object} in front of you.")
-            else:
-                speak("I don't see any object in front of you.")
-
-    # Release the camera when stopped
-    if cap:
-        cap.release()
+    global camera_running, pipeline
+    pipeline = NavigationPipeline(open_camera, detector, announce_obstacles)
+    # Listen for commands offline in the background so the camera never waits on the microphone
+    listener = BackgroundListener(on_command=answer_command).start()
+    pipeline.run()
+    listener.stop()
+
+    camera_running = False
+    print(pipeline.latency_report())
     print("Navigation stopped.")
 
 # Route for the home page
@@ -140,8 +117,13 @@ def stop():
     global camera_running
     if camera_running:
         camera_running = False
+        if pipeline:
+            pipeline.stop()
         return "Navigation stopped!"
     return "Navigation is not running!"
 
 if __name__ == '__main__':
+    # Load the model and run one inference in the background while the server starts
+    warm_up()
+    prewarm_in_background(PREWARM_PHRASES, class_names())
     app.run(debug=True)
\ No newline at end of file
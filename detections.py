@@ -0,0 +1,167 @@
+import numpy as np
+
+# The walking corridor from app.py: middle 20% of the width, 10% to 90% of the height
+CORRIDOR = (0.4, 0.1, 0.6, 0.9)
+
+
+def corridor_roi(frame_shape, fractions=CORRIDOR):
+    """Pixel `(x1, y1, x2, y2)` of the walking corridor for a frame of `frame_shape`."""
+    height, width = frame_shape[:2]
+    fx1, fy1, fx2, fy2 = fractions
+    return int(width * fx1), int(height * fy1), int(width * fx2), int(height * fy2)
+
+
+def _to_numpy(rows):
+    if hasattr(rows, "cpu"):  # torch.Tensor
+        rows = rows.detach().cpu().numpy()
+    rows = np.asarray(rows, dtype=np.float32)
+    return rows.reshape(-1, 6) if rows.size else np.zeros((0, 6), dtype=np.float32)
+
+
+class Detections:
+    """
+    Detection results for one frame, stored as parallel NumPy arrays.
+
+    Every query is a vectorized operation over all boxes and filters return a
+    new `Detections`, so they can be chained:
+
+        dets = Detections.from_results(model(frame), model.names)
+        close = dets.with_confidence(0.5).in_roi(path_roi).closest()
+
+    Attributes:
+        boxes (numpy.ndarray): `(N, 4)` float32 `x1, y1, x2, y2` in pixels.
+        confidences (numpy.ndarray): `(N,)` float32 scores.
+        class_ids (numpy.ndarray): `(N,)` int32 class indices.
+        names (list or dict): Class names indexed by class id.
+    """
+
+    __slots__ = ("boxes", "confidences", "class_ids", "names")
+
+    def __init__(self, boxes, confidences, class_ids, names=None):
+        self.boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        self.confidences = np.asarray(confidences, dtype=np.float32).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=np.int32).reshape(-1)
+        self.names = names if names is not None else {}
+
+    @classmethod
+    def empty(cls, names=None):
+        return cls(np.zeros((0, 4)), np.zeros(0), np.zeros(0), names)
+
+    @classmethod
+    def from_xyxy(cls, rows, names=None):
+        """Build from an `(N, 6)` array or tensor of `x1, y1, x2, y2, conf, cls` rows."""
+        rows = _to_numpy(rows)
+        return cls(rows[:, :4], rows[:, 4], rows[:, 5], names)
+
+    @classmethod
+    def from_results(cls, results, names=None, index=0):
+        """Build from a YOLOv5 results object (`results.xyxy[index]`)."""
+        if names is None:
+            names = getattr(results, "names", None)
+        return cls.from_xyxy(results.xyxy[index], names)
+
+    def __len__(self):
+        return len(self.confidences)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        # Accepts boolean masks, index arrays and slices; ints give a one-box Detections
+        if isinstance(index, (int, np.integer)):
+            index = [index]
+        return Detections(self.boxes[index], self.confidences[index], self.class_ids[index], self.names)
+
+    def __repr__(self):
+        return f"Detections({len(self)} boxes: {', '.join(self.labels)})"
+
+    # Derived geometry
+
+    @property
+    def widths(self):
+        return self.boxes[:, 2] - self.boxes[:, 0]
+
+    @property
+    def heights(self):
+        return self.boxes[:, 3] - self.boxes[:, 1]
+
+    @property
+    def areas(self):
+        return self.widths * self.heights
+
+    @property
+    def centers(self):
+        """`(N, 2)` array of box centers."""
+        return (self.boxes[:, :2] + self.boxes[:, 2:]) / 2.0
+
+    @property
+    def labels(self):
+        if not self.names:
+            return [str(int(c)) for c in self.class_ids]
+        return [self.names[int(c)] for c in self.class_ids]
+
+    # Filters
+
+    def with_confidence(self, min_conf):
+        return self[self.confidences > min_conf]
+
+    def with_classes(self, allowed):
+        """Keep only classes in `allowed` (class names or ids)."""
+        lookup = self.names.items() if isinstance(self.names, dict) else enumerate(self.names)
+        by_name = {name: i for i, name in lookup}
+        ids = [by_name.get(item, -1) if isinstance(item, str) else int(item) for item in allowed]
+        return self[np.isin(self.class_ids, np.asarray(ids, dtype=np.int32))]
+
+    def roi_overlap(self, roi):
+        """Fraction of each box's area that falls inside `roi = (x1, y1, x2, y2)`."""
+        rx1, ry1, rx2, ry2 = roi
+        ix = np.clip(np.minimum(self.boxes[:, 2], rx2) - np.maximum(self.boxes[:, 0], rx1), 0, None)
+        iy = np.clip(np.minimum(self.boxes[:, 3], ry2) - np.maximum(self.boxes[:, 1], ry1), 0, None)
+        return ix * iy / np.maximum(self.areas, 1e-6)
+
+    def in_roi(self, roi, min_overlap=0.0):
+        """Keep boxes intersecting `roi` by more than `min_overlap` of their own area."""
+        return self[self.roi_overlap(roi) > min_overlap]
+
+    def in_height_band(self, min_height, max_height):
+        """Keep boxes whose pixel height is within `[min_height, max_height]`."""
+        heights = self.heights
+        return self[(heights >= min_height) & (heights <= max_height)]
+
+    def in_band(self, values, low, high):
+        """Keep boxes whose per-box `values` (e.g. distances) are within `[low, high)`."""
+        values = np.asarray(values)
+        return self[(values >= low) & (values < high)]
+
+    def largest(self):
+        """The box with the largest area (a proxy for the closest object), or an empty Detections."""
+        if not len(self):
+            return self
+        return self[int(np.argmax(self.areas))]
+
+    def closest(self, distances=None):
+        """The nearest box by `distances` if given, otherwise the largest box."""
+        if distances is None or not len(self):
+            return self.largest()
+        return self[int(np.argmin(distances))]
+
+    # Coordinate transforms
+
+    def offset(self, dx, dy):
+        """Shift boxes, e.g. from ROI crop coordinates back to the full frame."""
+        shift = np.array([dx, dy, dx, dy], dtype=np.float32)
+        return Detections(self.boxes + shift, self.confidences, self.class_ids, self.names)
+
+    def scale(self, sx, sy):
+        factor = np.array([sx, sy, sx, sy], dtype=np.float32)
+        return Detections(self.boxes * factor, self.confidences, self.class_ids, self.names)
+
+    def to_dicts(self):
+        """One JSON-serialisable dict per box: label, confidence and full-frame box."""
+        return [{"label": label, "confidence": round(conf, 3), "box": [round(v, 1) for v in box]}
+                for label, conf, box in zip(self.labels, self.confidences.tolist(), self.boxes.tolist())]
+
+    def to_tuples(self):
+        """`(name, conf, center_x, center_y)` tuples, the format `detect_objects` returns."""
+        centers = self.centers.astype(np.int32)
+        return list(zip(self.labels, self.confidences.tolist(), centers[:, 0].tolist(), centers[:, 1].tolist()))
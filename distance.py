@@ -0,0 +1,328 @@
+"""
+Distance to detected objects from camera intrinsics and known object sizes.
+
+    distances = estimate_distances(detections, frame.shape)   # metres, one per box
+
+A pinhole camera sees an object of real height H metres at distance d as
+`fy * H / d` pixels tall, so `d = fy * H / box_height`. Typical real-world
+sizes per COCO class are in `CLASS_SIZES`; the intrinsics come from a
+calibration file (see `calibrate_chessboard` / `calibrate_from_reference`)
+or, failing that, the camera's nominal field of view. For a camera at a
+fixed height and tilt, `GroundPlaneLUT` maps the image row where an object
+touches the floor straight to a distance, which does not depend on the
+object's size at all.
+
+    python distance.py calibrate --images chessboard/ --square 0.025
+"""
+import argparse
+import glob
+import json
+import os
+
+import numpy as np
+
+from model_registry import ROOT_DIR, LazyModule
+
+cv2 = LazyModule("cv2")
+
+CALIBRATION_PATH = os.environ.get("CAMERA_CALIBRATION", os.path.join(ROOT_DIR, "assets", "camera.json"))
+DEFAULT_HFOV = 62.0  # Horizontal field of view in degrees of a typical phone/webcam lens
+EDGE_MARGIN = 2  # Pixels; a box this close to the frame edge is cut off by it
+
+# Typical (height, width) in metres of each COCO class, as seen by a pedestrian
+CLASS_SIZES = {
+    'person': (1.70, 0.50), 'bicycle': (1.00, 1.70), 'car': (1.50, 1.80), 'motorcycle': (1.10, 2.00),
+    'airplane': (10.0, 30.0), 'bus': (3.20, 2.50), 'train': (4.00, 3.00), 'truck': (3.00, 2.50),
+    'boat': (1.50, 4.00), 'traffic light': (0.90, 0.30), 'fire hydrant': (0.75, 0.35),
+    'stop sign': (0.75, 0.75), 'parking meter': (1.40, 0.30), 'bench': (0.85, 1.50), 'bird': (0.20, 0.25),
+    'cat': (0.30, 0.45), 'dog': (0.55, 0.70), 'horse': (1.60, 2.20), 'sheep': (0.90, 1.20),
+    'cow': (1.40, 2.20), 'elephant': (3.00, 4.50), 'bear': (1.20, 1.80), 'zebra': (1.40, 2.20),
+    'giraffe': (4.80, 2.50), 'backpack': (0.45, 0.30), 'umbrella': (0.90, 1.00), 'handbag': (0.30, 0.35),
+    'tie': (0.50, 0.08), 'suitcase': (0.65, 0.45), 'frisbee': (0.03, 0.25), 'skis': (1.70, 0.10),
+    'snowboard': (1.50, 0.30), 'sports ball': (0.22, 0.22), 'kite': (0.80, 0.80), 'baseball bat': (0.85, 0.07),
+    'baseball glove': (0.30, 0.25), 'skateboard': (0.15, 0.80), 'surfboard': (2.00, 0.55),
+    'tennis racket': (0.68, 0.27), 'bottle': (0.25, 0.08), 'wine glass': (0.20, 0.08), 'cup': (0.10, 0.08),
+    'fork': (0.19, 0.03), 'knife': (0.22, 0.03), 'spoon': (0.17, 0.04), 'bowl': (0.08, 0.16),
+    'banana': (0.04, 0.20), 'apple': (0.08, 0.08), 'sandwich': (0.06, 0.12), 'orange': (0.08, 0.08),
+    'broccoli': (0.15, 0.12), 'carrot': (0.03, 0.18), 'hot dog': (0.05, 0.18), 'pizza': (0.03, 0.30),
+    'donut': (0.04, 0.10), 'cake': (0.12, 0.22), 'chair': (0.90, 0.50), 'couch': (0.85, 2.00),
+    'potted plant': (0.60, 0.40), 'bed': (0.60, 1.60), 'dining table': (0.75, 1.20), 'toilet': (0.75, 0.40),
+    'tv': (0.60, 1.00), 'laptop': (0.23, 0.33), 'mouse': (0.04, 0.06), 'remote': (0.18, 0.05),
+    'keyboard': (0.03, 0.45), 'cell phone': (0.15, 0.07), 'microwave': (0.30, 0.50), 'oven': (0.85, 0.60),
+    'toaster': (0.20, 0.28), 'sink': (0.20, 0.55), 'refrigerator': (1.80, 0.75), 'book': (0.24, 0.17),
+    'clock': (0.30, 0.30), 'vase': (0.30, 0.15), 'scissors': (0.20, 0.08), 'teddy bear': (0.35, 0.25),
+    'hair drier': (0.25, 0.20), 'toothbrush': (0.19, 0.02),
+}
+DEFAULT_SIZE = (0.75, 0.50)  # For classes missing from the table
+
+
+class CameraIntrinsics:
+    """
+    Pinhole camera parameters for one image size.
+
+    Args:
+        fx, fy (float): Focal lengths in pixels.
+        cx, cy (float): Principal point in pixels.
+        width, height (int): Image size the parameters belong to.
+    """
+
+    def __init__(self, fx, fy, cx, cy, width, height):
+        self.fx, self.fy, self.cx, self.cy = float(fx), float(fy), float(cx), float(cy)
+        self.width, self.height = int(width), int(height)
+
+    @classmethod
+    def from_fov(cls, width, height, hfov_deg=DEFAULT_HFOV):
+        """Nominal intrinsics from the horizontal field of view, with square pixels."""
+        fx = (width / 2.0) / np.tan(np.radians(hfov_deg) / 2.0)
+        return cls(fx, fx, width / 2.0, height / 2.0, width, height)
+
+    def scaled(self, width, height):
+        """The same camera at another resolution (e.g. after a resize)."""
+        if (width, height) == (self.width, self.height):
+            return self
+        sx, sy = width / self.width, height / self.height
+        return CameraIntrinsics(self.fx * sx, self.fy * sy, self.cx * sx, self.cy * sy, width, height)
+
+    def to_dict(self):
+        return {"fx": self.fx, "fy": self.fy, "cx": self.cx, "cy": self.cy, "width": self.width, "height": self.height}
+
+    def save(self, path=CALIBRATION_PATH, **extra):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(dict(self.to_dict(), **extra), f, indent=2)
+
+    @classmethod
+    def load(cls, path=CALIBRATION_PATH):
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["fx"], data["fy"], data["cx"], data["cy"], data["width"], data["height"])
+
+
+def calibrate_chessboard(paths, pattern=(9, 6), square_size=0.025):
+    """
+    Full intrinsic calibration from photos of a printed chessboard.
+
+    Args:
+        paths (list): Image files, ideally 10+ views at different angles.
+        pattern (tuple): Inner corners per row and column.
+        square_size (float): Side of one square in metres.
+
+    Returns:
+        Tuple[CameraIntrinsics, float]: The intrinsics and the RMS reprojection error in pixels.
+    """
+    board = np.zeros((pattern[0] * pattern[1], 3), np.float32)
+    board[:, :2] = np.mgrid[0:pattern[0], 0:pattern[1]].T.reshape(-1, 2) * square_size
+    object_points, image_points, size = [], [], None
+    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+    for path in paths:
+        gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            continue
+        found, corners = cv2.findChessboardCorners(gray, pattern)
+        if not found:
+            continue
+        object_points.append(board)
+        image_points.append(cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria))
+        size = gray.shape[::-1]
+    if len(object_points) < 3:
+        raise ValueError(f"Chessboard found in only {len(object_points)} images; need at least 3")
+    rms, matrix, _, _, _ = cv2.calibrateCamera(object_points, image_points, size, None, None)
+    return CameraIntrinsics(matrix[0, 0], matrix[1, 1], matrix[0, 2], matrix[1, 2], *size), rms
+
+
+def calibrate_from_reference(box_height, distance, real_height, width, height):
+    """
+    Quick calibration from one object of known height at a measured distance.
+
+    E.g. a person 1.75 m tall standing 3 m away whose box is 410 px tall in
+    a 640x480 frame: `calibrate_from_reference(410, 3.0, 1.75, 640, 480)`.
+    """
+    focal = box_height * distance / real_height
+    return CameraIntrinsics(focal, focal, width / 2.0, height / 2.0, width, height)
+
+
+class GroundPlaneLUT:
+    """
+    Image row -> distance along the floor, for a camera at a fixed height and tilt.
+
+    Objects standing on the floor touch it at the bottom of their box, so the
+    box's bottom row alone gives the distance. Rows at or above the horizon
+    map to infinity; such a box is not standing on the floor, and
+    `DistanceEstimator` falls back to its size estimate for it.
+
+    Args:
+        meters (numpy.ndarray): Distance for each image row, top row first.
+    """
+
+    def __init__(self, meters):
+        self.meters = np.asarray(meters, dtype=np.float32)
+
+    @property
+    def height(self):
+        return len(self.meters)
+
+    @classmethod
+    def from_mount(cls, intrinsics, camera_height, pitch_deg):
+        """Precompute from the camera's height above the floor (m) and downward tilt (degrees)."""
+        rows = np.arange(intrinsics.height, dtype=np.float64)
+        angle = np.radians(pitch_deg) + np.arctan((rows + 0.5 - intrinsics.cy) / intrinsics.fy)
+        with np.errstate(divide="ignore"):
+            meters = np.where(angle > 0, camera_height / np.tan(np.maximum(angle, 1e-9)), np.inf)
+        return cls(meters)
+
+    @classmethod
+    def from_samples(cls, rows, meters, height):
+        """Interpolate from a few measured `(row, distance)` pairs, e.g. tape marks on the floor."""
+        order = np.argsort(rows)
+        rows, meters = np.asarray(rows, dtype=np.float64)[order], np.asarray(meters, dtype=np.float64)[order]
+        # Distance is linear in 1 / (row - horizon) for a flat floor; interpolating in inverse distance keeps that
+        inverse = np.interp(np.arange(height), rows, 1.0 / meters, left=0.0, right=1.0 / meters[-1])
+        with np.errstate(divide="ignore"):
+            return cls(np.where(inverse > 0, 1.0 / np.maximum(inverse, 1e-9), np.inf))
+
+    def lookup(self, bottom_rows, frame_height):
+        rows = np.asarray(bottom_rows, dtype=np.float64) * (self.height / frame_height)
+        return self.meters[np.clip(rows.astype(np.int64), 0, self.height - 1)]
+
+    def save(self, path):
+        np.save(path, self.meters)
+
+    @classmethod
+    def load(cls, path):
+        return cls(np.load(path))
+
+
+class DistanceEstimator:
+    """
+    Vectorized distance (metres) and bearing (degrees) for every detection at once.
+
+    Size mode uses each box's height, or its width when the box is cut off
+    at the top or bottom of the frame. When a `GroundPlaneLUT` is given, boxes
+    whose bottom edge is inside the frame and below the horizon use the LUT
+    instead, so every distance returned is finite.
+
+    Args:
+        intrinsics (CameraIntrinsics, optional): Defaults to nominal field-of-view intrinsics.
+        class_sizes (dict): Class name -> `(height, width)` in metres.
+        lut (GroundPlaneLUT, optional): Floor-contact distance table for fixed mounts.
+    """
+
+    def __init__(self, intrinsics=None, class_sizes=CLASS_SIZES, lut=None):
+        self.intrinsics = intrinsics
+        self.class_sizes = class_sizes
+        self.lut = lut
+        self._table_names = None
+        self._table = None
+
+    def _camera(self, frame_shape):
+        height, width = frame_shape[:2]
+        if self.intrinsics is None:
+            self.intrinsics = CameraIntrinsics.from_fov(width, height)
+        return self.intrinsics.scaled(width, height)
+
+    def size_table(self, names):
+        """`(classes, 2)` array of real heights and widths, indexed by class id."""
+        if names is not self._table_names:
+            items = names.items() if isinstance(names, dict) else enumerate(names)
+            items = list(items)
+            table = np.tile(np.array(DEFAULT_SIZE, dtype=np.float32), (max((i for i, _ in items), default=-1) + 1, 1))
+            for class_id, name in items:
+                table[class_id] = self.class_sizes.get(name, DEFAULT_SIZE)
+            self._table_names, self._table = names, table
+        return self._table
+
+    def distances(self, boxes, class_ids, names, frame_shape):
+        """Distance in metres for each `x1, y1, x2, y2` box."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        if not len(boxes):
+            return np.zeros(0, dtype=np.float32)
+        camera = self._camera(frame_shape)
+        frame_height, frame_width = frame_shape[:2]
+
+        table = self.size_table(names)
+        class_ids = np.clip(np.asarray(class_ids, dtype=np.int64), 0, len(table) - 1)
+        real_heights, real_widths = table[class_ids, 0], table[class_ids, 1]
+        box_heights = np.maximum(boxes[:, 3] - boxes[:, 1], 1.0)
+        box_widths = np.maximum(boxes[:, 2] - boxes[:, 0], 1.0)
+
+        by_height = camera.fy * real_heights / box_heights
+        by_width = camera.fx * real_widths / box_widths
+        cut_vertically = (boxes[:, 1] <= EDGE_MARGIN) | (boxes[:, 3] >= frame_height - EDGE_MARGIN)
+        cut_horizontally = (boxes[:, 0] <= EDGE_MARGIN) | (boxes[:, 2] >= frame_width - EDGE_MARGIN)
+        # A cut-off side looks too small, so its estimate is too far; take the other one, or the
+        # nearer of the two when both sides are cut
+        distances = np.where(cut_vertically, np.where(cut_horizontally, np.minimum(by_height, by_width), by_width),
+                             by_height)
+
+        if self.lut is not None:
+            floor = self.lut.lookup(boxes[:, 3], frame_height)
+            on_floor = (boxes[:, 3] < frame_height - EDGE_MARGIN) & np.isfinite(floor)
+            distances = np.where(on_floor, floor, distances)
+        return distances.astype(np.float32)
+
+    def bearings(self, boxes, frame_shape):
+        """Horizontal angle of each box centre in degrees; negative is left of straight ahead."""
+        boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4)
+        camera = self._camera(frame_shape)
+        centers = (boxes[:, 0] + boxes[:, 2]) / 2.0
+        return np.degrees(np.arctan((centers - camera.cx) / camera.fx)).astype(np.float32)
+
+    def __call__(self, detections, frame_shape):
+        return self.distances(detections.boxes, detections.class_ids, detections.names, frame_shape)
+
+
+def load_estimator(path=CALIBRATION_PATH):
+    """Estimator using the saved calibration (and its LUT, if any) or nominal intrinsics."""
+    if not os.path.exists(path):
+        return DistanceEstimator()
+    with open(path) as f:
+        data = json.load(f)
+    intrinsics = CameraIntrinsics.load(path)
+    lut = None
+    if data.get("camera_height") and data.get("pitch_deg") is not None:
+        lut = GroundPlaneLUT.from_mount(intrinsics, data["camera_height"], data["pitch_deg"])
+    return DistanceEstimator(intrinsics, lut=lut)
+
+
+# Shared by every entry point
+estimator = load_estimator()
+
+
+def estimate_distances(detections, frame_shape):
+    """Distance in metres to every detection, with the shared calibrated estimator."""
+    return estimator(detections, frame_shape)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the camera for distance estimation.")
+    parser.add_argument("command", choices=("calibrate", "reference"))
+    parser.add_argument("--images", help="folder of chessboard photos (calibrate)")
+    parser.add_argument("--pattern", default="9x6", help="inner chessboard corners, e.g. 9x6")
+    parser.add_argument("--square", type=float, default=0.025, help="chessboard square size in metres")
+    parser.add_argument("--box-height", type=float, help="reference box height in pixels (reference)")
+    parser.add_argument("--distance", type=float, help="reference distance in metres (reference)")
+    parser.add_argument("--real-height", type=float, default=1.70, help="reference object height in metres")
+    parser.add_argument("--size", default="640x480", help="frame size for the reference mode")
+    parser.add_argument("--camera-height", type=float, help="fixed mount: lens height above the floor in metres")
+    parser.add_argument("--pitch", type=float, help="fixed mount: downward tilt in degrees")
+    parser.add_argument("--output", default=CALIBRATION_PATH)
+    args = parser.parse_args()
+
+    if args.command == "calibrate":
+        pattern = tuple(int(n) for n in args.pattern.split("x"))
+        paths = sorted(glob.glob(os.path.join(args.images, "*")))
+        intrinsics, rms = calibrate_chessboard(paths, pattern, args.square)
+        print(f"Reprojection error: {rms:.3f} px")
+    else:
+        width, height = (int(n) for n in args.size.split("x"))
+        intrinsics = calibrate_from_reference(args.box_height, args.distance, args.real_height, width, height)
+
+    extra = {}
+    if args.camera_height is not None and args.pitch is not None:
+        extra = {"camera_height": args.camera_height, "pitch_deg": args.pitch}
+    intrinsics.save(args.output, **extra)
+    print(f"Saved {intrinsics.to_dict()} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import glob
+import math
+import os
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+
+# Android thermal status (PowerManager.THERMAL_STATUS_*) -> share of the rate headroom kept
+THERMAL_SCALE = {0: 1.0, 1: 0.9, 2: 0.7, 3: 0.5, 4: 0.3, 5: 0.3, 6: 0.3}
+
+
+def android_hints():
+    """Battery level, charging state and thermal status from the Android system services."""
+    from jnius import autoclass
+    activity = autoclass('org.kivy.android.PythonActivity').mActivity
+    Context = autoclass('android.content.Context')
+    BatteryManager = autoclass('android.os.BatteryManager')
+    battery = activity.getSystemService(Context.BATTERY_SERVICE)
+    hints = {"battery": battery.getIntProperty(BatteryManager.BATTERY_PROPERTY_CAPACITY) / 100.0,
+             "charging": bool(battery.isCharging())}
+    power = activity.getSystemService(Context.POWER_SERVICE)
+    if hasattr(power, "getCurrentThermalStatus"):  # API 29+
+        hints["thermal"] = power.getCurrentThermalStatus()
+    return hints
+
+
+def linux_hints():
+    """Battery level and charging state from /sys/class/power_supply (laptops)."""
+    for path in glob.glob("/sys/class/power_supply/BAT*"):
+        with open(os.path.join(path, "capacity")) as f:
+            level = int(f.read().strip()) / 100.0
+        with open(os.path.join(path, "status")) as f:
+            charging = f.read().strip() in ("Charging", "Full")
+        return {"battery": level, "charging": charging}
+    return {}
+
+
+def device_hints():
+    """Whatever power and thermal hints this platform offers, or an empty dict."""
+    for source in (android_hints, linux_hints):
+        try:
+            return source()
+        except Exception:
+            continue
+    return {}
+
+
+class FrameGovernor:
+    """
+    Sets how often frames are processed from the current hazard level.
+
+    The hazard level (0 to 1) comes from the closest obstacle's distance and
+    how fast it is approaching (time to contact). With nothing around, the
+    rate drops to `min_fps` to save CPU and battery; as the hazard rises it
+    scales up to `max_fps`. Measured inference latency caps the rate at what
+    the detector can actually sustain, and CPU load, battery and thermal
+    hints scale the non-critical part of it down. A critical hazard ignores
+    the power hints.
+
+    The rate goes up immediately, so the frame right after a close obstacle
+    appears is already processed at the higher rate, and comes back down
+    gradually. Every decision from `observe`, with the inputs and the
+    limiting factor, is kept in `decisions` for tuning; a `boost` is only
+    kept there when it raises the rate.
+
+    Args:
+        min_fps (float): Rate with no hazard in view.
+        max_fps (float): Rate at full hazard.
+        safe_distance (float): Meters beyond which an obstacle adds no hazard.
+        danger_distance (float): Meters at which the proximity hazard is 1.
+        safe_ttc (float): Time to contact (seconds) beyond which approach speed adds no hazard.
+        danger_ttc (float): Time to contact at which the approach hazard is 1.
+        utilization (float): Share of the measured detector throughput the rate may use.
+        decay (float): Fraction of the gap to a lower target closed per decision.
+        hints (callable, optional): Returns a dict with any of `battery` (0-1), `charging`
+                                    and `thermal` (Android thermal status); polled every
+                                    `hint_interval` seconds.
+    """
+
+    def __init__(self, min_fps=2.0, max_fps=15.0, safe_distance=4.0, danger_distance=1.0, safe_ttc=4.0,
+                 danger_ttc=1.5, utilization=0.9, decay=0.2, hints=None, hint_interval=30.0, history=200):
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.safe_distance = safe_distance
+        self.danger_distance = danger_distance
+        self.safe_ttc = safe_ttc
+        self.danger_ttc = danger_ttc
+        self.utilization = utilization
+        self.decay = decay
+        self.hints = hints
+        self.hint_interval = hint_interval
+
+        self.fps = min_fps
+        self.hazard = 0.0
+        self.closest = math.inf
+        self.approach_speed = 0.0
+        self.latency = 0.0
+        self.cpu_load = 0.0
+        self.battery = None
+        self.charging = None
+        self.thermal = None
+        self.decisions = deque(maxlen=history)
+
+        self._last_closest = None
+        self._last_observed = None
+        self._last_frame = 0.0
+        self._last_hints = -math.inf
+        self._last_load = -math.inf
+        self._boost = (0.0, -math.inf)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+        metrics.gauge("governor_fps", lambda: self.fps)
+        metrics.gauge("governor_hazard_pct", lambda: self.hazard * 100.0)
+
+    @property
+    def interval(self):
+        return 1.0 / self.fps
+
+    def set_hints(self, battery=None, charging=None, thermal=None):
+        """Push power and thermal hints (e.g. from a Kivy battery callback)."""
+        if battery is not None:
+            self.battery = battery
+        if charging is not None:
+            self.charging = charging
+        if thermal is not None:
+            self.thermal = thermal
+
+    def observe(self, distances, latency=None, now=None):
+        """
+        Update the rate from one processed frame.
+
+        Args:
+            distances: Distances in meters of the obstacles in the frame.
+            latency (float, optional): Seconds the detector took on it.
+
+        Returns:
+            dict: The decision (also appended to `decisions`).
+        """
+        now = now if now is not None else time.monotonic()
+        closest = float(min(distances, default=math.inf))
+        with self._lock:
+            self._update_approach(closest, now)
+            if latency is not None:
+                self.latency = latency if not self.latency else self.latency + 0.3 * (latency - self.latency)
+            self._poll(now)
+            decision = self._decide(now)
+        if decision["fps"] > decision["previous_fps"]:
+            self._wake.set()  # Cut a running wait() short
+        return decision
+
+    def boost(self, hazard, now=None, hold=1.0):
+        """
+        Raise the hazard level from evidence without a distance, such as a blocked free path.
+
+        Takes effect at once and holds for `hold` seconds unless boosted again. It never
+        lowers the rate, so it can be called on every captured frame; the decay back down
+        happens in `observe`.
+        """
+        now = now if now is not None else time.monotonic()
+        with self._lock:
+            self._boost = (hazard, now + hold)
+            decision = self._decide(now, lower=False)
+        if decision["fps"] > decision["previous_fps"]:
+            self._wake.set()
+        return decision
+
+    def observe_packet(self, packet, estimate=None):
+        """Pipeline hook: observe an inferred `FramePacket`."""
+        from distance import estimate_distances
+        detections = packet.detections
+        distances = []
+        if detections is not None and len(detections):
+            distances = (estimate or estimate_distances)(detections, packet.frame.shape)
+        start, done = packet.stage_times.get("inference_start"), packet.stage_times.get("inference_done")
+        return self.observe(distances, done - start if start is not None and done is not None else None)
+
+    def due(self, now=None):
+        """True if a frame should be processed now; marks it as processed."""
+        now = now if now is not None else time.monotonic()
+        if now - self._last_frame < self.interval:
+            return False
+        self._last_frame = now
+        return True
+
+    def wait(self, stop_event=None):
+        """Sleep until the next frame is due. Returns early if the rate goes up or `stop_event` is set."""
+        while True:
+            delay = self._last_frame + self.interval - time.monotonic()
+            if delay <= 0 or (stop_event is not None and stop_event.is_set()):
+                break
+            self._wake.clear()
+            self._wake.wait(min(delay, 0.25))
+        self._last_frame = time.monotonic()
+
+    def _update_approach(self, closest, now):
+        # Approach speed of the closest obstacle, smoothed; a new or vanished obstacle resets it
+        if self._last_closest is not None and math.isfinite(closest) and math.isfinite(self._last_closest):
+            dt = now - self._last_observed
+            if dt > 0:
+                speed = max((self._last_closest - closest) / dt, 0.0)
+                self.approach_speed += 0.5 * (speed - self.approach_speed)
+        else:
+            self.approach_speed = 0.0
+        self.closest = closest
+        self._last_closest = closest
+        self._last_observed = now
+
+    def _poll(self, now):
+        if self.hints is not None and now - self._last_hints >= self.hint_interval:
+            self._last_hints = now
+            try:
+                self.set_hints(**self.hints())
+            except Exception as e:
+                print(f"Error reading device hints: {str(e)}")
+                self.hints = None
+        if now - self._last_load >= 1.0 and hasattr(os, "getloadavg"):
+            self._last_load = now
+            self.cpu_load = os.getloadavg()[0] / (os.cpu_count() or 1)
+
+    def _decide(self, now, lower=True):
+        proximity = (self.safe_distance - self.closest) / (self.safe_distance - self.danger_distance)
+        ttc = self.closest / self.approach_speed if self.approach_speed > 0.05 else math.inf
+        approach = (self.safe_ttc - ttc) / (self.safe_ttc - self.danger_ttc)
+        boost = self._boost[0] if now < self._boost[1] else 0.0
+        self.hazard = min(max(proximity, approach, boost, 0.0), 1.0)
+
+        # Power hints shrink the headroom above min_fps, unless the hazard is critical
+        scales = {"cpu": min(1.0, 0.9 / self.cpu_load) if self.cpu_load > 0.9 else 1.0,
+                  "battery": 1.0 if self.charging or self.battery is None
+                             else 0.5 if self.battery < 0.2 else 0.8 if self.battery < 0.5 else 1.0,
+                  "thermal": THERMAL_SCALE.get(self.thermal, 0.3) if self.thermal is not None else 1.0}
+        limited_by = "hazard" if self.hazard > 0 else "idle"
+        scale = 1.0
+        if self.hazard < 1.0:
+            scale = min(scales.values())
+            if scale < 1.0 and self.hazard > 0:
+                limited_by = min(scales, key=scales.get)
+        target = self.min_fps + self.hazard * (self.max_fps * scale - self.min_fps)
+
+        if self.latency > 0 and target > self.utilization / self.latency:
+            target = max(self.utilization / self.latency, self.min_fps)
+            limited_by = "latency"
+
+        previous = self.fps
+        # Up at once, down gradually
+        if target >= previous:
+            self.fps = target
+        elif lower:
+            self.fps = previous + self.decay * (target - previous)
+        decision = {"time": now, "fps": round(self.fps, 2), "previous_fps": round(previous, 2),
+                    "target_fps": round(target, 2), "hazard": round(self.hazard, 3),
+                    "closest": round(self.closest, 2) if math.isfinite(self.closest) else None,
+                    "approach_speed": round(self.approach_speed, 2),
+                    "ttc": round(ttc, 2) if math.isfinite(ttc) else None,
+                    "latency_ms": round(self.latency * 1000.0, 1), "cpu_load": round(self.cpu_load, 2),
+                    "battery": self.battery, "charging": self.charging, "thermal": self.thermal,
+                    "limited_by": limited_by}
+        if lower or self.fps != previous:
+            self.decisions.append(decision)
+        return decision
+
+    def status(self):
+        """Latest decision, or the idle state before any frame was observed."""
+        with self._lock:
+            if self.decisions:
+                return dict(self.decisions[-1])
+        return {"fps": self.fps, "hazard": self.hazard, "limited_by": "idle"}
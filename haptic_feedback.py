@@ -1,4 +1,358 @@
-import winsound
+"""
+Non-blocking haptic feedback.
 
-def trigger_haptic_feedback():
-    winsound.Beep(1000, 200)  # Frequency, Duration (milliseconds)
+`trigger_haptic_feedback(distance, bearing)` only records the newest
+obstacle state; a background writer turns it into a vibration pattern and
+sends it to the device. Bursts of triggers between two writes collapse into
+one frame, and an unchanged pattern is not sent again until the keepalive.
+
+Wearable frame (9 bytes, sent over serial):
+
+    "HV" | left u8 | right u8 | on u8 (x10 ms) | off u8 (x10 ms) | repeats u8 | reserved u8 | xor u8
+
+Intensities are 0-255 per motor; the pulse (`on` ms vibrating, `off` ms
+still) repeats `repeats` times, or until the next frame if 0. An all-zero
+pattern stops the motors.
+"""
+import functools
+import math
+import os
+import platform
+import struct
+import threading
+import time
+
+from metrics import metrics
+
+FRAME = struct.Struct("<2sBBBBBB")
+FRAME_MAGIC = b"HV"
+FRAME_SIZE = FRAME.size + 1  # Plus the checksum
+
+MAX_DISTANCE = 3.0   # Meters beyond which nothing vibrates
+MIN_DISTANCE = 0.5   # Meters at which vibration is strongest and continuous
+PAN_RANGE = 31.0     # Bearing in degrees that drives only one motor (half the lens FOV)
+
+
+class HapticPattern:
+    """Motor intensities and pulse timing for one obstacle state."""
+
+    def __init__(self, left=0, right=0, on_ms=0, off_ms=0, repeats=0):
+        self.left = left
+        self.right = right
+        self.on_ms = on_ms
+        self.off_ms = off_ms
+        self.repeats = repeats
+
+    @property
+    def silent(self):
+        return not (self.left or self.right)
+
+    def __eq__(self, other):
+        return isinstance(other, HapticPattern) and self.astuple() == other.astuple()
+
+    def astuple(self):
+        return self.left, self.right, self.on_ms, self.off_ms, self.repeats
+
+    def __repr__(self):
+        return "HapticPattern(left={}, right={}, on_ms={}, off_ms={}, repeats={})".format(*self.astuple())
+
+
+STOP = HapticPattern()
+
+
+def encode_pattern(distance, bearing=0.0, max_distance=MAX_DISTANCE, min_distance=MIN_DISTANCE):
+    """
+    Vibration pattern for an obstacle `distance` meters away at `bearing` degrees (negative is left).
+
+    Closer obstacles vibrate harder with shorter pauses, down to a continuous
+    buzz at `min_distance`. Straight ahead drives both motors; off to one side
+    the other motor fades out.
+    """
+    if distance is None or not math.isfinite(distance) or distance >= max_distance:
+        return STOP
+    strength = min(max((max_distance - distance) / (max_distance - min_distance), 0.0), 1.0)
+    intensity = 80 + 175 * strength
+    position = max(-1.0, min(1.0, bearing / PAN_RANGE))
+    left = int(round(intensity * min(1.0, 1.0 - position)))
+    right = int(round(intensity * min(1.0, 1.0 + position)))
+    off_ms = int(round(600 * (1.0 - strength) / 10.0)) * 10
+    return HapticPattern(left, right, on_ms=100, off_ms=off_ms)
+
+
+def pack_frame(pattern):
+    """Serialize `pattern` as one wearable frame."""
+    body = FRAME.pack(FRAME_MAGIC, pattern.left, pattern.right, min(pattern.on_ms // 10, 255),
+                      min(pattern.off_ms // 10, 255), pattern.repeats, 0)
+    return body + bytes([functools.reduce(lambda a, b: a ^ b, body)])
+
+
+def unpack_frames(data):
+    """Decode every complete, valid frame in `data`; returns `(patterns, leftover bytes)`."""
+    patterns = []
+    start = data.find(FRAME_MAGIC)
+    while start != -1 and len(data) - start >= FRAME_SIZE:
+        frame = data[start:start + FRAME_SIZE]
+        if functools.reduce(lambda a, b: a ^ b, frame[:-1]) == frame[-1]:
+            _, left, right, on, off, repeats, _ = FRAME.unpack(frame[:-1])
+            patterns.append(HapticPattern(left, right, on * 10, off * 10, repeats))
+            start += FRAME_SIZE
+        else:
+            start += 1  # Resynchronize on the next magic
+        start = data.find(FRAME_MAGIC, start)
+    leftover = data[start:] if start != -1 else data[-1:] if data.endswith(FRAME_MAGIC[:1]) else b""
+    return patterns, leftover
+
+
+class SerialBackend:
+    """Serial-attached wearable (pyserial). `port` may also be a pyserial URL such as "loop://"."""
+
+    def __init__(self, port, baudrate=115200):
+        import serial
+        self.serial = serial.serial_for_url(port, baudrate=baudrate, timeout=0, write_timeout=0.1)
+
+    def write(self, pattern):
+        self.serial.write(pack_frame(pattern))
+
+    def close(self):
+        self.serial.close()
+
+
+class PtyBackend:
+    """
+    Local pseudo-terminal standing in for the wearable.
+
+    Frames are written to the master side; `port` is the slave device, which
+    a device simulator can open like a serial port, and `read()` decodes what
+    arrived there.
+    """
+
+    def __init__(self):
+        import pty
+        import tty
+        self.master, self.slave = pty.openpty()
+        tty.setraw(self.slave)  # No newline translation or echo
+        self.port = os.ttyname(self.slave)
+        self._buffer = b""
+
+    def write(self, pattern):
+        os.write(self.master, pack_frame(pattern))
+
+    def read(self, timeout=0.5):
+        """Patterns received on the slave side within `timeout` seconds."""
+        import select
+        deadline = time.monotonic() + timeout
+        while True:
+            ready, _, _ = select.select([self.slave], [], [], max(deadline - time.monotonic(), 0))
+            if not ready:
+                break
+            self._buffer += os.read(self.slave, 4096)
+        patterns, self._buffer = unpack_frames(self._buffer)
+        return patterns
+
+    def close(self):
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class AndroidVibratorBackend:
+    """The phone's own vibrator (one motor, so the stronger side sets the amplitude). Needs API 26+."""
+
+    def __init__(self):
+        from jnius import autoclass
+        activity = autoclass('org.kivy.android.PythonActivity').mActivity
+        Context = autoclass('android.content.Context')
+        self.effect = autoclass('android.os.VibrationEffect')
+        self.vibrator = activity.getSystemService(Context.VIBRATOR_SERVICE)
+
+    def write(self, pattern):
+        if pattern.silent:
+            self.vibrator.cancel()
+            return
+        amplitude = max(1, max(pattern.left, pattern.right))
+        if not pattern.off_ms:
+            self.vibrator.vibrate(self.effect.createOneShot(1000, amplitude))
+            return
+        # Waveform repeats from index 1 until cancelled or replaced
+        self.vibrator.vibrate(self.effect.createWaveform([0, pattern.on_ms, pattern.off_ms],
+                                                         [0, amplitude, 0], 1))
+
+    def close(self):
+        self.vibrator.cancel()
+
+
+class WinsoundBackend:
+    """Desktop fallback on Windows: one short beep per pattern, pitch rising with intensity."""
+
+    def __init__(self):
+        import winsound
+        self.winsound = winsound
+
+    def write(self, pattern):
+        if not pattern.silent:
+            self.winsound.Beep(400 + 3 * max(pattern.left, pattern.right), pattern.on_ms)
+
+    def close(self):
+        pass
+
+
+class NullBackend:
+    """Keeps the last patterns, for machines without any haptic device."""
+
+    def __init__(self):
+        self.sent = []
+
+    def write(self, pattern):
+        self.sent.append(pattern)
+        del self.sent[:-100]
+
+    def close(self):
+        pass
+
+
+def open_backend(port=None):
+    """
+    Backend for this machine: HAPTIC_PORT (a serial device, pyserial URL or "pty"),
+    then the Android vibrator, then winsound on Windows, otherwise no device.
+    """
+    port = port or os.environ.get("HAPTIC_PORT")
+    if port == "pty":
+        backend = PtyBackend()
+        print(f"Haptic frames go to {backend.port}")
+        return backend
+    if port:
+        return SerialBackend(port, int(os.environ.get("HAPTIC_BAUD", "115200")))
+    for backend in (AndroidVibratorBackend, WinsoundBackend if platform.system() == "Windows" else None):
+        if backend is None:
+            continue
+        try:
+            return backend()
+        except Exception:
+            continue
+    return NullBackend()
+
+
+class HapticDriver:
+    """
+    Background writer that keeps the wearable in sync with the latest obstacle state.
+
+    `update()` never blocks: it replaces the pending state and wakes the
+    writer. The writer sends at most one pattern per `min_interval`, so a burst
+    of triggers merges into the newest pattern; an unchanged pattern is only
+    resent every `keepalive` seconds, and if no update arrives for `hold`
+    seconds the motors are stopped.
+
+    Args:
+        backend (object, optional): Has `write(pattern)` and `close()`. Defaults to `open_backend()`.
+        min_interval (float): Seconds between writes.
+        keepalive (float): Resend an unchanged pattern this often (wearables may time out).
+        hold (float): Stop vibrating this long after the last update.
+    """
+
+    def __init__(self, backend=None, min_interval=0.05, keepalive=1.0, hold=0.5):
+        self.backend = backend
+        self.min_interval = min_interval
+        self.keepalive = keepalive
+        self.hold = hold
+
+        self.updates = 0
+        self.writes = 0
+        self.merged = 0
+        self.errors = 0
+
+        self._pattern = STOP
+        self._updated_at = 0.0
+        self._dirty = False
+        self._sent = None
+        self._sent_at = 0.0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._writer, name="haptic-writer", daemon=True)
+        self._thread.start()
+
+    def update(self, distance, bearing=0.0):
+        """Set the obstacle state; the newest call wins."""
+        self.set_pattern(encode_pattern(distance, bearing))
+
+    def set_pattern(self, pattern):
+        with self._cond:
+            if self._dirty:
+                self.merged += 1
+            self._pattern = pattern
+            self._updated_at = time.monotonic()
+            self._dirty = True
+            self.updates += 1
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        self._thread.join(timeout=2.0)
+
+    def _next_pattern(self):
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                pattern = self._pattern
+                if not pattern.silent and now - self._updated_at >= self.hold:
+                    pattern = self._pattern = STOP  # Nothing reported the obstacle again
+                if pattern != self._sent or (not pattern.silent and now - self._sent_at >= self.keepalive):
+                    wait = self._sent_at + self.min_interval - now
+                    if wait <= 0:
+                        self._dirty = False
+                        return pattern
+                else:
+                    wait = None
+                    if not pattern.silent:
+                        wait = min(self._sent_at + self.keepalive, self._updated_at + self.hold) - now
+                    if self._dirty:
+                        self._dirty = False  # Same pattern again: nothing to send
+                self._cond.wait(wait)
+            return None
+
+    def _writer(self):
+        try:
+            if self.backend is None:
+                self.backend = open_backend()
+        except Exception as e:
+            print(f"Error opening haptic device: {str(e)}")
+            self.backend = NullBackend()
+
+        while True:
+            pattern = self._next_pattern()
+            if pattern is None:
+                break
+            try:
+                with metrics.timer("haptics"):
+                    self.backend.write(pattern)
+                self.writes += 1
+            except Exception as e:
+                self.errors += 1
+                print(f"Error in haptic feedback: {str(e)}")
+            with self._cond:
+                self._sent = pattern
+                self._sent_at = time.monotonic()
+
+        try:
+            self.backend.write(STOP)
+        except Exception:
+            pass
+        self.backend.close()
+
+
+_driver = None
+_driver_lock = threading.Lock()
+
+
+def get_driver():
+    """Shared haptic driver, started on first use."""
+    global _driver
+    with _driver_lock:
+        if _driver is None:
+            _driver = HapticDriver()
+        return _driver
+
+
+def trigger_haptic_feedback(distance=MIN_DISTANCE, bearing=0.0):
+    """Vibrate for an obstacle at `distance` meters and `bearing` degrees. Returns immediately."""
+    get_driver().update(distance, bearing)
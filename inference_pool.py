@@ -0,0 +1,311 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from detections import Detections
+
+
+class SharedFrameRing:
+    """
+    Fixed-size slots in one shared-memory block, for passing frames between processes.
+
+    The producer copies a frame into a free slot once; readers map the same
+    slot as a NumPy view, so the pixels are never pickled. Only the slot
+    index, shape and dtype travel through queues.
+
+    Args:
+        slots (int): Number of frames that can be in flight.
+        slot_bytes (int): Largest frame size in bytes.
+        name (str, optional): Attach to an existing ring instead of creating one.
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+
+    def write(self, slot, frame):
+        """Copy `frame` into `slot`; returns the `(shape, dtype)` needed to read it back."""
+        frame = np.asarray(frame)
+        if frame.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {frame.nbytes} bytes does not fit a {self.slot_bytes}-byte slot")
+        self.view(slot, frame.shape, frame.dtype)[...] = frame
+        return frame.shape, frame.dtype.str
+
+    def view(self, slot, shape, dtype):
+        return np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _worker_main(ring_name, slots, slot_bytes, tasks, results, source, model_kwargs, threads):
+    # One process per core: keep each worker's math libraries single-threaded
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "ONNX_THREADS"):
+        os.environ[var] = str(threads)
+
+    if source == "standin":
+        from standin_model import StandInModel
+        model = StandInModel(**model_kwargs)
+    else:
+        from model_registry import get_model
+        model = get_model(source=source)
+    names = model.names
+    results.put(("ready", list(names.values()) if isinstance(names, dict) else list(names)))
+
+    ring = SharedFrameRing(slots, slot_bytes, name=ring_name)
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            seq, slot, shape, dtype, bgr, size = task
+            try:
+                frame = ring.view(slot, shape, dtype)
+                if bgr:
+                    frame = frame[:, :, ::-1]
+                output = model(frame, size=size) if size else model(frame)
+                rows = np.asarray(output.xyxy[0], dtype=np.float32)
+                results.put((seq, slot, rows, None))
+            except Exception as e:
+                results.put((seq, slot, None, str(e)))
+    finally:
+        ring.close()
+
+
+class PoolResults:
+    """The `xyxy` and `names` of a YOLOv5 result, for frames run through `InferencePool.__call__`."""
+
+    def __init__(self, xyxy, names):
+        self.xyxy = xyxy
+        self.names = names
+
+
+class InferencePool:
+    """
+    Run the detector in worker processes so inference uses every core.
+
+    `submit(frame)` copies the frame into a free slot of a shared-memory ring
+    and queues only its slot index; workers run the model on a view of that
+    slot. Results come back through one queue as small box arrays and are
+    handed out by `get()` strictly in submission order. A slot is reused only
+    once its result has been taken, so when workers or the consumer fall
+    behind, `submit` blocks (backpressure) instead of queueing without bound.
+
+    The pool is also callable like the torch.hub model, `pool(img_or_list,
+    size=None)` with RGB images, for detectors such as `RoiDetector`. Each
+    call waits for its own frames, so many threads can share the pool this
+    way; don't mix it with `get()`/`imap()` on the same pool.
+
+    If a worker process dies, every wait raises `RuntimeError` instead of
+    blocking forever.
+
+    Args:
+        workers (int, optional): Worker processes. Defaults to the CPU count.
+        slots (int, optional): Frames in flight. Defaults to twice the workers.
+        max_frame_shape (tuple): Largest frame the ring must hold (uint8).
+        source (str, optional): Model backend (see model_registry). Defaults to `DETECTOR_MODEL`.
+        model_kwargs (dict, optional): StandInModel arguments when `source` is "standin".
+        threads_per_worker (int): Math library threads inside each worker.
+    """
+
+    def __init__(self, workers=None, slots=None, max_frame_shape=(720, 1280, 3), source=None, model_kwargs=None,
+                 threads_per_worker=1):
+        from model_registry import MODEL_SOURCE
+        self.workers = workers or os.cpu_count() or 1
+        self.slots = slots or 2 * self.workers
+        self.names = []
+
+        self.ring = SharedFrameRing(self.slots, int(np.prod(max_frame_shape)))
+        context = mp.get_context("spawn")  # fork is unsafe once torch or OpenCV threads exist
+        self._tasks = context.Queue()
+        self._results = context.Queue()
+        self._free = queue.Queue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+
+        self._next_seq = 0
+        self._next_out = 0
+        self._done = {}
+        self._ready = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self._processes = [
+            context.Process(target=_worker_main, name=f"inference-{i}", daemon=True,
+                            args=(self.ring.name, self.slots, self.ring.slot_bytes, self._tasks, self._results,
+                                  source or MODEL_SOURCE, model_kwargs or {}, threads_per_worker))
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+        self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+        self._collector.start()
+
+    @property
+    def in_flight(self):
+        return self.slots - self._free.qsize()
+
+    def _check_workers(self):
+        for process in self._processes:
+            if process.exitcode is not None:
+                raise RuntimeError(f"Inference worker {process.name} exited with code {process.exitcode}")
+
+    def _wait(self, predicate, timeout):
+        # Condition.wait_for that also gives up when a worker dies; call with self._cond held
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not predicate():
+            if self._closed:
+                return False
+            self._check_workers()
+            remaining = 0.5 if deadline is None else min(deadline - time.monotonic(), 0.5)
+            if remaining <= 0:
+                return False
+            self._cond.wait(remaining)
+        return True
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until every worker has loaded its model.
+
+        Raises:
+            RuntimeError: A worker exited, e.g. because its model failed to load.
+        """
+        with self._cond:
+            return self._wait(lambda: self._ready == self.workers, timeout)
+
+    def submit(self, frame, timeout=None, bgr=True, size=None):
+        """
+        Queue a frame and return its sequence number. Blocks while all slots are in flight.
+
+        Args:
+            bgr (bool): The frame is BGR (as OpenCV captures it) and is flipped for the model.
+            size (int, optional): Model input size; the model's default if omitted.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._closed:
+                raise RuntimeError("InferencePool is closed")
+            self._check_workers()
+            remaining = 0.5 if deadline is None else min(deadline - time.monotonic(), 0.5)
+            try:
+                slot = self._free.get(timeout=max(remaining, 0))
+                break
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise TimeoutError("No free frame slot: inference or its consumer is not keeping up") from None
+        try:
+            shape, dtype = self.ring.write(slot, frame)
+        except ValueError:
+            self._free.put(slot)
+            raise
+        with self._cond:
+            seq = self._next_seq
+            self._next_seq += 1
+        self._tasks.put((seq, slot, shape, dtype, bgr, size))
+        return seq
+
+    def get(self, timeout=None):
+        """
+        Return `(seq, Detections)` for the oldest unreturned frame, waiting for it if needed.
+
+        Raises:
+            TimeoutError: The result did not arrive in time.
+            RuntimeError: The worker failed on that frame, or a worker exited.
+        """
+        with self._cond:
+            seq = self._next_out
+            rows = self._take(seq, timeout)
+            self._next_out += 1
+        return seq, Detections.from_xyxy(rows, self.names)
+
+    def __call__(self, imgs, size=None):
+        """Run RGB images through the pool and wait for their results, like `model(imgs, size=size)`."""
+        batch = imgs if isinstance(imgs, (list, tuple)) else [imgs]
+        if self._ready < self.workers and not self.wait_ready():
+            raise RuntimeError("InferencePool is closed")
+        seqs = [self.submit(img, bgr=False, size=size) for img in batch]
+        with self._cond:
+            return PoolResults([self._take(seq) for seq in seqs], self.names)
+
+    def _take(self, seq, timeout=None):
+        # Pop a finished frame and free its slot; call with self._cond held
+        if not self._wait(lambda: seq in self._done, timeout):
+            if self._closed:
+                raise RuntimeError("InferencePool is closed")
+            raise TimeoutError(f"Frame {seq} is not ready")
+        slot, rows, error = self._done.pop(seq)
+        self._free.put(slot)
+        if error is not None:
+            raise RuntimeError(f"Inference failed on frame {seq}: {error}")
+        return rows
+
+    def imap(self, frames):
+        """Yield Detections for `frames` in order, keeping every slot busy."""
+        pending = 0
+        for frame in frames:
+            if pending == self.slots:
+                yield self.get()[1]
+                pending -= 1
+            self.submit(frame)
+            pending += 1
+        for _ in range(pending):
+            yield self.get()[1]
+
+    def _collect(self):
+        while True:
+            message = self._results.get()
+            if message is None:
+                return
+            if message[0] == "ready":
+                with self._cond:
+                    self.names = message[1]
+                    self._ready += 1
+                    self._cond.notify_all()
+                continue
+            seq, slot, rows, error = message
+            with self._cond:
+                self._done[seq] = (slot, rows, error)
+                self._cond.notify_all()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True  # Before the workers exit, so waiters see a close rather than a dead worker
+            self._cond.notify_all()
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5.0)
+            if process.is_alive():
+                process.terminate()
+                process.join(timeout=1.0)
+        if all(process.exitcode == 0 for process in self._processes):
+            self._results.put(None)
+            self._collector.join(timeout=5.0)
+        else:
+            # A worker that died mid-put may hold the results queue's lock: leave the
+            # (daemon) collector waiting and don't let exit block on flushing the queues
+            self._tasks.cancel_join_thread()
+            self._results.cancel_join_thread()
+        self.ring.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
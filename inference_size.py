@@ -0,0 +1,123 @@
+import time
+
+from detections import Detections, corridor_roi
+from metrics import metrics
+from model_registry import get_model
+
+# Model input sizes to choose from (YOLOv5 needs multiples of 32)
+DEFAULT_SIZES = (256, 320, 416, 512, 640)
+
+
+class InferenceSizePolicy:
+    """
+    Pick the model input size for each frame from a latency budget.
+
+    Measured latency per size is tracked as an exponential moving average and
+    sizes that have not been tried yet are estimated from the nearest measured
+    one, scaled by pixel count. The policy steps up to a larger size only
+    when its estimate fits comfortably (`headroom`) within the budget, and
+    steps down as soon as the current size goes over, so it settles instead
+    of oscillating.
+
+    Args:
+        budget_ms (float): Target inference latency per frame.
+        sizes (tuple): Allowed input sizes, smallest first.
+        initial (int, optional): Starting size. Defaults to the largest.
+        headroom (float): Fraction of the budget a larger size must fit in to be chosen.
+        smoothing (float): EMA weight of the newest measurement.
+    """
+
+    def __init__(self, budget_ms=100.0, sizes=DEFAULT_SIZES, initial=None, headroom=0.8, smoothing=0.3):
+        self.budget = budget_ms / 1000.0
+        self.sizes = tuple(sorted(sizes))
+        self.size = initial if initial in self.sizes else self.sizes[-1]
+        self.headroom = headroom
+        self.smoothing = smoothing
+        self.latency = {}
+
+    def estimate(self, size):
+        if size in self.latency:
+            return self.latency[size]
+        if not self.latency:
+            return None
+        known = min(self.latency, key=lambda s: abs(s - size))
+        return self.latency[known] * (size / known) ** 2
+
+    def record(self, size, seconds):
+        """Feed back how long inference at `size` took, and choose the next size."""
+        previous = self.latency.get(size)
+        self.latency[size] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+        self.size = self._choose()
+        return self.size
+
+    def pin(self, size):
+        """Always use `size`, e.g. for a model exported with a fixed input size."""
+        self.sizes = (size,)
+        self.size = size
+
+    def _choose(self):
+        index = self.sizes.index(self.size)
+        current = self.estimate(self.size)
+        if current is not None and current > self.budget and index > 0:
+            return self.sizes[index - 1]
+        if index + 1 < len(self.sizes):
+            larger = self.estimate(self.sizes[index + 1])
+            if larger is not None and larger <= self.budget * self.headroom:
+                return self.sizes[index + 1]
+        return self.size
+
+
+class RoiDetector:
+    """
+    Run the detector on a region of interest at native resolution.
+
+    The ROI (by default the app.py walking corridor) is cropped from the full
+    frame without resizing, inferred at the size chosen by `policy`, and the
+    boxes are shifted back to full-frame coordinates. A model with a fixed
+    input size (an ONNX export without `--dynamic` has a `fixed_size`) pins
+    the policy to that size, so its latencies are recorded against the size
+    that actually ran.
+
+    Args:
+        roi (tuple, optional): `(x1, y1, x2, y2)` as fractions of the frame, or None for the
+                               whole frame.
+        policy (InferenceSizePolicy, optional): Input size policy. Defaults to a 100 ms budget.
+        model (callable, optional): Detection model. Defaults to the shared YOLOv5 model.
+        bgr_to_rgb (bool): Flip channels before inference.
+    """
+
+    def __init__(self, roi=None, policy=None, model=None, bgr_to_rgb=True):
+        self.roi = roi
+        self.policy = policy or InferenceSizePolicy()
+        self.model = model
+        self.bgr_to_rgb = bgr_to_rgb
+        self.last_roi = None
+
+    def roi_pixels(self, frame_shape):
+        if self.roi is None:
+            height, width = frame_shape[:2]
+            return 0, 0, width, height
+        return corridor_roi(frame_shape, self.roi)
+
+    def __call__(self, frame):
+        model = self.model or get_model()
+        x1, y1, x2, y2 = self.last_roi = self.roi_pixels(frame.shape)
+        crop = frame[y1:y2, x1:x2]
+        if self.bgr_to_rgb:
+            crop = crop[:, :, ::-1]
+
+        fixed_size = getattr(model, "fixed_size", None)
+        if fixed_size and self.policy.sizes != (fixed_size,):
+            print(f"Model input size is fixed at {fixed_size}; the inference size policy is pinned to it")
+            self.policy.pin(fixed_size)
+
+        size = self.policy.size
+        start = time.monotonic()
+        results = model(crop, size=size)
+        elapsed = time.monotonic() - start
+        self.policy.record(size, elapsed)
+        metrics.observe("detect", elapsed)
+
+        # YOLOv5 scales boxes back to the crop it was given; shift them into the full frame
+        with metrics.timer("postprocess"):
+            return Detections.from_results(results, model.names).offset(x1, y1)
@@ -0,0 +1,88 @@
+import threading
+import time
+
+import numpy as np
+from kivy.clock import Clock
+from kivy.graphics.texture import Texture
+
+from metrics import metrics
+
+
+class VideoDisplay:
+    """
+    Show camera frames in a Kivy `Image` from any thread.
+
+    `show(frame)` only stores a reference to the newest frame and triggers
+    an update on the Kivy main thread; several frames arriving between two
+    screen refreshes collapse into one upload. The update reuses a single
+    BGR texture and blits the frame's memory directly, so there is no color
+    conversion, no `tobytes()` copy and no new texture per frame. Updates
+    are skipped while the widget is not visible.
+
+    Args:
+        image_widget (kivy.uix.image.Image): Where the video is shown.
+        max_fps (float, optional): Upload at most this often. Defaults to the Kivy frame rate.
+    """
+
+    def __init__(self, image_widget, max_fps=None):
+        self.image_widget = image_widget
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.texture = None
+        self.shown = 0
+        self.replaced = 0
+        self.hidden = 0
+
+        self._frame = None
+        self._pending = False
+        self._last_upload = 0.0
+        self._lock = threading.Lock()
+        # A trigger fires at most once per Kivy frame, however often it is called
+        self._trigger = Clock.create_trigger(self._update)
+
+    def show(self, frame):
+        """Queue `frame` (BGR, uint8) for display. Safe to call from any thread."""
+        with self._lock:
+            if self._frame is not None:
+                self.replaced += 1  # Superseded before the screen refreshed
+            self._frame = frame
+            if self._pending:
+                return
+            self._pending = True
+        self._trigger()
+
+    def visible(self):
+        widget = self.image_widget
+        return (widget.get_parent_window() is not None and widget.opacity > 0
+                and widget.width > 1 and widget.height > 1)
+
+    def _update(self, dt):
+        delay = self._last_upload + self.min_interval - time.monotonic()
+        if delay > 0:
+            Clock.schedule_once(self._update, delay)
+            return
+        with self._lock:
+            frame, self._frame = self._frame, None
+            self._pending = False
+        if frame is None:
+            return
+        if not self.visible():
+            self.hidden += 1
+            return
+
+        with metrics.timer("display"):
+            self._upload(frame)
+        self._last_upload = time.monotonic()
+        self.shown += 1
+
+    def _upload(self, frame):
+        height, width = frame.shape[:2]
+        if self.texture is None or self.texture.size != (width, height):
+            self.texture = Texture.create(size=(width, height), colorfmt='bgr')
+            # OpenCV rows run top to bottom, GL textures bottom to top
+            self.texture.flip_vertical()
+            self.image_widget.texture = self.texture
+
+        # Blit straight from the frame's memory (only non-contiguous views are copied)
+        buffer = np.ascontiguousarray(frame).reshape(-1)
+        self.texture.blit_buffer(memoryview(buffer), colorfmt='bgr', bufferfmt='ubyte')
+        self.image_widget.canvas.ask_update()
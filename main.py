@@ -1,28 +1,44 @@
 import threading
-import time
-import cv2
 from kivy.app import App
+from kivy.clock import Clock
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
+from kivy.uix.togglebutton import ToggleButton
 from kivy.uix.label import Label
 from kivy.uix.image import Image
-from kivy.graphics.texture import Texture
-from kivy.core.audio import SoundLoader
-import pyttsx3  # for text-to-speech
-from object_detection import detect_objects  # This function will use YOLOv5
-from voice_command import listen_for_command  # This will handle voice commands
+from speech_engine import SpeechEngine, PRIORITY_WARNING, PRIORITY_INFO, PRIORITY_STATUS  # Queued text-to-speech
+from inference_size import RoiDetector, InferenceSizePolicy  # YOLOv5 with a latency-budgeted input size
+from voice_command import BackgroundListener  # Offline voice commands on a background thread
 from haptic_feedback import trigger_haptic_feedback  # Handle feedback when obstacles are close
+from pipeline import NavigationPipeline  # Threaded capture -> inference -> feedback stages
+from tracker import TrackingDetector  # Stable object IDs so the detector can skip frames
+from motion_gate import MotionGatedDetector  # Skip the detector while the scene is static
+from model_registry import LazyModule, warm_up  # Shared model, loaded on first use
+from kivy_display import VideoDisplay  # Reused BGR texture, updated on the UI thread
+from distance import estimator as distance_estimator  # Calibrated distances from per-class sizes
+from session_recorder import recorder_from_env  # Optional session recording (NAV_RECORD_DIR)
+from frame_governor import FrameGovernor, device_hints  # Frame rate from hazard level, load and battery
+from metrics import metrics  # Per-stage timings, also served by app.py at /metrics
+from audio_cues import AudioCueEngine  # Preloaded alert sound, played by one mixer thread
+
+# OpenCV is imported on first use so the window appears sooner
+cv2 = LazyModule("cv2")
 
 # Initialize the navigation state
 navigation_running = False
 
-# Simple distance estimation for object proximity (using a hypothetical conversion factor to meters)
-def estimate_distance(center_x, center_y, frame_width, frame_height, conversion_factor=0.05):
-    # Using a basic proportional method based on frame center and a conversion factor for meters
-    distance_pixels = ((frame_width / 2 - center_x) ** 2 + (frame_height / 2 - center_y) ** 2) ** 0.5
-    distance_meters = distance_pixels * conversion_factor
-    return distance_meters
+# Results older than this (seconds since capture) are skipped instead of announced
+MAX_FEEDBACK_AGE = 1.5
 
+# At the governor's full rate, run YOLOv5 on every Nth frame and carry tracked objects forward
+# in between; as the governor slows the frames down, N falls to 1
+DETECT_EVERY = 3
+
+# Latency budget per inference; the model input size is picked to stay within it
+INFERENCE_BUDGET_MS = 150
+
+# Obstacles closer than this (meters) drive the haptic motors
+HAPTIC_DISTANCE = 1.0
 
 class NavigationApp(BoxLayout):
     def __init__(self, **kwargs):
@@ -36,6 +52,7 @@ class NavigationApp(BoxLayout):
         # Create video feed section
         self.image_widget = Image(size_hint=(1, 0.7))
         self.add_widget(self.image_widget)
+        self.video = VideoDisplay(self.image_widget)
 
         # Create the bottom section with control buttons
         control_layout = BoxLayout(size_hint=(1, 0.2), orientation='horizontal')
@@ -46,11 +63,25 @@ class NavigationApp(BoxLayout):
         control_layout.add_widget(self.start_button)
         control_layout.add_widget(self.stop_button)
 
+        # Debug overlay: shows per-stage timings under the status text while pressed
+        self.debug_button = ToggleButton(text="Debug", size_hint=(0.4, 1), on_press=self.toggle_debug_overlay)
+        control_layout.add_widget(self.debug_button)
+        self.debug_overlay = None
+
         self.add_widget(control_layout)
 
+        self.pipeline = None
+        self.tracking = None
+        # Infer rarely in empty corridors, at full rate as soon as something is close or approaching
+        self.governor = FrameGovernor(hints=device_hints)
+
+        # One long-lived speech worker and one audio cue mixer for the whole session
+        self.speech = SpeechEngine()
+        self.cues = AudioCueEngine()
+        metrics.gauge("queued_announcements", lambda: self.speech.pending)
+
         # Start voice command listener in a separate thread
-        self.voice_thread = threading.Thread(target=self.listen_for_voice_commands, daemon=True)
-        self.voice_thread.start()
+        self.voice_listener = BackgroundListener(on_command=self.on_voice_command).start()
 
     def start_navigation(self, instance):
         if self.status_label:
@@ -64,83 +95,138 @@ class NavigationApp(BoxLayout):
             self.status_label.text = "Navigation Stopped"
         global navigation_running
         navigation_running = False
+        if self.pipeline:
+            self.pipeline.stop()
 
     def run_navigation(self):
-        cap = cv2.VideoCapture(0)  # Open the camera
-        if not cap.isOpened():
-            self.provide_feedback("Camera not accessible!")
-            return  # Exit if the camera is not available
-
-        while navigation_running:
-            ret, frame = cap.read()
-            if not ret:
-                self.provide_feedback("Error in video feed!")
-                continue  # Skip the current iteration and try again
-
-            # Resize frame for efficient processing
-            frame_resized = cv2.resize(frame, (640, 480))
-
-            # Detect objects using YOLOv5
-            objects = detect_objects(frame_resized)
-
-            # Process objects and give feedback for each detected object
-            detected_objects = []
-            for obj_name, conf, center_x, center_y in objects:
-                if conf > 0.5:  # If confidence is above 50%
-                    detected_objects.append(obj_name)
-                    # Calculate distance from the center of the frame in meters
-                    distance = estimate_distance(center_x, center_y, frame_resized.shape[1], frame_resized.shape[0])
-                    
-                    if distance < 1.0:  # If the obstacle is close (within 1 meter)
-                        self.provide_feedback(f"Warning! {obj_name} is very close, less than 1 meter.")
-                        trigger_haptic_feedback()  # Trigger haptic feedback
-                    else:
-                        self.provide_feedback(f"{obj_name} detected at a distance of {distance:.2f} meters.")
-
-            # Provide feedback for all detected objects
-            if detected_objects:
-                self.provide_feedback(f"Objects detected: {', '.join(detected_objects)}.")
+        self.detector = RoiDetector(policy=InferenceSizePolicy(budget_ms=INFERENCE_BUDGET_MS))
+        self.gated = MotionGatedDetector(lambda frame: self.detector(frame).with_confidence(0.5))
+        self.tracking = TrackingDetector(self.gated, detect_every=self.detect_every)
+        # Capture, detection and feedback each run on their own thread so a long
+        # spoken sentence never holds the camera
+        self.pipeline = NavigationPipeline(
+            open_capture=lambda: cv2.VideoCapture(0),
+            infer=self.detect_frame,
+            feedback=self.handle_detections,
+            display=lambda packet: self.display_video(packet.frame),
+            max_frame_age=MAX_FEEDBACK_AGE,
+            recorder=recorder_from_env(),
+            governor=self.governor,
+        )
+        self.pipeline.run()
+        if self.pipeline.recorder is not None:
+            self.pipeline.recorder.close()
+        if self.pipeline.error and navigation_running:
+            self.provide_feedback(self.pipeline.error, PRIORITY_WARNING)
+        print(self.pipeline.latency_report())
+        print(f"Motion gate: {self.gated.gate.stats()}")
+        print(f"Frame governor: {self.governor.status()}")
+
+    def detect_every(self):
+        # The governor already skips frames when nothing is close; don't skip again on top of it
+        return max(1, round(DETECT_EVERY * self.governor.fps / self.governor.max_fps))
+
+    def detect_frame(self, frame):
+        # Detect on the native camera frame; the size policy sets the model input size
+        return self.tracking(frame)
+
+    def handle_detections(self, packet):
+        frame, detections = packet.frame, packet.detections
+        self.update_haptics(detections, frame.shape)
+
+        # Only announce objects that appeared, got closer or left since the last feedback
+        update = self.tracking.drain()
+        if not update:
+            return
+        tracks = update.appeared + update.closer
+
+        # Distance in meters from the camera calibration and each class's typical size, for all objects at once
+        boxes = [track.box for track in tracks]
+        distances = distance_estimator.distances(boxes, [track.class_id for track in tracks], detections.names,
+                                                 frame.shape)
+
+        # Give feedback for each new or approaching object
+        for track, distance in zip(tracks, distances):
+            if distance < 1.0:  # If the obstacle is close (within 1 meter)
+                self.provide_feedback(f"Warning! {track.label} is very close, less than 1 meter.", PRIORITY_WARNING)
+            elif track in update.closer:
+                self.provide_feedback(f"{track.label} is getting closer, {distance:.2f} meters.")
             else:
-                self.provide_feedback("No obstacles detected.")
+                self.provide_feedback(f"{track.label} detected at a distance of {distance:.2f} meters.")
 
-            # Display the video feed in the Kivy window
-            self.display_video(frame_resized)
+        for track in update.disappeared:
+            self.provide_feedback(f"{track.label} is no longer in view.", PRIORITY_STATUS)
 
-            time.sleep(0.1)  # Small delay between frames
+        # Provide feedback for all tracked objects when the scene changed
+        if update.appeared or update.disappeared:
+            detected_objects = detections.labels
+            if detected_objects:
+                self.provide_feedback(f"Objects detected: {', '.join(detected_objects)}.", PRIORITY_STATUS)
+            else:
+                self.provide_feedback("No obstacles detected.", PRIORITY_STATUS)
+
+    def update_haptics(self, detections, frame_shape):
+        # Every feedback pass refreshes the motors for the closest tracked obstacle, since the
+        # haptic driver stops them when it is not told again; the writer thread does the I/O
+        distances = distance_estimator(detections, frame_shape) if len(detections) else []
+        if not len(distances) or distances.min() >= HAPTIC_DISTANCE:
+            trigger_haptic_feedback(None)
+            return
+        bearing = distance_estimator.bearings(detections.closest(distances).boxes, frame_shape)[0]
+        trigger_haptic_feedback(float(distances.min()), float(bearing))
 
     def display_video(self, frame):
-        # Convert the frame from BGR to RGB
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        
-        # Convert the frame to texture and update the image widget
-        texture = Texture.create(size=(frame.shape[1], frame.shape[0]), colorfmt='rgb')
-        texture.blit_buffer(frame_rgb.tobytes(), colorfmt='rgb', bufferfmt='ubyte')
-        self.image_widget.texture = texture
-
-    def provide_feedback(self, text):
-        # Text-to-Speech feedback
-        engine = pyttsx3.init()
-        engine.say(text)
-        engine.runAndWait()
-
-        # Optional: Play sound as additional feedback
-        sound = SoundLoader.load('alert_sound.wav')  # Load sound for feedback
-        if sound:
-            sound.play()
-
-    def listen_for_voice_commands(self):
-        # Continuously listen for voice commands in a separate thread
-        while True:
-            command = listen_for_command()  # Call the function to listen for voice commands
-            if command:
-                # If the command is "detect", provide feedback about the obstacles
-                if 'detect' in command.lower() and navigation_running:
-                    self.provide_feedback("Detecting obstacles...")
-                    # You can also trigger a check to call detect_objects manually if needed
+        # Called on the navigation thread: hand the frame to the UI thread, which uploads
+        # the newest one at most once per screen refresh
+        self.video.show(frame)
+
+    def toggle_debug_overlay(self, instance):
+        # Releasing the button also switches instrumentation off, so it costs nothing
+        if instance.state == 'down':
+            metrics.enable(True)
+            self.debug_overlay = Clock.schedule_interval(self.update_debug_overlay, 0.5)
+        else:
+            metrics.enable(False)
+            if self.debug_overlay is not None:
+                self.debug_overlay.cancel()
+                self.debug_overlay = None
+            self.status_label.text = self.status_label.text.split("\n")[0]
+
+    def update_debug_overlay(self, dt):
+        status = self.status_label.text.split("\n")[0]
+        self.status_label.text = f"{status}\n{metrics.summary()}"
+
+    def provide_feedback(self, text, priority=PRIORITY_INFO):
+        # Text-to-Speech feedback, queued so the caller never waits for the sentence
+        queued = self.speech.say(text, priority)
+
+        # Optional: Play sound as additional feedback (not again for merged duplicates)
+        if queued:
+            self.cues.play("alert", priority)
+
+    def on_voice_command(self, command, transcript):
+        # Commands arrive on the listener thread; widgets must be updated on the UI thread
+        Clock.schedule_once(lambda dt: self.handle_voice_command(command))
+
+    def handle_voice_command(self, command):
+        if command == 'start' and not navigation_running:
+            self.start_navigation(None)
+        elif command == 'stop' and navigation_running:
+            self.stop_navigation(None)
+        elif command in ('detect', 'what_is_in_front') and navigation_running:
+            # Describe the latest tracked scene instead of waiting for a new detection
+            packet = self.pipeline.latest_packet if self.pipeline else None
+            labels = packet.detections.labels if packet is not None else []
+            if labels:
+                self.provide_feedback(f"Objects detected: {', '.join(labels)}.")
+            else:
+                self.provide_feedback("No obstacles detected.")
 
 
 class MainApp(App):
     def build(self):
+        # Load the model and run one inference in the background while the UI comes up
+        warm_up()
         return NavigationApp()
 
 
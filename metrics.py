@@ -0,0 +1,177 @@
+import bisect
+import os
+import threading
+import time
+
+# Latency histogram bucket bounds in seconds (Prometheus `le` labels)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    """Cumulative latency histogram for one stage, plus the last observed value."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.last = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+            self.last = seconds
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class _NullTimer:
+    """Shared do-nothing timer handed out while metrics are disabled."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, registry, stage):
+        self.registry = registry
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Low-overhead stage timers and counters for the navigation hot path.
+
+    `timer(stage)` is a context manager that records the block's duration in
+    the stage's histogram; `count(name)` bumps a counter; `gauge(name, read)`
+    registers a callable that is read only when metrics are exported. When
+    disabled, `timer` returns a shared no-op object and `observe`/`count`
+    return after one attribute check, so instrumented code costs close to
+    nothing. Metrics can be switched on and off at any time.
+
+    Args:
+        enabled (bool): Whether to record anything.
+        prefix (str): Prefix for exported metric names.
+        sampler (callable, optional): `sampler(stage, seconds)` also gets every observation,
+                                      e.g. for exact percentiles in benchmarks.
+    """
+
+    def __init__(self, enabled=True, prefix="nav", sampler=None):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.sampler = sampler
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self._lock = threading.Lock()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        return self.enabled
+
+    def timer(self, stage):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram())
+        histogram.observe(seconds)
+        if self.sampler is not None:
+            self.sampler(stage, seconds)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def gauge(self, name, read):
+        """Register `read()` as the current value of `name`; it is called at export time."""
+        with self._lock:
+            self.gauges[name] = read
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def _items(self):
+        with self._lock:
+            return sorted(self.stages.items()), sorted(self.counters.items()), list(self.gauges.items())
+
+    def _gauge_values(self, gauges):
+        values = {}
+        for name, read in sorted(gauges):
+            try:
+                values[name] = float(read())
+            except Exception:
+                continue
+        return values
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        name = f"{self.prefix}_stage_seconds"
+        lines = [f"# HELP {self.prefix}_metrics_enabled Whether instrumentation is recording.",
+                 f"# TYPE {self.prefix}_metrics_enabled gauge",
+                 f"{self.prefix}_metrics_enabled {int(self.enabled)}",
+                 f"# HELP {name} Time spent in each navigation stage.",
+                 f"# TYPE {name} histogram"]
+        stages, counters, gauges = self._items()
+        for stage, histogram in stages:
+            counts, total, count = histogram.snapshot()
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+            lines.append(f'{name}_count{{stage="{stage}"}} {count}')
+
+        for counter, value in counters:
+            lines.append(f"# TYPE {self.prefix}_{counter}_total counter")
+            lines.append(f"{self.prefix}_{counter}_total {value}")
+        for gauge, value in self._gauge_values(gauges).items():
+            lines.append(f"# TYPE {self.prefix}_{gauge} gauge")
+            lines.append(f"{self.prefix}_{gauge} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """One-line digest for on-screen debug overlays, e.g. "inference 42ms | display 3ms"."""
+        stages, counters, gauges = self._items()
+        parts = [f"{stage} {histogram.last * 1000:.0f}ms" for stage, histogram in stages]
+        parts += [f"{counter} {value}" for counter, value in counters]
+        parts += [f"{gauge} {value:.0f}" for gauge, value in self._gauge_values(gauges).items()]
+        return " | ".join(parts) if parts else "no metrics yet"
+
+
+# Shared registry; set NAV_METRICS=0 to start with instrumentation off
+metrics = Metrics(enabled=os.environ.get("NAV_METRICS", "1") != "0")
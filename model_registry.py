@@ -0,0 +1,166 @@
+import importlib
+import os
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Local weights are preferred over the network; override with YOLO_WEIGHTS
+DEFAULT_WEIGHTS = os.environ.get("YOLO_WEIGHTS", os.path.join(ROOT_DIR, "assets", "models", "yolov5s.pt"))
+# A checkout of ultralytics/yolov5 (or torch.hub's cached copy) lets us load without GitHub
+YOLOV5_REPO = os.environ.get("YOLOV5_REPO")
+# Detector backend: "yolov5" (default, torch), "onnx" (ONNX Runtime on the CPU, see
+# onnx_backend.py) or "standin" for the offline deterministic model
+MODEL_SOURCE = os.environ.get("DETECTOR_MODEL", "yolov5")
+
+
+class LazyModule:
+    """Module proxy that imports on first attribute access, e.g. `cv2 = LazyModule("cv2")`."""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+
+def _process_start_time():
+    # Wall-clock time the process started, so startup includes interpreter and import time
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return time.time()
+
+
+PROCESS_START = _process_start_time()
+startup_marks = {}
+
+
+def mark_startup(event):
+    """Record (once) how many seconds after process start `event` happened."""
+    if event not in startup_marks:
+        startup_marks[event] = time.time() - PROCESS_START
+        print(f"Startup: {event} at +{startup_marks[event]:.2f}s")
+    return startup_marks[event]
+
+
+_models = {}
+_lock = threading.Lock()
+
+
+def _find_hub_repo():
+    if YOLOV5_REPO and os.path.isdir(YOLOV5_REPO):
+        return YOLOV5_REPO
+    import torch
+    cached = os.path.join(torch.hub.get_dir(), "ultralytics_yolov5_master")
+    return cached if os.path.isdir(cached) else None
+
+
+def _load_yolov5(name, weights):
+    import torch
+    repo = _find_hub_repo()
+    if repo and weights and os.path.exists(weights):
+        return torch.hub.load(repo, 'custom', path=weights, source='local')
+    if repo:
+        return torch.hub.load(repo, name, pretrained=True, source='local')
+    if weights and os.path.exists(weights):
+        return torch.hub.load('ultralytics/yolov5', 'custom', path=weights)
+    return torch.hub.load('ultralytics/yolov5', name, pretrained=True)
+
+
+def _load_onnx(name, weights):
+    from onnx_backend import load_onnx_model
+    return load_onnx_model(name, weights)
+
+
+def _load_standin(name, weights):
+    from standin_model import StandInModel
+    return StandInModel()
+
+
+# Detector backends by source name. A backend loader takes `(name, weights)` and returns a
+# callable `model(img_or_list, size=None)` whose result has one `(N, 6)` xyxy/conf/cls array per
+# image in `.xyxy`, plus a `names` attribute, like the YOLOv5 torch.hub model.
+BACKENDS = {
+    "yolov5": _load_yolov5,
+    "onnx": _load_onnx,
+    "standin": _load_standin,
+}
+
+
+def register_backend(source, loader):
+    """Make `DETECTOR_MODEL=<source>` load models with `loader(name, weights)`."""
+    BACKENDS[source] = loader
+
+
+def get_model(name='yolov5s', weights=DEFAULT_WEIGHTS, source=None):
+    """
+    Return the shared detection model, loading it on first use.
+
+    Every module shares one instance per `(source, name)`. Loading tries, in
+    order: a local yolov5 checkout with local weights, the checkout with its
+    default weights, then torch.hub over the network.
+
+    Args:
+        name (str): YOLOv5 variant.
+        weights (str): Path to local `.pt` weights.
+        source (str, optional): A key of `BACKENDS`. Defaults to `DETECTOR_MODEL`.
+    """
+    source = source or MODEL_SOURCE
+    key = (source, name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            if source not in BACKENDS:
+                raise ValueError(f"Unknown detector backend {source!r}; expected one of {sorted(BACKENDS)}")
+            start = time.monotonic()
+            model = BACKENDS[source](name, weights)
+            _models[key] = model
+            print(f"Loaded {source}:{name} in {time.monotonic() - start:.2f}s")
+            mark_startup("model_loaded")
+    return model
+
+
+def is_loaded(name='yolov5s', source=None):
+    return (source or MODEL_SOURCE, name) in _models
+
+
+def class_names(name='yolov5s', source=None):
+    """Class names without forcing a model load (COCO order until the model is loaded)."""
+    source = source or MODEL_SOURCE
+    model = _models.get((source, name))
+    if model is not None:
+        names = model.names
+        return list(names.values()) if isinstance(names, dict) else list(names)
+    from standin_model import COCO_NAMES
+    return list(COCO_NAMES)
+
+
+def warm_up(name='yolov5s', background=True, frame_shape=(480, 640, 3)):
+    """Load the model and run one dummy inference so the first real frame is fast."""
+    def run():
+        try:
+            import numpy as np
+            model = get_model(name)
+            model(np.zeros(frame_shape, dtype=np.uint8))
+            mark_startup("model_warm")
+        except Exception as e:
+            print(f"Error warming up model: {str(e)}")
+
+    if not background:
+        run()
+        return None
+    thread = threading.Thread(target=run, name="model-warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,100 @@
+import time
+
+import numpy as np
+
+from model_registry import LazyModule
+
+cv2 = LazyModule("cv2")
+
+
+class MotionGate:
+    """
+    Cheap check for whether a frame differs enough from the last detected one.
+
+    Frames are reduced to a small grayscale thumbnail and compared with the
+    thumbnail of the frame the detector last ran on, so slow drift adds up
+    instead of slipping under the threshold one frame at a time. Two signals
+    are used: the fraction of pixels that changed (frame differencing) and
+    the global shift between the thumbnails (phase correlation, which catches
+    the camera turning even when the scene itself is uniform).
+
+    Args:
+        size (tuple): Thumbnail `(width, height)`.
+        pixel_threshold (int): Per-pixel gray-level change that counts as "changed".
+        changed_fraction (float): Fraction of changed pixels that triggers a detection.
+        max_shift (float): Global shift in thumbnail pixels that triggers a detection.
+        max_age (float): Seconds after which a detection is forced regardless of motion.
+    """
+
+    def __init__(self, size=(64, 48), pixel_threshold=18, changed_fraction=0.02, max_shift=1.5, max_age=2.0):
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.changed_fraction = changed_fraction
+        self.max_shift = max_shift
+        self.max_age = max_age
+
+        self.checks = 0
+        self.detections = 0
+        self.skipped = 0
+        self.last_changed = 0.0
+        self.last_shift = 0.0
+
+        self._reference = None
+        self._reference_time = 0.0
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.checks if self.checks else 0.0
+
+    def thumbnail(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        return cv2.resize(gray, self.size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def should_detect(self, frame, now=None):
+        """Return True if the detector needs to run on `frame`; updates the counters."""
+        now = now if now is not None else time.monotonic()
+        self.checks += 1
+        thumb = self.thumbnail(frame)
+
+        if self._reference is None or now - self._reference_time >= self.max_age:
+            return self._accept(thumb, now)
+
+        diff = np.abs(thumb - self._reference)
+        self.last_changed = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+        if self.last_changed >= self.changed_fraction:
+            return self._accept(thumb, now)
+
+        (dx, dy), _ = cv2.phaseCorrelate(self._reference, thumb)
+        self.last_shift = float(np.hypot(dx, dy))
+        if self.last_shift >= self.max_shift:
+            return self._accept(thumb, now)
+
+        self.skipped += 1
+        return False
+
+    def _accept(self, thumb, now):
+        self._reference = thumb
+        self._reference_time = now
+        self.detections += 1
+        return True
+
+    def reset(self):
+        self._reference = None
+
+    def stats(self):
+        return {"checks": self.checks, "detections": self.detections, "skipped": self.skipped,
+                "skip_ratio": self.skip_ratio}
+
+
+class MotionGatedDetector:
+    """Wraps `detect(frame)` and reuses the last result while the scene is static."""
+
+    def __init__(self, detect, gate=None):
+        self.detect = detect
+        self.gate = gate or MotionGate()
+        self.last_result = None
+
+    def __call__(self, frame):
+        if self.gate.should_detect(frame) or self.last_result is None:
+            self.last_result = self.detect(frame)
+        return self.last_result
@@ -22,12 +22,17 @@
 #     return objects
 
 
-import torch
+import threading
+import time
+from concurrent.futures import Future
 
-# Load the YOLOv5 model pre-trained on the COCO dataset
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s', pretrained=True)
+# The YOLOv5 model pre-trained on the COCO dataset, shared and loaded on first use
+from model_registry import get_model
+from detections import Detections
+from metrics import metrics
 
-def detect_objects(frame):
+
+def detect(frame):
     """
     Detect objects in a given frame using YOLOv5.
 
@@ -35,21 +40,146 @@ def detect_objects(frame):
         frame (numpy.ndarray): The input image frame (BGR format).
 
     Returns:
-        List[Tuple[str, float, int, int]]: A list of detected objects with their names,
-                                           confidence scores, and coordinates.
+        Detections: Array-backed boxes, confidences and class ids.
     """
+    detector = get_model()
+
     # Convert the frame from BGR to RGB for YOLOv5
     frame_rgb = frame[:, :, ::-1]
 
     # Perform inference using the model
-    results = model(frame_rgb)
+    with metrics.timer("detect"):
+        results = detector(frame_rgb)
+    with metrics.timer("postprocess"):
+        return Detections.from_xyxy(results.xyxy[0], detector.names)
+
+
+def detect_objects(frame):
+    """
+    Detect objects in a given frame using YOLOv5.
+
+    Args:
+        frame (numpy.ndarray): The input image frame (BGR format).
+
+    Returns:
+        List[Tuple[str, float, int, int]]: A list of detected objects with their names,
+                                           confidence scores, and coordinates.
+    """
+    return detect(frame).to_tuples()
+
+
+def detect_objects_batch(frames, detector=None):
+    """
+    Detect objects in several frames with a single forward pass.
+
+    Args:
+        frames (List[numpy.ndarray]): Input image frames (BGR format), any sizes.
+        detector (callable, optional): Model to use instead of the shared YOLOv5 model.
+
+    Returns:
+        List[Detections]: One result per frame, in the same order as `frames`.
+    """
+    if not frames:
+        return []
+    detector = detector or get_model()
+
+    # YOLOv5 letterboxes a list of images into one batch tensor
+    results = detector([frame[:, :, ::-1] for frame in frames])
+    return [Detections.from_xyxy(rows, detector.names) for rows in results.xyxy]
+
+
+class MicroBatcher:
+    """
+    Collect frames from many callers into one batched forward pass.
+
+    A batch is flushed as soon as it holds `max_batch_size` frames or the oldest
+    frame in it has waited `max_wait` seconds, whichever comes first. Each caller
+    gets a `Future` that resolves to the detections for its own frame.
+
+    Args:
+        detect_batch (callable, optional): `detect_batch(frames) -> list of results`.
+                                           Defaults to `detect_objects_batch`.
+        max_batch_size (int): Largest number of frames per forward pass.
+        max_wait (float): Longest time in seconds a frame waits for a batch to fill.
+    """
+
+    def __init__(self, detect_batch=None, max_batch_size=8, max_wait=0.01):
+        self.detect_batch = detect_batch or detect_objects_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+
+        self.batches = 0
+        self.frames = 0
+
+        self._pending = []
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._worker, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def mean_batch_size(self):
+        return self.frames / self.batches if self.batches else 0.0
+
+    def submit(self, frame):
+        """Queue a frame and return a Future for its detections."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("MicroBatcher is closed")
+            self._pending.append((time.monotonic(), frame, future))
+            self._cond.notify()
+        return future
+
+    def detect(self, frame, timeout=None):
+        """Blocking drop-in for `detect_objects` that shares forward passes with other callers."""
+        return self.submit(frame).result(timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                if self._closed:
+                    return None
+                self._cond.wait()
+
+            # Wait for the batch to fill, but never past the oldest frame's deadline
+            deadline = self._pending[0][0] + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
 
-    # Parse the results
-    detections = []
-    for *box, conf, cls in results.xyxy[0]:  # Iterate through detections
-        x_center = int((box[0] + box[2]) / 2)  # X center of the bounding box
-        y_center = int((box[1] + box[3]) / 2)  # Y center of the bounding box
-        name = model.names[int(cls)]  # Class name
-        detections.append((name, float(conf), x_center, y_center))
+            # Skip frames whose callers cancelled while waiting
+            live = [(frame, future) for _, frame, future in batch if future.set_running_or_notify_cancel()]
+            if not live:
+                continue
+            frames = [frame for frame, _ in live]
+            futures = [future for _, future in live]
+            try:
+                results = self.detect_batch(frames)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
 
-    return detections
+            self.batches += 1
+            self.frames += len(frames)
+            for future, result in zip(futures, results):
+                future.set_result(result)
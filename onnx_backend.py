@@ -0,0 +1,351 @@
+"""
+ONNX Runtime CPU backend for the YOLOv5 detector.
+
+Select it with `DETECTOR_MODEL=onnx` (see model_registry); callers keep
+using `detect_objects` / `RoiDetector` unchanged. One-time setup:
+
+    python onnx_backend.py export                      # yolov5s.pt -> yolov5s.onnx
+    python onnx_backend.py quantize --calibration calib_images/
+    python onnx_backend.py tune                        # pick ONNX_THREADS
+    python onnx_backend.py check --images test_images/ # compare against torch
+
+Set ONNX_MODEL to use another file (e.g. the int8 one) and ONNX_THREADS to
+the thread count reported by `tune`.
+"""
+import argparse
+import ast
+import glob
+import os
+import time
+
+import numpy as np
+
+from model_registry import ROOT_DIR, DEFAULT_WEIGHTS, LazyModule, get_model
+from standin_model import COCO_NAMES
+
+cv2 = LazyModule("cv2")
+
+MODELS_DIR = os.path.join(ROOT_DIR, "assets", "models")
+DEFAULT_ONNX = os.environ.get("ONNX_MODEL", os.path.join(MODELS_DIR, "yolov5s.onnx"))
+DEFAULT_THREADS = int(os.environ.get("ONNX_THREADS", "0")) or None  # None lets ONNX Runtime decide
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp")
+
+
+def letterbox(img, size, color=114):
+    """Resize keeping the aspect ratio and pad to `size` x `size`, like YOLOv5's AutoShape."""
+    height, width = img.shape[:2]
+    scale = min(size / height, size / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    resized = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR) if scale != 1 else img
+    pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+    canvas = np.full((size, size, 3), color, dtype=np.uint8)
+    canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = resized
+    return canvas, scale, pad_x, pad_y
+
+
+def to_tensor(images):
+    """HWC uint8 RGB images -> NCHW float32 in [0, 1]."""
+    batch = np.stack(images).transpose(0, 3, 1, 2)
+    return np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+
+
+def nms(boxes, scores, iou_threshold):
+    """Greedy non-maximum suppression; returns kept indices, highest score first."""
+    order = scores.argsort()[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size:
+        i = order[0]
+        keep.append(i)
+        rest = order[1:]
+        iw = np.clip(np.minimum(boxes[i, 2], boxes[rest, 2]) - np.maximum(boxes[i, 0], boxes[rest, 0]), 0, None)
+        ih = np.clip(np.minimum(boxes[i, 3], boxes[rest, 3]) - np.maximum(boxes[i, 1], boxes[rest, 1]), 0, None)
+        inter = iw * ih
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def postprocess(prediction, conf_threshold=0.25, iou_threshold=0.45, max_det=300):
+    """
+    Decode one raw YOLOv5 output `(N, 5 + classes)` into `(M, 6)` xyxy/conf/cls rows.
+
+    Matches YOLOv5's `non_max_suppression` with its AutoShape defaults:
+    class-aware NMS on `objectness * class score`.
+    """
+    prediction = prediction[prediction[:, 4] > conf_threshold]
+    if not len(prediction):
+        return np.zeros((0, 6), dtype=np.float32)
+    scores = prediction[:, 5:] * prediction[:, 4:5]
+    class_ids = scores.argmax(axis=1)
+    conf = scores[np.arange(len(scores)), class_ids]
+    mask = conf > conf_threshold
+    prediction, class_ids, conf = prediction[mask], class_ids[mask], conf[mask]
+    if not len(prediction):
+        return np.zeros((0, 6), dtype=np.float32)
+
+    xy, wh = prediction[:, :2], prediction[:, 2:4] / 2.0
+    boxes = np.concatenate([xy - wh, xy + wh], axis=1)
+    # Offset boxes by class so one NMS pass never suppresses across classes
+    keep = nms(boxes + class_ids[:, None] * 4096.0, conf, iou_threshold)[:max_det]
+    return np.concatenate([boxes[keep], conf[keep, None], class_ids[keep, None]], axis=1).astype(np.float32)
+
+
+class OnnxResults:
+    """Mimics the `xyxy` part of a YOLOv5 `Detections` object."""
+
+    def __init__(self, xyxy, names):
+        self.xyxy = xyxy
+        self.names = names
+
+
+class OnnxDetector:
+    """
+    YOLOv5 exported to ONNX, run with ONNX Runtime on the CPU.
+
+    Callable like the torch.hub model: `model(img_or_list, size=None)` takes
+    RGB uint8 images and returns a result whose `xyxy` holds one
+    `(N, 6)` array per image, in the input image's coordinates.
+
+    Args:
+        path (str): `.onnx` file (fp32 or int8).
+        threads (int, optional): Intra-op threads. Defaults to ONNX Runtime's choice.
+        conf_threshold (float): Minimum confidence, as YOLOv5's AutoShape.
+        iou_threshold (float): NMS IoU threshold.
+        names (list, optional): Class names. Read from the model metadata, else COCO.
+    """
+
+    def __init__(self, path=DEFAULT_ONNX, threads=DEFAULT_THREADS, conf_threshold=0.25, iou_threshold=0.45,
+                 names=None):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.path = path
+        self.threads = threads
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch, _, height, _ = model_input.shape
+        # Exported with a fixed size unless `--dynamic` was used; RoiDetector pins its size policy to it
+        self.fixed_size = height if isinstance(height, int) else None
+        self.dynamic_batch = not isinstance(batch, int)
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if names is None and "names" in metadata:
+            parsed = ast.literal_eval(metadata["names"])
+            names = [parsed[i] for i in sorted(parsed)] if isinstance(parsed, dict) else list(parsed)
+        self.names = names or list(COCO_NAMES)
+
+    def __call__(self, imgs, size=None):
+        batch = imgs if isinstance(imgs, (list, tuple)) else [imgs]
+        size = self.fixed_size or size or 640
+        boxed = [letterbox(np.asarray(img), size) for img in batch]
+        tensor = to_tensor([b[0] for b in boxed])
+
+        if self.dynamic_batch:
+            outputs = self.session.run(None, {self.input_name: tensor})[0]
+        else:
+            outputs = np.concatenate([self.session.run(None, {self.input_name: tensor[i:i + 1]})[0]
+                                      for i in range(len(batch))])
+
+        xyxy = []
+        for prediction, (_, scale, pad_x, pad_y) in zip(outputs, boxed):
+            rows = postprocess(prediction, self.conf_threshold, self.iou_threshold)
+            # Undo the letterbox so boxes are in the caller's image coordinates
+            rows[:, [0, 2]] = (rows[:, [0, 2]] - pad_x) / scale
+            rows[:, [1, 3]] = (rows[:, [1, 3]] - pad_y) / scale
+            xyxy.append(rows)
+        return OnnxResults(xyxy, self.names)
+
+
+def load_onnx_model(name='yolov5s', weights=None):
+    """model_registry loader: ONNX_MODEL if set, else `assets/models/<name>.onnx`."""
+    path = os.environ.get("ONNX_MODEL") or os.path.join(MODELS_DIR, f"{name}.onnx")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} not found; run `python onnx_backend.py export` first")
+    return OnnxDetector(path)
+
+
+def export_onnx(output=DEFAULT_ONNX, name='yolov5s', weights=DEFAULT_WEIGHTS, size=640, opset=12, dynamic=False):
+    """One-time export of the torch model to ONNX, with the class names stored as metadata."""
+    import onnx
+    import torch
+
+    hub_model = get_model(name, weights, source="yolov5")
+    net = hub_model.model  # AutoShape -> DetectMultiBackend
+    net = getattr(net, "model", net)  # -> DetectionModel
+    net = net.float().eval()
+    for module in net.modules():
+        # YOLOv5's Detect head returns only the concatenated predictions when exporting
+        if type(module).__name__ == "Detect":
+            module.export = True
+
+    dummy = torch.zeros(1, 3, size, size)
+    axes = {"images": {0: "batch", 2: "height", 3: "width"}, "output0": {0: "batch", 1: "anchors"}} if dynamic else None
+    torch.onnx.export(net, dummy, output, opset_version=opset, input_names=["images"], output_names=["output0"],
+                      dynamic_axes=axes, do_constant_folding=True)
+
+    model = onnx.load(output)
+    names = hub_model.names
+    entry = model.metadata_props.add()
+    entry.key, entry.value = "names", str(dict(names) if isinstance(names, dict) else dict(enumerate(names)))
+    onnx.save(model, output)
+    print(f"Exported {name} to {output}")
+    return output
+
+
+def calibration_images(directory, limit=None):
+    paths = sorted(p for pattern in IMAGE_PATTERNS for p in glob.glob(os.path.join(directory, pattern)))
+    return paths[:limit] if limit else paths
+
+
+class CalibrationReader:
+    """Feeds letterboxed local images to ONNX Runtime's static quantization."""
+
+    def __init__(self, paths, input_name, size):
+        self.paths = iter(paths)
+        self.input_name = input_name
+        self.size = size
+
+    def get_next(self):
+        for path in self.paths:
+            img = cv2.imread(path)
+            if img is None:
+                continue
+            boxed = letterbox(img[:, :, ::-1], self.size)[0]
+            return {self.input_name: to_tensor([boxed])}
+        return None
+
+    def rewind(self):
+        pass
+
+
+def quantize_int8(model_path=DEFAULT_ONNX, output=None, calibration_dir=None, limit=200):
+    """
+    Post-training static int8 quantization, calibrated on a local image folder.
+
+    Weights are quantized per channel; activations use QDQ nodes so ONNX
+    Runtime can fuse them on x86 and ARM CPUs.
+    """
+    from onnxruntime.quantization import CalibrationMethod, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    output = output or model_path.replace(".onnx", "_int8.onnx")
+    paths = calibration_images(calibration_dir, limit)
+    if not paths:
+        raise ValueError(f"No calibration images found in {calibration_dir}")
+
+    prepared = model_path.replace(".onnx", "_prep.onnx")
+    quant_pre_process(model_path, prepared, skip_symbolic_shape=True)  # Plain CNN, ONNX shapes suffice
+    detector = OnnxDetector(prepared)
+    reader = CalibrationReader(paths, detector.input_name, detector.fixed_size or 640)
+    quantize_static(prepared, output, reader, quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax)
+    os.remove(prepared)
+    print(f"Quantized {model_path} to {output} with {len(paths)} calibration images")
+    return output
+
+
+def tune_threads(model_path=DEFAULT_ONNX, candidates=None, runs=20, frame_shape=(480, 640, 3)):
+    """Time inference for each intra-op thread count and return the fastest (median latency)."""
+    candidates = candidates or sorted({1, 2, 4, os.cpu_count() or 1})
+    frame = np.random.default_rng(0).integers(0, 255, frame_shape, dtype=np.uint8)
+    timings = {}
+    for threads in candidates:
+        detector = OnnxDetector(model_path, threads=threads)
+        detector(frame)  # Warm-up
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            detector(frame)
+            samples.append(time.perf_counter() - start)
+        timings[threads] = float(np.median(samples))
+        print(f"threads={threads:<3} median {timings[threads] * 1000:.1f} ms")
+    best = min(timings, key=timings.get)
+    print(f"Fastest: ONNX_THREADS={best}")
+    return best, timings
+
+
+def compare_detections(reference, candidate, iou_threshold=0.9, conf_tolerance=0.05, conf_threshold=0.25):
+    """
+    Check that `candidate` rows reproduce `reference` rows (both `(N, 6)` xyxy/conf/cls).
+
+    Detections within `conf_tolerance` of `conf_threshold` may legitimately
+    appear in only one of the two, so they are not reported. Each candidate
+    detection matches at most one reference detection.
+
+    Returns:
+        List[str]: One message per reference detection with no same-class match
+                   of sufficient IoU and confidence, or per extra candidate detection.
+    """
+    borderline = conf_threshold + conf_tolerance
+    from tracker import iou_matrix
+    problems = []
+    iou = iou_matrix(reference[:, :4], candidate[:, :4])
+    if iou.size:
+        iou[reference[:, None, 5] != candidate[None, :, 5]] = 0.0
+    matched = set()
+    for r, row in enumerate(reference):
+        best = int(np.argmax(iou[r])) if iou.shape[1] else -1
+        if best < 0 or iou[r, best] < iou_threshold:
+            if row[4] > borderline:
+                problems.append(f"missing class {int(row[5])} at {row[:4].round(1).tolist()}")
+            continue
+        matched.add(best)
+        iou[:, best] = 0.0  # Taken: later reference rows must find their own match
+        if abs(row[4] - candidate[best, 4]) > conf_tolerance:
+            problems.append(f"class {int(row[5])} confidence {row[4]:.3f} vs {candidate[best, 4]:.3f}")
+    problems += [f"extra class {int(candidate[c, 5])} at {candidate[c, :4].round(1).tolist()}"
+                 for c in range(len(candidate)) if c not in matched and candidate[c, 4] > borderline]
+    return problems
+
+
+def check_parity(model_path=DEFAULT_ONNX, image_dir=None, iou_threshold=0.9, conf_tolerance=0.05, size=640):
+    """Run the torch and ONNX backends on the same images and report any detection mismatch."""
+    reference = get_model(source="yolov5")
+    candidate = OnnxDetector(model_path)
+    paths = calibration_images(image_dir) if image_dir else []
+    images = [cv2.imread(p)[:, :, ::-1] for p in paths] or [np.zeros((480, 640, 3), dtype=np.uint8)]
+
+    failures = 0
+    for path, image in zip(paths or ["blank"], images):
+        expected = np.asarray(reference(image, size=size).xyxy[0].cpu())
+        problems = compare_detections(expected, candidate(image, size=size).xyxy[0], iou_threshold, conf_tolerance)
+        if problems:
+            failures += 1
+            print(f"{path}: " + "; ".join(problems))
+    print(f"{len(images) - failures}/{len(images)} images match within tolerance")
+    return failures == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export, quantize, tune and check the ONNX detector.")
+    parser.add_argument("command", choices=("export", "quantize", "tune", "check"))
+    parser.add_argument("--model", default=DEFAULT_ONNX, help="ONNX file to write or read")
+    parser.add_argument("--size", type=int, default=640, help="export input size")
+    parser.add_argument("--dynamic", action="store_true", help="export with dynamic batch and input size")
+    parser.add_argument("--calibration", help="folder of local calibration images (quantize)")
+    parser.add_argument("--images", help="folder of test images (check)")
+    parser.add_argument("--conf-tolerance", type=float, default=0.05, help="allowed confidence difference (check)")
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model, size=args.size, dynamic=args.dynamic)
+    elif args.command == "quantize":
+        quantize_int8(args.model, calibration_dir=args.calibration)
+    elif args.command == "tune":
+        tune_threads(args.model)
+    elif not check_parity(args.model, args.images, conf_tolerance=args.conf_tolerance, size=args.size):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
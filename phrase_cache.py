@@ -0,0 +1,227 @@
+import hashlib
+import io
+import os
+import platform
+import subprocess
+import threading
+from collections import OrderedDict
+
+from metrics import metrics
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "PHRASE_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "blind_assistant", "phrases"))
+LABELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "models", "label.txt")
+
+
+def gtts_synthesize(text, lang='en'):
+    from gtts import gTTS
+    buffer = io.BytesIO()
+    gTTS(text=text, lang=lang).write_to_fp(buffer)
+    return buffer.getvalue()
+
+
+def load_labels(path=LABELS_PATH):
+    """Read one class name per line, skipping blanks. Returns [] if the file is missing."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    except OSError:
+        return []
+
+
+class PhraseCache:
+    """
+    Content-addressed cache of synthesized speech.
+
+    Audio is keyed by a hash of the language and normalised text, kept in an
+    in-memory LRU and mirrored to `<cache_dir>/<key>.mp3`. The disk cache is
+    capped at `max_disk_bytes`; least recently used files are evicted first.
+    Once a phrase has been synthesized it is served from cache with no network
+    access, so a warmed cache works fully offline.
+
+    Args:
+        cache_dir (str): Directory for cached mp3 files.
+        max_disk_bytes (int): Size cap for the on-disk cache.
+        max_memory_items (int): Number of phrases kept in memory.
+        lang (str): gTTS language code.
+        synthesize (callable, optional): `synthesize(text, lang) -> mp3 bytes`. Defaults to gTTS.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_disk_bytes=50 * 1024 * 1024,
+                 max_memory_items=128, lang='en', synthesize=None):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_memory_items = max_memory_items
+        self.lang = lang
+        self.synthesize = synthesize or gtts_synthesize
+
+        self.hits = 0
+        self.misses = 0
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, text):
+        normalized = " ".join(text.split()).lower()
+        return hashlib.sha1(f"{self.lang}:{normalized}".encode("utf-8")).hexdigest()
+
+    def path_for(self, text):
+        return os.path.join(self.cache_dir, self.key(text) + ".mp3")
+
+    def get(self, text):
+        """Return mp3 bytes for `text`, synthesizing on a miss. Returns None if synthesis fails."""
+        key = self.key(text)
+        with self._lock:
+            audio = self._memory.get(key)
+            if audio is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return audio
+
+        path = os.path.join(self.cache_dir, key + ".mp3")
+        audio = self._read_disk(path)
+        if audio is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            try:
+                audio = self.synthesize(text, self.lang)
+            except Exception as e:
+                print(f"Error synthesizing '{text}': {str(e)}")
+                return None
+            self._write_disk(path, audio)
+
+        self._remember(key, audio)
+        return audio
+
+    def get_path(self, text):
+        """Like `get`, but return the cached file path (for players that need a file)."""
+        audio = self.get(text)
+        if audio is None:
+            return None
+        path = self.path_for(text)
+        if not os.path.exists(path):
+            self._write_disk(path, audio)
+        return path
+
+    def contains(self, text):
+        key = self.key(text)
+        with self._lock:
+            if key in self._memory:
+                return True
+        return os.path.exists(os.path.join(self.cache_dir, key + ".mp3"))
+
+    def prewarm(self, phrases):
+        """Synthesize every phrase not cached yet. Returns the number newly synthesized.
+
+        Stops at the first synthesis failure, since offline every other phrase would fail too.
+        """
+        added = 0
+        for text in phrases:
+            if not self.contains(text):
+                if self.get(text) is None:
+                    break
+                added += 1
+        return added
+
+    def _remember(self, key, audio):
+        with self._lock:
+            self._memory[key] = audio
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _read_disk(self, path):
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path)  # Bump the mtime so eviction sees this file as recently used
+            return audio
+        except OSError:
+            return None
+
+    def _write_disk(self, path, audio):
+        try:
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path)
+            self._evict()
+        except OSError as e:
+            print(f"Error writing phrase cache: {str(e)}")
+
+    def _evict(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".mp3"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+
+def label_phrases(templates, names=None, labels_path=LABELS_PATH):
+    """Expand `templates` such as "There is a {} in front of you." for every known class name."""
+    if isinstance(names, dict):
+        names = list(names.values())
+    all_names = list(dict.fromkeys(load_labels(labels_path) + list(names or [])))
+    phrases = []
+    for template in templates:
+        if "{}" in template:
+            phrases.extend(template.format(name) for name in all_names)
+        else:
+            phrases.append(template)
+    return phrases
+
+
+_default_cache = None
+
+
+def get_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = PhraseCache()
+    return _default_cache
+
+
+def prewarm_in_background(templates, names=None):
+    """Fill the shared cache for all class names without blocking startup."""
+    thread = threading.Thread(target=lambda: get_cache().prewarm(label_phrases(templates, names)), daemon=True)
+    thread.start()
+    return thread
+
+
+def play_phrase(text, cache=None):
+    """Speak `text` from the phrase cache, synthesizing it only the first time."""
+    cache = cache or get_cache()
+    if platform.system() == "Windows":
+        path = cache.get_path(text)
+        if path:
+            from playsound import playsound
+            with metrics.timer("speech"):
+                playsound(path)
+        return path is not None
+
+    audio = cache.get(text)
+    if audio is None:
+        return False
+    # Stream straight from memory instead of writing a temporary file
+    with metrics.timer("speech"):
+        subprocess.run(["mpg321", "-q", "-"], input=audio, check=False)
+    return True
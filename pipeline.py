@@ -0,0 +1,306 @@
+import threading
+import time
+from collections import deque
+
+from metrics import metrics
+from model_registry import mark_startup
+
+
+class LatestQueue:
+    """
+    Bounded queue where the newest item always wins.
+
+    When the queue is full, `put` drops the oldest item instead of blocking,
+    so a slow consumer only ever sees the most recent frames.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = max(1, maxsize)
+        self._items = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            while len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+                metrics.count("dropped_frames")
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Return the oldest queued item, or None on timeout or after close()."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class FramePacket:
+    """A captured frame plus the timestamps it collects on its way through the pipeline."""
+
+    def __init__(self, index, frame, captured_at=None):
+        self.index = index
+        self.frame = frame
+        self.captured_at = captured_at if captured_at is not None else time.monotonic()
+        self.detections = None
+        self.stage_times = {"capture": self.captured_at}
+
+    def mark(self, stage):
+        self.stage_times[stage] = time.monotonic()
+
+    def age(self, now=None):
+        """Seconds since the frame left the camera."""
+        return (now if now is not None else time.monotonic()) - self.captured_at
+
+    def stage_ages(self):
+        """Frame age in milliseconds at each stage it has reached."""
+        return {stage: (stamp - self.captured_at) * 1000.0 for stage, stamp in self.stage_times.items()}
+
+
+def describe_detections(detections):
+    """JSON-friendly view of an inference result (`Detections`, a list of labels, or None)."""
+    if detections is None:
+        return []
+    if hasattr(detections, "to_dicts"):
+        return detections.to_dicts()
+    return [{"label": str(item)} for item in detections]
+
+
+class DetectionBoard:
+    """
+    Latest-detection snapshot published by the navigation engine.
+
+    Each `publish` replaces the snapshot and bumps its version, so readers
+    get the newest result in constant time and streams can wait for the next
+    version instead of polling.
+    """
+
+    def __init__(self):
+        self._snapshot = None
+        self._cond = threading.Condition()
+        self.version = 0
+
+    def publish(self, packet, objects):
+        with self._cond:
+            self.version += 1
+            self._snapshot = {
+                "version": self.version,
+                "frame_index": packet.index,
+                "timestamp": time.time() - packet.age(),  # Wall-clock capture time
+                "captured_at": packet.captured_at,
+                "objects": objects,
+            }
+            self._cond.notify_all()
+
+    def latest(self, max_age=None):
+        """Return the newest snapshot with its current `age` in seconds, or None if there is
+        none or it is older than `max_age`."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            return None
+        age = time.monotonic() - snapshot["captured_at"]
+        if max_age is not None and age > max_age:
+            return None
+        return dict(snapshot, age=age)
+
+    def wait(self, after_version, timeout=None):
+        """Block until a snapshot newer than `after_version` exists; None on timeout."""
+        with self._cond:
+            if self.version <= after_version:
+                self._cond.wait(timeout)
+            if self.version <= after_version:
+                return None
+        return self.latest()
+
+
+class NavigationPipeline:
+    """
+    Capture -> inference -> feedback engine with one thread per stage.
+
+    Stages are connected by `LatestQueue`s, so a slow stage (e.g. speech)
+    never holds the camera: stale frames are dropped and the next stage
+    always works on the freshest data available.
+
+    Args:
+        open_capture (callable): Returns an object with `read()` and `release()`
+                                 (e.g. `cv2.VideoCapture(0)`). Called on the capture thread.
+        infer (callable): `infer(frame) -> detections`, run on the inference worker. If it has an
+                          `infer_packet(packet)` method, that is called instead, so it can
+                          attach per-frame state to the packet.
+        feedback (callable): `feedback(packet)`, run on the feedback worker. May block.
+        display (callable, optional): `display(packet)`, run on the inference worker
+                                      right after detection so video is not held up by speech.
+        on_capture (callable, optional): `on_capture(packet)`, run on the capture thread for
+                                         every frame, before any are dropped. Must be fast.
+        board (DetectionBoard, optional): Where each inference result is published as a
+                                          versioned snapshot. A new board is created if omitted.
+        describe (callable, optional): Turns an inference result into the snapshot's `objects`.
+        recorder (SessionRecorder, optional): Gets every inferred packet via `record_packet`;
+                                              must not block (see session_recorder).
+        governor (FrameGovernor, optional): Decides which captured frames go on to inference
+                                            and is updated from every result (see frame_governor).
+        max_frame_age (float, optional): Frames older than this many seconds are dropped
+                                         before feedback instead of being announced.
+    """
+
+    def __init__(self, open_capture, infer, feedback, display=None, queue_size=1, max_frame_age=None,
+                 on_capture=None, board=None, describe=describe_detections, recorder=None, governor=None):
+        self.open_capture = open_capture
+        self.infer = infer
+        self.infer_packet = getattr(infer, "infer_packet", None)
+        self.feedback = feedback
+        self.display = display
+        self.on_capture = on_capture
+        self.board = board or DetectionBoard()
+        self.describe = describe
+        self.recorder = recorder
+        self.governor = governor
+        self.max_frame_age = max_frame_age
+
+        self.frames = LatestQueue(queue_size)
+        self.results = LatestQueue(queue_size)
+
+        self.latest_packet = None
+        self.last_latency = {}
+        self.stale_dropped = 0
+        self.frames_captured = 0
+        self.error = None
+
+        self._stop = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self):
+        return any(t.is_alive() for t in self._threads)
+
+    @property
+    def dropped_frames(self):
+        return self.frames.dropped + self.results.dropped + self.stale_dropped
+
+    def start(self):
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="nav-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="nav-inference", daemon=True),
+            threading.Thread(target=self._feedback_loop, name="nav-feedback", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.frames.close()
+        self.results.close()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def run(self):
+        """Start the pipeline and block until it is stopped or the source runs dry."""
+        self.start()
+        try:
+            while not self._stop.wait(0.2):
+                if not self._threads[0].is_alive():
+                    break
+        finally:
+            self.stop()
+            self.join()
+
+    def latency_report(self):
+        ages = ", ".join(f"{stage}={ms:.0f}ms" for stage, ms in self.last_latency.items())
+        return f"frame age: {ages} | dropped: {self.dropped_frames}"
+
+    def _capture_loop(self):
+        cap = None
+        try:
+            cap = self.open_capture()
+            if cap is None or (hasattr(cap, "isOpened") and not cap.isOpened()):
+                self.error = "Camera not accessible!"
+                return
+            index = 0
+            while not self._stop.is_set():
+                with metrics.timer("capture"):
+                    ret, frame = cap.read()
+                if not ret:
+                    self.error = "Error in video feed!"
+                    break
+                if index == 0:
+                    mark_startup("first_frame")
+                packet = FramePacket(index, frame)
+                if self.on_capture is not None:
+                    self.on_capture(packet)
+                self.frames_captured += 1
+                index += 1
+                # Keep reading so the camera buffer never goes stale, but only infer at the governed rate
+                if self.governor is not None and not self.governor.due():
+                    continue
+                self.frames.put(packet)
+        except Exception as e:
+            self.error = str(e)
+            print(f"Error in capture stage: {str(e)}")
+        finally:
+            if cap is not None:
+                cap.release()
+            self.stop()
+
+    def _inference_loop(self):
+        while not self._stop.is_set():
+            packet = self.frames.get(timeout=0.5)
+            if packet is None:
+                continue
+            try:
+                packet.mark("inference_start")
+                if self.infer_packet is not None:
+                    packet.detections = self.infer_packet(packet)
+                else:
+                    packet.detections = self.infer(packet.frame)
+                packet.mark("inference_done")
+                if self.latest_packet is None:
+                    mark_startup("first_detection")
+                self.latest_packet = packet
+                self.board.publish(packet, self.describe(packet.detections))
+                if self.recorder is not None:
+                    self.recorder.record_packet(packet)
+                if self.governor is not None:
+                    self.governor.observe_packet(packet)
+                if self.display is not None:
+                    self.display(packet)
+            except Exception as e:
+                print(f"Error in inference stage: {str(e)}")
+                continue
+            self.results.put(packet)
+
+    def _feedback_loop(self):
+        while not self._stop.is_set():
+            packet = self.results.get(timeout=0.5)
+            if packet is None:
+                continue
+            if self.max_frame_age is not None and packet.age() > self.max_frame_age:
+                self.stale_dropped += 1
+                metrics.count("dropped_frames")
+                continue
+            try:
+                packet.mark("feedback_start")
+                with metrics.timer("feedback"):
+                    self.feedback(packet)
+                packet.mark("feedback_done")
+            except Exception as e:
+                print(f"Error in feedback stage: {str(e)}")
+                continue
+            self.last_latency = packet.stage_ages()
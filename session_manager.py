@@ -0,0 +1,323 @@
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+from detections import CORRIDOR
+from inference_size import InferenceSizePolicy, RoiDetector
+from model_registry import LazyModule
+from motion_gate import MotionGatedDetector
+from pipeline import DetectionBoard, NavigationPipeline
+from video_hub import FrameHub
+
+cv2 = LazyModule("cv2")
+
+# Video files a client may open as a session source must live under this directory
+MEDIA_DIR = os.environ.get("NAV_MEDIA_DIR")
+
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+
+class AdmissionError(Exception):
+    """A new stream would exceed the measured inference capacity."""
+
+
+def checked_source(source, media_dir=MEDIA_DIR):
+    """
+    `source` if a client may open it: a device index, an RTSP URL on this machine, or a file under `media_dir`.
+
+    Raises:
+        ValueError: Anything else, e.g. other local files or remote URLs.
+    """
+    source = str(source)
+    if source.isdigit():
+        return source
+    if "://" in source:
+        url = urlsplit(source)
+        if url.scheme == "rtsp" and url.hostname in LOCAL_HOSTS:
+            return source
+        raise ValueError("Only rtsp:// sources on 127.0.0.1 or localhost are allowed")
+    if media_dir:
+        root = os.path.realpath(media_dir)
+        path = os.path.realpath(os.path.join(root, source))
+        if os.path.commonpath([root, path]) == root and os.path.isfile(path):
+            return path
+        raise ValueError(f"No video file {source} in the media directory")
+    raise ValueError("Video file sources are disabled; set NAV_MEDIA_DIR to allow files from a directory")
+
+
+def open_source(source):
+    """`cv2.VideoCapture` for a device index ("0"), a video file or an RTSP/HTTP URL."""
+    if isinstance(source, int) or str(source).isdigit():
+        return cv2.VideoCapture(int(source))
+    return cv2.VideoCapture(str(source))
+
+
+class BudgetedCapture:
+    """
+    Capture wrapper that hands frames to the pipeline at the session's frame budget.
+
+    Live sources (cameras, RTSP) are read continuously so their buffers never
+    go stale, and only the newest frame is returned once per budget
+    interval. Video files are paced instead, so they play at the budgeted
+    rate rather than being skipped through.
+    """
+
+    def __init__(self, capture, session, is_file):
+        self.capture = capture
+        self.session = session
+        self.is_file = is_file
+        self._next_at = time.monotonic()
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        interval = 1.0 / max(self.session.effective_fps, 0.1)
+        while True:
+            if self.is_file:
+                delay = self._next_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            ret, frame = self.capture.read()
+            now = time.monotonic()
+            if not ret or self.is_file or now >= self._next_at or self.session.stopping:
+                break
+        self._next_at = max(self._next_at + interval, now)
+        return ret, frame
+
+    def release(self):
+        self.capture.release()
+
+
+class NavigationSession:
+    """
+    One user's stream: its own capture, pipeline, detection board and video hub.
+
+    Args:
+        session_id (str): Name used in routes.
+        source: Device index, video file path or stream URL.
+        max_fps (float): Requested frame budget.
+        priority (int): Lower numbers keep their budget first when capacity is short.
+    """
+
+    def __init__(self, session_id, source, max_fps, priority, manager, feedback=None, overlay=None):
+        self.session_id = session_id
+        self.source = source
+        self.max_fps = max_fps
+        self.effective_fps = max_fps
+        self.priority = priority
+        self.manager = manager
+        self.feedback = feedback or (lambda packet: None)
+        self.started_at = time.time()
+        self.stopping = False
+
+        self.board = DetectionBoard()
+        self.hub = FrameHub(overlay=overlay)
+        self.detector = RoiDetector(roi=CORRIDOR, policy=InferenceSizePolicy(budget_ms=manager.inference_budget_ms),
+                                    model=manager.model)
+        self.gated = MotionGatedDetector(lambda frame: manager.run_detector(self, frame).with_confidence(0.5))
+        self.pipeline = NavigationPipeline(self._open_capture, self.gated, self.feedback,
+                                           on_capture=lambda packet: self.hub.publish(packet.frame),
+                                           board=self.board)
+        self._thread = threading.Thread(target=self._run, name=f"session-{session_id}", daemon=True)
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+    def _open_capture(self):
+        return BudgetedCapture(open_source(self.source), self, os.path.isfile(str(self.source)))
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self.stopping = True
+        self.pipeline.stop()
+
+    def _run(self):
+        try:
+            self.pipeline.run()
+        finally:
+            self.manager._finished(self)
+
+    def status(self):
+        return {
+            "id": self.session_id,
+            "source": str(self.source),
+            "priority": self.priority,
+            "max_fps": self.max_fps,
+            "effective_fps": round(self.effective_fps, 2),
+            "running": self.running,
+            "frames": self.pipeline.frames_captured,
+            "dropped": self.pipeline.dropped_frames,
+            "error": self.pipeline.error,
+            "latency_ms": self.pipeline.last_latency,
+        }
+
+
+class SessionManager:
+    """
+    Runs one navigation pipeline per stream over a shared detector.
+
+    Inference is serialized on the shared model, so total throughput is
+    about `1 / latency`; with `use_model` on an `InferencePool`, up to
+    `parallel` inferences run at once and throughput is `parallel /
+    latency`. The manager measures that latency (an EMA over real detector
+    runs) and admits a new stream only if the sum of all frame budgets
+    still fits within `utilization` of the measured capacity. A
+    stream that would have the model to itself is always admitted, since
+    nothing may have been measured yet; its budget is trimmed once real
+    latencies come in. When latency rises later, budgets are re-divided in
+    priority order: streams with a lower priority number keep their full
+    rate, the others are slowed down rather than starving everyone.
+
+    Detector runs outside the sessions (e.g. app.py's own navigation
+    pipeline) go through `run_shared`, so they wait for the same inference
+    slots and their measured rate is taken off the capacity first.
+
+    Args:
+        utilization (float): Fraction of measured capacity that may be promised to streams.
+        initial_latency (float): Assumed seconds per inference until one has been measured.
+        inference_budget_ms (float): Per-inference latency budget for each session's size policy.
+        max_sessions (int): Hard limit on concurrent streams.
+        shared_timeout (float): Seconds without a `run_shared` call after which its load is no
+                                longer counted.
+        model (callable, optional): Model for the sessions' detectors; the shared model by default.
+        parallel (int): Inferences that may run at once on `model`.
+    """
+
+    def __init__(self, utilization=0.8, initial_latency=0.1, inference_budget_ms=80, max_sessions=16,
+                 smoothing=0.2, shared_timeout=2.0, model=None, parallel=1):
+        self.utilization = utilization
+        self.latency = initial_latency
+        self.inference_budget_ms = inference_budget_ms
+        self.max_sessions = max_sessions
+        self.smoothing = smoothing
+        self.shared_timeout = shared_timeout
+        self.model = model
+        self.parallel = parallel
+        self.sessions = {}
+        self.refused = 0
+        self._shared_rate = 0.0
+        self._shared_at = None
+        self._lock = threading.Lock()
+        self._infer_slots = threading.BoundedSemaphore(parallel)
+
+    def use_model(self, model, parallel=1):
+        """Run sessions started from now on with `model`, `parallel` inferences at a time."""
+        with self._lock:
+            self.model = model
+            self.parallel = parallel
+            self._infer_slots = threading.BoundedSemaphore(parallel)
+
+    @property
+    def capacity_fps(self):
+        """Frames per second the shared detector can sustain within `utilization`."""
+        return self.utilization * self.parallel / max(self.latency, 1e-3)
+
+    @property
+    def shared_fps(self):
+        """Measured rate of `run_shared` detector runs; 0 once they have stopped."""
+        if self._shared_at is None or time.monotonic() - self._shared_at > self.shared_timeout:
+            return 0.0
+        return self._shared_rate
+
+    @property
+    def committed_fps(self):
+        return self.shared_fps + sum(session.max_fps for session in self.sessions.values())
+
+    def run_detector(self, session, frame):
+        return self._run(session.detector, frame)
+
+    def run_shared(self, detect, frame):
+        """Run `detect(frame)` for a pipeline that is not a session, counting its load."""
+        now = time.monotonic()
+        with self._lock:
+            if self._shared_at is None or now - self._shared_at > self.shared_timeout:
+                self._shared_rate = 0.0
+            else:
+                rate = 1.0 / max(now - self._shared_at, 1e-3)
+                if not self._shared_rate:
+                    self._shared_rate = rate
+                else:
+                    self._shared_rate += self.smoothing * (rate - self._shared_rate)
+            self._shared_at = now
+        return self._run(detect, frame)
+
+    def _run(self, detect, frame):
+        with self._infer_slots:
+            start = time.monotonic()
+            result = detect(frame)
+            elapsed = time.monotonic() - start
+        # Session threads finish inferences concurrently; the EMA update is read-modify-write
+        with self._lock:
+            self.latency += self.smoothing * (elapsed - self.latency)
+        self._rebalance()
+        return result
+
+    def start(self, session_id, source=0, max_fps=5.0, priority=1, feedback=None, overlay=None):
+        """
+        Admit and start a stream. A stream on an otherwise idle model is always admitted.
+
+        Raises:
+            KeyError: A session with this id is already running.
+            AdmissionError: Not enough inference capacity left for `max_fps`.
+        """
+        with self._lock:
+            if session_id in self.sessions:
+                raise KeyError(f"Session {session_id} is already running")
+            if len(self.sessions) >= self.max_sessions:
+                self.refused += 1
+                raise AdmissionError(f"Session limit of {self.max_sessions} reached")
+            free = self.capacity_fps - self.committed_fps
+            if (self.sessions or self.shared_fps) and max_fps > free:
+                self.refused += 1
+                raise AdmissionError(f"Requested {max_fps:g} fps but only {max(free, 0):.1f} fps of "
+                                     f"inference capacity is free")
+            session = NavigationSession(session_id, source, max_fps, priority, self, feedback, overlay)
+            self.sessions[session_id] = session
+        session.start()
+        return session
+
+    def stop(self, session_id):
+        with self._lock:
+            session = self.sessions.get(session_id)
+        if session is None:
+            raise KeyError(f"No session {session_id}")
+        session.stop()
+        return session
+
+    def stop_all(self):
+        for session in list(self.sessions.values()):
+            session.stop()
+
+    def get(self, session_id):
+        return self.sessions.get(session_id)
+
+    def _finished(self, session):
+        with self._lock:
+            if self.sessions.get(session.session_id) is session:
+                del self.sessions[session.session_id]
+        self._rebalance()
+
+    def _rebalance(self):
+        # Hand out the measured capacity by priority; requested budgets are never exceeded
+        with self._lock:
+            remaining = self.capacity_fps - self.shared_fps
+            for session in sorted(self.sessions.values(), key=lambda s: (s.priority, s.started_at)):
+                session.effective_fps = max(min(session.max_fps, remaining), 0.5)
+                remaining -= session.effective_fps
+
+    def status(self):
+        with self._lock:
+            sessions = [session.status() for session in self.sessions.values()]
+        return {
+            "capacity_fps": round(self.capacity_fps, 2),
+            "committed_fps": round(self.committed_fps, 2),
+            "shared_fps": round(self.shared_fps, 2),
+            "inference_ms": round(self.latency * 1000.0, 1),
+            "refused": self.refused,
+            "sessions": sessions,
+        }
@@ -0,0 +1,314 @@
+"""
+Record navigation sessions and replay them with random access.
+
+A recording is a directory of segment files. Each segment starts with a
+JSON header (class names, settings) followed by append-only chunks, one per
+frame:
+
+    "NREC" | frame index u32 | wall-clock time f64 | jpeg bytes u32 | boxes u32
+    boxes x (x1, y1, x2, y2, conf, cls) float32 | JPEG
+
+Chunk headers are fixed-size, so a reader memory-maps the segments and
+indexes them by hopping from header to header; a chunk cut short by a crash
+is ignored. In rolling mode the oldest segments are deleted to keep the
+whole recording under a size limit.
+
+    python session_recorder.py info recordings/2024-05-01_1200
+"""
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+from detections import Detections
+from model_registry import LazyModule
+from pipeline import LatestQueue
+
+cv2 = LazyModule("cv2")
+
+SEGMENT_MAGIC = b"NAVREC01"
+CHUNK_MAGIC = b"NREC"
+CHUNK = struct.Struct("<4sIdII")
+HEADER_LENGTH = struct.Struct("<I")
+
+
+class SessionRecorder:
+    """
+    Asynchronous, append-only recorder for frames and detections.
+
+    `record()` only queues references, so the live loop pays for a queue
+    put; downsampling, JPEG encoding and file writes happen on a background
+    thread. If the writer falls behind, the oldest queued frames are dropped
+    (and counted) instead of slowing navigation down.
+
+    Args:
+        directory (str): Where segment files are written.
+        jpeg_quality (int): JPEG quality of stored frames.
+        scale (float): Downsampling factor applied to frames before encoding.
+        frame_every (int): Store the image of every Nth frame; detections are stored for all.
+        max_bytes (int, optional): Rolling mode: delete the oldest segments beyond this total size.
+        segment_bytes (int): Size at which a new segment file is started.
+        queue_size (int): Frames waiting for the writer before the oldest is dropped.
+    """
+
+    def __init__(self, directory, jpeg_quality=70, scale=0.5, frame_every=1, max_bytes=None,
+                 segment_bytes=64 * 1024 * 1024, queue_size=32):
+        self.directory = directory
+        self.jpeg_quality = jpeg_quality
+        self.scale = scale
+        self.frame_every = max(1, frame_every)
+        self.max_bytes = max_bytes
+        self.segment_bytes = min(segment_bytes, max_bytes // 4) if max_bytes else segment_bytes
+
+        self.records = 0
+        self.bytes_written = 0
+        self.names = None
+        os.makedirs(directory, exist_ok=True)
+
+        self._queue = LatestQueue(queue_size)
+        self._file = None
+        self._segment_size = 0
+        self._segment_index = self._last_segment_index() + 1
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._writer, name="session-recorder", daemon=True)
+        self._thread.start()
+
+    @property
+    def dropped(self):
+        return self._queue.dropped
+
+    def record(self, frame, detections, index, timestamp=None):
+        """Queue one frame and its detections. Never blocks."""
+        if self.names is None and detections is not None:
+            self.names = detections.names
+        self._queue.put((index, timestamp if timestamp is not None else time.time(), frame, detections))
+
+    def record_packet(self, packet):
+        """Pipeline hook: record a `FramePacket` after inference."""
+        self.record(packet.frame, packet.detections, packet.index, time.time() - packet.age())
+
+    def close(self):
+        """Write everything still queued and close the current segment."""
+        self._stop.set()
+        self._queue.close()
+        self._thread.join()
+
+    # Writer thread
+
+    def _writer(self):
+        try:
+            while True:
+                item = self._queue.get(timeout=0.5)
+                if item is None:
+                    if self._stop.is_set() and not len(self._queue):
+                        break
+                    continue
+                self._write(*item)
+        except Exception as e:
+            print(f"Error in session recorder: {str(e)}")
+        finally:
+            if self._file is not None:
+                self._file.close()
+
+    def _write(self, index, timestamp, frame, detections):
+        jpeg = b""
+        if frame is not None and index % self.frame_every == 0:
+            if self.scale != 1.0:
+                frame = cv2.resize(frame, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+            jpeg = buffer.tobytes() if ok else b""
+
+        rows = np.zeros((0, 6), dtype=np.float32)
+        if detections is not None and len(detections):
+            rows = np.column_stack([detections.boxes * self.scale, detections.confidences,
+                                    detections.class_ids]).astype(np.float32)
+
+        if self._file is None or self._segment_size >= self.segment_bytes:
+            self._open_segment()
+        chunk = CHUNK.pack(CHUNK_MAGIC, index, timestamp, len(jpeg), len(rows)) + rows.tobytes() + jpeg
+        self._file.write(chunk)
+        self._file.flush()
+        self._segment_size += len(chunk)
+        self.bytes_written += len(chunk)
+        self.records += 1
+
+    def _last_segment_index(self):
+        segments = sorted(glob.glob(os.path.join(self.directory, "segment_*.navrec")))
+        return int(os.path.basename(segments[-1])[8:-7]) if segments else -1
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        path = os.path.join(self.directory, f"segment_{self._segment_index:06d}.navrec")
+        self._segment_index += 1
+        names = self.names
+        if isinstance(names, dict):
+            names = [names[i] for i in sorted(names)]
+        header = json.dumps({"names": list(names or []), "scale": self.scale, "created": time.time(),
+                             "frame_every": self.frame_every}).encode()
+        self._file = open(path, "wb")
+        self._file.write(SEGMENT_MAGIC + HEADER_LENGTH.pack(len(header)) + header)
+        self._segment_size = len(SEGMENT_MAGIC) + HEADER_LENGTH.size + len(header)
+        if self.max_bytes:
+            self._enforce_limit()
+
+    def _enforce_limit(self):
+        # Rolling mode: drop whole segments, oldest first, but never the one being written
+        segments = sorted(glob.glob(os.path.join(self.directory, "segment_*.navrec")))
+        sizes = [os.path.getsize(path) for path in segments]
+        total = sum(sizes) + self.segment_bytes
+        for path, size in zip(segments[:-1], sizes[:-1]):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+class SessionReader:
+    """
+    Random-access reader over a recording directory (or one segment file).
+
+    Segments are memory-mapped; `frame(i)` decodes one JPEG straight from the
+    map and `detections(i)` returns a view of the stored boxes, so seeking is
+    constant time regardless of recording length.
+    """
+
+    def __init__(self, path):
+        paths = [path] if os.path.isfile(path) else sorted(glob.glob(os.path.join(path, "segment_*.navrec")))
+        self._maps = []
+        self.names = []
+        self.scale = 1.0
+        self.index = []  # (map, offset, frame index, timestamp, jpeg length, box count)
+        for segment in paths:
+            self._open(segment)
+        self.timestamps = np.array([entry[3] for entry in self.index], dtype=np.float64)
+
+    def _open(self, path):
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(SEGMENT_MAGIC)] != SEGMENT_MAGIC:
+            mapped.close()
+            return
+        self._maps.append(mapped)
+        offset = len(SEGMENT_MAGIC)
+        (length,) = HEADER_LENGTH.unpack_from(mapped, offset)
+        offset += HEADER_LENGTH.size
+        header = json.loads(mapped[offset:offset + length])
+        self.names = header.get("names") or self.names
+        self.scale = header.get("scale", 1.0)
+        offset += length
+
+        size = len(mapped)
+        while offset + CHUNK.size <= size:
+            magic, index, timestamp, jpeg_length, boxes = CHUNK.unpack_from(mapped, offset)
+            end = offset + CHUNK.size + boxes * 24 + jpeg_length
+            if magic != CHUNK_MAGIC or end > size:
+                break  # Truncated by a crash or still being written
+            self.index.append((mapped, offset, index, timestamp, jpeg_length, boxes))
+            offset = end
+
+    def __len__(self):
+        return len(self.index)
+
+    def frame_index(self, i):
+        return self.index[i][2]
+
+    def seek(self, timestamp):
+        """Position of the first record at or after `timestamp` (wall-clock seconds)."""
+        return bisect.bisect_left(self.timestamps, timestamp)
+
+    def detections(self, i):
+        mapped, offset, _, _, _, boxes = self.index[i]
+        rows = np.frombuffer(mapped, dtype=np.float32, count=boxes * 6, offset=offset + CHUNK.size).reshape(-1, 6)
+        return Detections.from_xyxy(rows, self.names)
+
+    def frame(self, i):
+        """Decoded BGR frame of record `i`, or None if its image was not stored."""
+        mapped, offset, _, _, jpeg_length, boxes = self.index[i]
+        if not jpeg_length:
+            return None
+        start = offset + CHUNK.size + boxes * 24
+        return cv2.imdecode(np.frombuffer(mapped, dtype=np.uint8, count=jpeg_length, offset=start),
+                            cv2.IMREAD_COLOR)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.timestamps[i], self.frame(i), self.detections(i)
+
+    def as_capture(self, realtime=False):
+        """A `cv2.VideoCapture`-like source, to feed a recording back through NavigationPipeline."""
+        return _RecordingCapture(self, realtime)
+
+    def close(self):
+        self.index = []
+        for mapped in self._maps:
+            try:
+                mapped.close()
+            except BufferError:
+                pass  # Detections views still point into it; the map is freed along with them
+        self._maps = []
+
+
+class _RecordingCapture:
+    def __init__(self, reader, realtime):
+        self.reader = reader
+        self.realtime = realtime
+        self.position = 0
+        self._start = None
+
+    def isOpened(self):
+        return len(self.reader) > 0
+
+    def read(self):
+        while self.position < len(self.reader):
+            i = self.position
+            self.position += 1
+            frame = self.reader.frame(i)
+            if frame is None:
+                continue
+            if self.realtime:
+                # Keep the recorded spacing between frames
+                now = time.monotonic()
+                if self._start is None:
+                    self._start = (now, self.reader.timestamps[i])
+                delay = (self.reader.timestamps[i] - self._start[1]) - (now - self._start[0])
+                if delay > 0:
+                    time.sleep(delay)
+            return True, frame
+        return False, None
+
+    def release(self):
+        pass
+
+
+def recorder_from_env():
+    """A recorder configured by NAV_RECORD_DIR (and NAV_RECORD_MAX_MB for rolling mode), or None."""
+    directory = os.environ.get("NAV_RECORD_DIR")
+    if not directory:
+        return None
+    max_mb = float(os.environ.get("NAV_RECORD_MAX_MB", "0"))
+    session = time.strftime("%Y-%m-%d_%H%M%S")
+    # Rolling recordings keep appending to one directory; others get one directory per session
+    path = directory if max_mb else os.path.join(directory, session)
+    return SessionRecorder(path, max_bytes=int(max_mb * 1024 * 1024) or None)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "info":
+        sys.exit("usage: python session_recorder.py info <recording>")
+    reader = SessionReader(sys.argv[2])
+    if not len(reader):
+        sys.exit("No records found.")
+    duration = reader.timestamps[-1] - reader.timestamps[0]
+    frames = sum(1 for entry in reader.index if entry[4])
+    boxes = sum(entry[5] for entry in reader.index)
+    print(f"{len(reader)} records, {frames} frames, {boxes} boxes over {duration:.1f}s")
@@ -0,0 +1,256 @@
+import heapq
+import itertools
+import threading
+import time
+
+from metrics import metrics
+
+# Lower numbers are more urgent
+PRIORITY_WARNING = 0  # Close obstacles, interrupts anything less urgent
+PRIORITY_INFO = 1     # Individual detections
+PRIORITY_STATUS = 2   # Summaries and status chatter
+
+DEFAULT_MAX_AGE = 3.0  # Seconds a message may wait before it is no longer worth saying
+
+
+class SpeechMessage:
+    def __init__(self, text, priority, max_age, seq):
+        self.text = text
+        self.priority = priority
+        self.created_at = time.monotonic()
+        self.deadline = self.created_at + max_age if max_age is not None else None
+        self.seq = seq
+        self.merged = 0
+
+    def expired(self, now=None):
+        return self.deadline is not None and (now if now is not None else time.monotonic()) > self.deadline
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class Pyttsx3Backend:
+    """Drives one pyttsx3 engine with an external loop so speech can be cut off mid-sentence."""
+
+    def __init__(self, rate=None):
+        self.rate = rate
+        self.engine = None
+        self._busy = False
+
+    def open(self):
+        import pyttsx3
+        self.engine = pyttsx3.init()
+        if self.rate:
+            self.engine.setProperty('rate', self.rate)
+        self.engine.connect('finished-utterance', self._on_finished)
+        self.engine.startLoop(False)
+
+    def _on_finished(self, name, completed):
+        self._busy = False
+
+    def say(self, text):
+        self._busy = True
+        self.engine.say(text)
+
+    def busy(self):
+        return self._busy
+
+    def pump(self):
+        self.engine.iterate()
+
+    def stop(self):
+        self.engine.stop()
+        self._busy = False
+
+    def close(self):
+        if self.engine is not None:
+            self.engine.endLoop()
+
+
+class SpeechEngine:
+    """
+    Long-lived speech worker fed by a priority queue.
+
+    `say()` never blocks: it queues the message and returns. The worker thread
+    speaks the most urgent message first, merges duplicates that are still
+    waiting, drops messages that passed their deadline, and interrupts the
+    current sentence when a more urgent one (at or above `interrupt_priority`)
+    arrives.
+
+    Args:
+        backend (object, optional): Speech backend with `open`, `say`, `busy`, `pump`,
+                                    `stop` and `close`. Defaults to pyttsx3.
+        interrupt_priority (int): Messages at this priority or more urgent may cut off
+                                  a less urgent sentence.
+        max_pending (int): Queue bound; the least urgent message is dropped beyond it.
+    """
+
+    def __init__(self, backend=None, interrupt_priority=PRIORITY_WARNING, max_pending=16):
+        self.backend = backend or Pyttsx3Backend()
+        self.interrupt_priority = interrupt_priority
+        self.max_pending = max_pending
+
+        self.spoken = 0
+        self.merged = 0
+        self.expired = 0
+        self.interrupted = 0
+        self.overflowed = 0
+
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._current = None
+        self._interrupt = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._worker, name="speech-engine", daemon=True)
+        self._thread.start()
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    def say(self, text, priority=PRIORITY_INFO, max_age=DEFAULT_MAX_AGE):
+        """
+        Queue `text` to be spoken.
+
+        Returns:
+            bool: True if a new message was queued, False if it was merged into an
+                  identical waiting message, was itself the least urgent message dropped
+                  from a full queue, or the engine is stopped.
+        """
+        with self._cond:
+            if self._stopped:
+                return False
+
+            existing = self._pending.get(text)
+            if existing is not None:
+                # Keep one copy, with the most urgent priority and the freshest deadline
+                existing.merged += 1
+                self.merged += 1
+                if max_age is not None:
+                    existing.deadline = max(existing.deadline or 0, time.monotonic() + max_age)
+                if priority < existing.priority:
+                    existing.priority = priority
+                    heapq.heapify(self._heap)
+                self._check_interrupt(existing)
+                return False
+
+            message = SpeechMessage(text, priority, max_age, next(self._seq))
+            heapq.heappush(self._heap, message)
+            self._pending[text] = message
+            if len(self._pending) > self.max_pending and self._drop_least_urgent() is message:
+                return False
+            self._check_interrupt(message)
+            self._cond.notify()
+            metrics.count("announcements")
+            return True
+
+    def clear(self, below_priority=None):
+        """Drop waiting messages, optionally only those less urgent than `below_priority`."""
+        with self._cond:
+            keep = [m for m in self._heap if below_priority is not None and m.priority <= below_priority]
+            self._heap = keep
+            heapq.heapify(self._heap)
+            self._pending = {m.text: m for m in keep}
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._interrupt = True
+            self._cond.notify()
+        self._thread.join(timeout=2.0)
+
+    def _check_interrupt(self, message):
+        current = self._current
+        if current is not None and message.priority <= self.interrupt_priority and message.priority < current.priority:
+            self._interrupt = True
+
+    def _drop_least_urgent(self):
+        victim = max(self._heap)
+        self._heap.remove(victim)
+        heapq.heapify(self._heap)
+        del self._pending[victim.text]
+        self.overflowed += 1
+        return victim
+
+    def _next_message(self, timeout):
+        with self._cond:
+            if not self._heap and not self._stopped:
+                self._cond.wait(timeout)
+            now = time.monotonic()
+            while self._heap:
+                message = heapq.heappop(self._heap)
+                del self._pending[message.text]
+                if message.expired(now):
+                    self.expired += 1
+                    continue
+                self._current = message
+                self._interrupt = False
+                return message
+            return None
+
+    def _worker(self):
+        try:
+            self.backend.open()
+        except Exception as e:
+            print(f"Error starting speech engine: {str(e)}")
+            with self._cond:
+                self._stopped = True  # say() reports that nothing will be spoken
+                self._heap = []
+                self._pending = {}
+            return
+
+        while not self._stopped:
+            if self._current is None:
+                message = self._next_message(timeout=0.1)
+                if message is None:
+                    continue
+                try:
+                    self.backend.say(message.text)
+                    started = time.perf_counter()
+                except Exception as e:
+                    print(f"Error in speech engine: {str(e)}")
+                    self._current = None
+                    continue
+
+            try:
+                if self._interrupt:
+                    self.backend.stop()
+                    self.interrupted += 1
+                    with self._cond:
+                        self._current = None
+                        self._interrupt = False
+                    continue
+
+                self.backend.pump()
+                done = not self.backend.busy()
+            except Exception as e:
+                # Give up on this sentence, not on the worker
+                print(f"Error in speech engine: {str(e)}")
+                self._abandon_current()
+                continue
+            if done:
+                self.spoken += 1
+                metrics.observe("speech", time.perf_counter() - started)
+                with self._cond:
+                    self._current = None
+            else:
+                time.sleep(0.01)
+
+        try:
+            if self._current is not None:
+                self.backend.stop()
+            self.backend.close()
+        except Exception as e:
+            print(f"Error closing speech engine: {str(e)}")
+
+    def _abandon_current(self):
+        try:
+            self.backend.stop()
+        except Exception:
+            pass
+        with self._cond:
+            self._current = None
+            self._interrupt = False
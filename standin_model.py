@@ -0,0 +1,91 @@
+import time
+import numpy as np
+
+# COCO class names in YOLOv5 order
+COCO_NAMES = [
+    'person', 'bicycle', 'car', 'motorcycle', 'airplane', 'bus', 'train', 'truck', 'boat',
+    'traffic light', 'fire hydrant', 'stop sign', 'parking meter', 'bench', 'bird', 'cat',
+    'dog', 'horse', 'sheep', 'cow', 'elephant', 'bear', 'zebra', 'giraffe', 'backpack',
+    'umbrella', 'handbag', 'tie', 'suitcase', 'frisbee', 'skis', 'snowboard', 'sports ball',
+    'kite', 'baseball bat', 'baseball glove', 'skateboard', 'surfboard', 'tennis racket',
+    'bottle', 'wine glass', 'cup', 'fork', 'knife', 'spoon', 'bowl', 'banana', 'apple',
+    'sandwich', 'orange', 'broccoli', 'carrot', 'hot dog', 'pizza', 'donut', 'cake', 'chair',
+    'couch', 'potted plant', 'bed', 'dining table', 'toilet', 'tv', 'laptop', 'mouse',
+    'remote', 'keyboard', 'cell phone', 'microwave', 'oven', 'toaster', 'sink',
+    'refrigerator', 'book', 'clock', 'vase', 'scissors', 'teddy bear', 'hair drier',
+    'toothbrush',
+]
+
+
+class StandInResults:
+    """Mimics the `xyxy` part of a YOLOv5 `Detections` object."""
+
+    def __init__(self, xyxy, names):
+        self.xyxy = xyxy
+        self.names = names
+
+
+class StandInModel:
+    """
+    Deterministic, offline replacement for the YOLOv5 hub model.
+
+    Calling it with one image or a list of images returns a result with one
+    `(N, 6)` array of `x1, y1, x2, y2, conf, cls` rows per image, like
+    `model(frame).xyxy`. Detections are derived from the image content (grid
+    cells whose brightness stands out from the frame mean), so the same frame
+    always gives the same boxes.
+
+    The forward pass cost is simulated as `call_overhead + per_image_cost * n`
+    seconds, which is the shape that makes batching worthwhile on real models.
+    By default the cost is a sleep; with `busy=True` it is spent computing
+    while holding the GIL, like an eager PyTorch forward pass in one process.
+
+    Args:
+        call_overhead (float): Fixed seconds spent per forward pass.
+        per_image_cost (float): Extra seconds spent per image in the batch.
+        grid (int): Grid cells per side used to derive detections.
+        threshold (float): Minimum brightness deviation for a cell to count as an object.
+        busy (bool): Burn CPU for the simulated cost instead of sleeping.
+    """
+
+    def __init__(self, call_overhead=0.02, per_image_cost=0.004, grid=4, threshold=25.0, busy=False):
+        self.call_overhead = call_overhead
+        self.per_image_cost = per_image_cost
+        self.grid = grid
+        self.threshold = threshold
+        self.busy = busy
+        self.names = list(COCO_NAMES)
+        self.calls = 0
+
+    def __call__(self, imgs, size=None):
+        batch = imgs if isinstance(imgs, (list, tuple)) else [imgs]
+        self.calls += 1
+        cost = self.call_overhead + self.per_image_cost * len(batch)
+        if cost > 0 and self.busy:
+            # Count CPU time, not wall time, so concurrent workers cannot overlap their cost
+            deadline = time.thread_time() + cost
+            while time.thread_time() < deadline:
+                pass
+        elif cost > 0:
+            time.sleep(cost)
+        return StandInResults([self._detect(np.asarray(img)) for img in batch], self.names)
+
+    def _detect(self, img):
+        height, width = img.shape[:2]
+        gray = img.mean(axis=2) if img.ndim == 3 else img.astype(np.float32)
+        g = self.grid
+        ch, cw = height // g, width // g
+        if ch == 0 or cw == 0:
+            return np.zeros((0, 6), dtype=np.float32)
+
+        cells = gray[:ch * g, :cw * g].reshape(g, ch, g, cw).mean(axis=(1, 3))
+        deviation = np.abs(cells - gray.mean())
+        rows, cols = np.nonzero(deviation > self.threshold)
+        if len(rows) == 0:
+            return np.zeros((0, 6), dtype=np.float32)
+
+        x1 = cols * cw
+        y1 = rows * ch
+        conf = np.clip(deviation[rows, cols] / 128.0, 0.0, 1.0)
+        cls = (rows * g + cols) % len(self.names)
+        return np.stack([x1, y1, x1 + cw, y1 + ch, conf, cls], axis=1).astype(np.float32)
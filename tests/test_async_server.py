@@ -0,0 +1,101 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import app as nav
+import async_server
+from pipeline import DetectionBoard, FramePacket
+
+
+def run_client(check):
+    """Run `check(client)` against a test client of the aiohttp app."""
+    from aiohttp.test_utils import TestClient, TestServer
+
+    async def main():
+        client = TestClient(TestServer(async_server.create_app()))
+        await client.start_server()
+        try:
+            await asyncio.wait_for(check(client), timeout=10.0)
+        finally:
+            await client.close()
+
+    asyncio.run(main())
+
+
+@pytest.fixture
+def board(monkeypatch):
+    board = DetectionBoard()
+    monkeypatch.setattr(nav, "detection_board", board)
+    monkeypatch.setattr(nav, "camera_running", True)
+    monkeypatch.setattr(nav, "speak", lambda text: None)
+    return board
+
+
+def publish(board, labels):
+    board.publish(FramePacket(1, np.zeros((4, 4, 3), dtype=np.uint8)),
+                  [{"label": label, "confidence": 0.9, "box": [0, 0, 1, 1]} for label in labels])
+
+
+async def receive(ws, kind):
+    while True:
+        message = await ws.receive_json()
+        if message["type"] == kind:
+            return message
+
+
+def test_parse_max_age():
+    assert async_server.parse_max_age(None) is None
+    assert async_server.parse_max_age("0.5") == 0.5
+    assert async_server.parse_max_age(2) == 2.0
+    for value in ("soon", [1], -1, "nan"):
+        with pytest.raises(ValueError):
+            async_server.parse_max_age(value)
+
+
+def test_http_identify_rejects_a_bad_max_age(board):
+    publish(board, ["chair"])
+
+    async def check(client):
+        response = await client.get("/identify_object?max_age=soon")
+        assert response.status == 400
+        assert "max_age" in (await response.json())["error"]
+        response = await client.get("/identify_object?max_age=5")
+        assert (await response.json())["objects"] == ["chair"]
+
+    run_client(check)
+
+
+def test_websocket_dispatches_commands_and_survives_bad_input(board):
+    publish(board, ["person"])
+
+    async def check(client):
+        ws = await client.ws_connect("/ws")
+        await ws.send_json({"cmd": "identify", "max_age": "soon"})
+        error = await receive(ws, "error")
+        assert error["cmd"] == "identify"
+
+        await ws.send_json({"cmd": "identify", "max_age": 5})
+        assert (await receive(ws, "identify"))["objects"] == ["person"]
+
+        await ws.send_json({"cmd": "nope"})
+        assert (await receive(ws, "error"))["error"] == "Unknown command."
+
+        await ws.send_json({"cmd": "status"})
+        assert (await receive(ws, "status"))["camera_running"] is True
+        await ws.close()
+
+    run_client(check)
+
+
+def test_websocket_pushes_each_detection_snapshot(board):
+    async def check(client):
+        ws = await client.ws_connect("/ws")
+        await receive(ws, "status")  # Telemetry is running
+        publish(board, ["dog"])
+        detection = await receive(ws, "detection")
+        assert [obj["label"] for obj in detection["objects"]] == ["dog"]
+        assert detection["version"] == 1 and "captured_at" not in detection
+        await ws.close()
+
+    run_client(check)
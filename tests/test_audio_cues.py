@@ -0,0 +1,107 @@
+import math
+import threading
+import time
+
+from audio_cues import AudioCueEngine, CueBank, SilentOutput
+from speech_engine import PRIORITY_INFO, PRIORITY_STATUS, PRIORITY_WARNING
+
+BANK = CueBank()
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class HeldOutput(SilentOutput):
+    """Silent output whose cues keep playing until `release()`."""
+
+    def open(self, sample_rate):
+        super().open(sample_rate)
+        self.held = threading.Event()
+        self.held.set()
+        self.stopped = 0
+
+    def busy(self):
+        return self.held.is_set()
+
+    def stop(self):
+        self.stopped += 1
+
+    def release(self):
+        self.held.clear()
+
+
+def started_engine(**kwargs):
+    output = HeldOutput()
+    engine = AudioCueEngine(bank=BANK, output=output, **kwargs)
+    assert engine.wait_ready(timeout=2.0)
+    return engine, output
+
+
+def test_band_lookup():
+    assert BANK.band(0.5) == 0
+    assert BANK.band(1.5) == 1
+    assert BANK.band(3.0) == 2
+    assert BANK.band(10.0) == 3
+    assert BANK.band(math.inf) == 3
+    assert BANK.band(math.nan) == 3
+
+
+def test_closest_skips_distances_that_are_not_finite():
+    engine, output = started_engine()
+    try:
+        assert not engine.cue_closest([math.inf, math.nan], [0.0, 0.0])
+        assert engine.cue_closest([math.inf, 3.0, math.nan], [0.0, -20.0, 0.0])
+        assert wait_until(lambda: output.played)
+        assert output.played[0] == ("obstacle", 2, BANK.pan_step(-20.0))
+    finally:
+        engine.stop()
+
+
+def test_waiting_cue_for_the_same_band_is_replaced():
+    engine, output = started_engine()
+    try:
+        engine.play("alert")
+        assert wait_until(lambda: output.played == ["alert"])
+        engine.cue(3.0, bearing=-30.0, priority=PRIORITY_INFO)
+        engine.cue(3.5, bearing=30.0, priority=PRIORITY_INFO)
+        assert engine.merged == 1 and engine.pending == 1
+        output.release()
+        assert wait_until(lambda: len(output.played) == 2)
+        assert output.played[1] == ("obstacle", 2, BANK.pan_step(30.0))
+    finally:
+        engine.stop()
+
+
+def test_urgent_cue_interrupts_a_less_urgent_one():
+    engine, output = started_engine()
+    try:
+        engine.play("alert", priority=PRIORITY_STATUS)
+        assert wait_until(lambda: output.played == ["alert"])
+        engine.cue(0.5)  # Closest band: PRIORITY_WARNING
+        assert wait_until(lambda: len(output.played) == 2)
+        assert engine.interrupted == 1 and output.stopped == 1
+        assert output.played[1][1] == 0
+
+        engine.play("error", priority=PRIORITY_INFO)  # Not urgent enough to cut the warning off
+        time.sleep(0.05)
+        assert engine.interrupted == 1
+    finally:
+        engine.stop()
+
+
+def test_stale_cue_is_dropped():
+    engine, output = started_engine()
+    try:
+        engine.play("alert", priority=PRIORITY_WARNING)
+        assert wait_until(lambda: output.played == ["alert"])
+        engine.play("error", priority=PRIORITY_STATUS, max_age=0.01)
+        time.sleep(0.05)
+        output.release()
+        assert wait_until(lambda: engine.expired == 1)
+        assert output.played == ["alert"]
+    finally:
+        engine.stop()
@@ -0,0 +1,62 @@
+import numpy as np
+
+from detections import CORRIDOR, Detections, corridor_roi
+
+NAMES = {0: "person", 1: "bicycle", 2: "car"}
+ROWS = np.array([[10, 10, 30, 50, 0.9, 0],
+                 [100, 100, 300, 200, 0.4, 2],
+                 [280, 40, 360, 440, 0.7, 1]], dtype=np.float32)
+
+
+class Results:
+    xyxy = [ROWS]
+    names = NAMES
+
+
+def test_from_results_reads_names_and_rows():
+    dets = Detections.from_results(Results())
+    assert len(dets) == 3
+    assert dets.labels == ["person", "car", "bicycle"]
+    assert dets.boxes.dtype == np.float32 and dets.class_ids.dtype == np.int32
+
+
+def test_empty_rows():
+    dets = Detections.from_xyxy(np.zeros((0, 6)), NAMES)
+    assert not dets and dets.boxes.shape == (0, 4)
+    assert dets.largest() is dets
+    assert dets.to_tuples() == []
+
+
+def test_filters_chain():
+    dets = Detections.from_xyxy(ROWS, NAMES)
+    assert dets.with_confidence(0.5).labels == ["person", "bicycle"]
+    assert dets.with_classes(["car", 0]).labels == ["person", "car"]
+    assert dets.with_confidence(0.5).with_classes(["bicycle"]).labels == ["bicycle"]
+    assert dets.in_height_band(50, 150).labels == ["car"]
+    assert dets.in_band([5.0, 1.0, 2.5], 1.0, 3.0).labels == ["car", "bicycle"]
+
+
+def test_corridor_overlap():
+    roi = corridor_roi((480, 640), CORRIDOR)
+    assert roi == (256, 48, 384, 432)
+    dets = Detections.from_xyxy(ROWS, NAMES)
+    np.testing.assert_allclose(dets.roi_overlap(roi), [0.0, 0.22, 0.96], atol=1e-6)
+    assert dets.in_roi(roi, min_overlap=0.5).labels == ["bicycle"]
+
+
+def test_largest_and_closest():
+    dets = Detections.from_xyxy(ROWS, NAMES)
+    assert dets.largest().labels == ["bicycle"]
+    assert dets.closest([3.0, 1.0, 2.0]).labels == ["car"]
+    assert dets.closest().labels == ["bicycle"]
+
+
+def test_offset_and_exports():
+    dets = Detections.from_xyxy(ROWS[:1], NAMES).offset(100, 20)
+    np.testing.assert_allclose(dets.boxes, [[110, 30, 130, 70]])
+    assert dets.to_dicts() == [{"label": "person", "confidence": 0.9, "box": [110.0, 30.0, 130.0, 70.0]}]
+    assert dets.to_tuples() == [("person", dets.confidences[0].item(), 120, 50)]
+
+
+def test_unknown_names_fall_back_to_ids():
+    assert Detections.from_xyxy(ROWS).labels == ["0", "2", "1"]
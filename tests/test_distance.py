@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+
+from detections import Detections
+from distance import CameraIntrinsics, DistanceEstimator, GroundPlaneLUT
+
+NAMES = ["person", "chair"]
+FRAME = (480, 640, 3)
+
+
+def person_box(distance, camera, center_x=320.0, center_y=240.0):
+    height = camera.fy * 1.70 / distance
+    width = camera.fx * 0.50 / distance
+    return [center_x - width / 2, center_y - height / 2, center_x + width / 2, center_y + height / 2]
+
+
+def test_pinhole_estimate_of_a_known_box():
+    camera = CameraIntrinsics.from_fov(640, 480, hfov_deg=62.0)
+    assert camera.fx == pytest.approx(320.0 / math.tan(math.radians(31.0)))
+    estimator = DistanceEstimator(camera)
+    boxes = [person_box(2.0, camera), person_box(5.0, camera)]
+    np.testing.assert_allclose(estimator.distances(boxes, [0, 0], NAMES, FRAME), [2.0, 5.0], rtol=1e-4)
+
+
+def test_box_cut_off_by_the_frame_uses_its_width():
+    camera = CameraIntrinsics.from_fov(640, 480)
+    estimator = DistanceEstimator(camera)
+    x1, y1, x2, y2 = person_box(1.0, camera)  # Taller than the frame
+    boxes = [[x1, 0.0, x2, 480.0]]
+    np.testing.assert_allclose(estimator.distances(boxes, [0], NAMES, FRAME), [1.0], rtol=1e-4)
+
+
+def test_bearing_is_negative_on_the_left():
+    camera = CameraIntrinsics.from_fov(640, 480, hfov_deg=62.0)
+    bearings = DistanceEstimator(camera).bearings([[0, 0, 0, 10], [310, 0, 330, 10], [640, 0, 640, 10]], FRAME)
+    np.testing.assert_allclose(bearings, [-31.0, 0.0, 31.0], atol=1e-3)
+
+
+def test_intrinsics_follow_a_resize():
+    camera = CameraIntrinsics(500.0, 510.0, 320.0, 240.0, 640, 480)
+    assert camera.scaled(640, 480) is camera
+    half = camera.scaled(320, 240)
+    assert (half.fx, half.fy, half.cx, half.cy, half.width, half.height) == (250.0, 255.0, 160.0, 120.0, 320, 240)
+
+    # The same scene at half resolution gives the same distance
+    estimator = DistanceEstimator(camera)
+    box = np.array(person_box(3.0, camera))
+    full = estimator.distances([box], [0], NAMES, FRAME)
+    small = estimator.distances([box / 2], [0], NAMES, (240, 320, 3))
+    np.testing.assert_allclose(small, full, rtol=1e-4)
+
+
+def test_ground_plane_lut_below_and_above_the_horizon():
+    camera = CameraIntrinsics.from_fov(640, 480)
+    lut = GroundPlaneLUT.from_mount(camera, camera_height=1.2, pitch_deg=10.0)
+    assert lut.height == 480
+    # The optical axis meets the floor at height / tan(pitch)
+    assert lut.lookup([240], 480)[0] == pytest.approx(1.2 / math.tan(math.radians(10.0)), rel=0.01)
+    below = lut.lookup([300, 400, 479], 480)
+    assert np.all(np.diff(below) < 0)  # Lower rows are nearer
+    horizon_row = camera.cy - camera.fy * math.tan(math.radians(10.0))
+    assert np.isinf(lut.lookup([horizon_row - 5, 0], 480)).all()
+    # The table scales with the frame height
+    assert lut.lookup([120], 240)[0] == lut.lookup([240], 480)[0]
+
+
+def test_lut_from_samples_interpolates_inverse_distance():
+    lut = GroundPlaneLUT.from_samples([300, 400], [4.0, 2.0], 480)
+    assert lut.lookup([300], 480)[0] == pytest.approx(4.0)
+    assert lut.lookup([350], 480)[0] == pytest.approx(1.0 / ((1 / 4.0 + 1 / 2.0) / 2))
+    assert np.isinf(lut.lookup([0], 480)[0])
+
+
+def test_estimator_uses_the_lut_only_for_boxes_on_the_floor():
+    camera = CameraIntrinsics.from_fov(640, 480)
+    lut = GroundPlaneLUT.from_mount(camera, camera_height=1.2, pitch_deg=10.0)
+    estimator = DistanceEstimator(camera, lut=lut)
+    on_floor = [300.0, 200.0, 340.0, 400.0]
+    above_horizon = person_box(5.0, camera, center_y=40.0)  # E.g. a sign hanging high up
+    distances = estimator(Detections([on_floor, above_horizon], [0.9, 0.9], [1, 0], NAMES), FRAME)
+    assert distances[0] == lut.lookup([400.0], 480)[0]
+    assert np.isfinite(distances).all()
+    assert distances[1] == pytest.approx(5.0, rel=1e-4)
@@ -0,0 +1,41 @@
+from frame_governor import FrameGovernor
+
+
+def test_rate_rises_at_once_and_decays_gradually():
+    governor = FrameGovernor(min_fps=2.0, max_fps=15.0, decay=0.5)
+    assert governor.observe([0.5], now=0.0)["fps"] == 15.0
+    decision = governor.observe([], now=1.0)
+    assert 2.0 < decision["fps"] < 15.0
+    assert decision["limited_by"] == "idle"
+
+
+def test_latency_caps_the_rate():
+    governor = FrameGovernor(min_fps=2.0, max_fps=15.0, utilization=1.0)
+    decision = governor.observe([0.5], latency=0.2, now=0.0)
+    assert decision["fps"] == 5.0
+    assert decision["limited_by"] == "latency"
+
+
+def test_repeated_boosts_do_not_fill_the_history():
+    governor = FrameGovernor(min_fps=2.0, max_fps=15.0)
+    governor.observe([], now=0.0)
+    for i in range(100):
+        governor.boost(0.5, now=0.01 * i)
+    assert len(governor.decisions) == 2
+    assert governor.fps > 2.0
+
+
+def test_boost_never_lowers_the_rate():
+    governor = FrameGovernor(min_fps=2.0, max_fps=15.0)
+    governor.observe([0.5], now=0.0)
+    for i in range(50):
+        governor.boost(0.1, now=0.01 * i)
+    assert governor.fps == 15.0
+    assert len(governor.decisions) == 1
+
+
+def test_due_follows_the_rate():
+    governor = FrameGovernor(min_fps=2.0)
+    assert governor.due(now=10.0)
+    assert not governor.due(now=10.2)
+    assert governor.due(now=10.5)
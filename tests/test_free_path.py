@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+import app
+from detections import CORRIDOR, Detections, corridor_roi
+from free_path import FreePathCheck, FreePathGatedDetector
+from pipeline import FramePacket
+
+SHAPE = (480, 640, 3)
+
+
+def floor():
+    return np.full(SHAPE, (90, 110, 130), dtype=np.uint8)
+
+
+def blocked():
+    # A green box across the far half of the corridor
+    frame = floor()
+    _, y1, _, _ = corridor_roi(SHAPE, CORRIDOR)
+    frame[y1 + 50:y1 + 200] = (20, 200, 40)
+    return frame
+
+
+def settle(check, make, frames=5):
+    for _ in range(frames):
+        state = check.check(make())
+    return state
+
+
+def test_plain_floor_is_free():
+    state = settle(FreePathCheck(), floor)
+    assert not state.blocked
+    assert state.clearance == 1.0
+    assert state.box is None
+
+
+def test_obstacle_blocks_the_path():
+    check = FreePathCheck()
+    settle(check, floor)
+    state = settle(check, blocked)
+    assert state.blocked
+    assert 0.0 < state.clearance < 1.0
+    x1, y1, x2, y2 = state.box
+    assert x1 < x2 and y1 < y2
+    assert check.stats()["checks"] == 10 and check.stats()["blocked"] >= 1
+
+
+def test_to_dict_is_json_friendly():
+    data = settle(FreePathCheck(), floor).to_dict()
+    assert data["blocked"] is False
+    assert len(data["occupancy"]) == 8 and len(data["occupancy"][0]) == 4
+
+
+class CountingDetector:
+    def __init__(self, detections):
+        self.detections = detections
+        self.calls = 0
+
+    def __call__(self, frame):
+        self.calls += 1
+        return self.detections
+
+
+def packet(frame, index=0):
+    return FramePacket(index, frame)
+
+
+def test_detector_only_runs_while_blocked():
+    chair = Detections([[250, 90, 390, 250]], [0.9], [56], app.class_names())
+    detector = CountingDetector(chair)
+    gate = FreePathGatedDetector(detector, names=app.class_names())
+    for _ in range(3):
+        assert not len(gate(floor()))
+    assert detector.calls == 0
+    for _ in range(5):
+        result = gate(blocked())
+    assert detector.calls > 0
+    assert result.labels == ["chair"]
+    assert not gate.unnamed_obstacle(result)
+
+
+def test_packet_keeps_the_state_of_its_own_frame():
+    gate = FreePathGatedDetector(CountingDetector(Detections.empty(app.class_names())))
+    for i in range(5):
+        gate.observe(packet(floor(), i))
+    clear = packet(floor(), 5)
+    gate.observe(clear)
+    for i in range(6, 11):
+        gate.observe(packet(blocked(), i))
+    # The capture thread has moved on to a blocked corridor; the queued packet has not
+    assert gate.state.blocked
+    assert not gate.infer_packet(clear)
+    assert clear.path_state.blocked is False
+    assert not gate.unnamed_obstacle(clear.detections, clear.path_state)
+
+
+def test_observed_gate_never_checks_on_the_inference_thread():
+    calls = []
+    check = FreePathCheck()
+    original = check.check
+    check.check = lambda frame: calls.append(frame) or original(frame)
+    gate = FreePathGatedDetector(CountingDetector(Detections.empty(app.class_names())), check=check)
+    gate.observe(packet(floor()))
+    gate(floor())
+    gate.infer_packet(packet(floor(), 1))
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def spoken(monkeypatch):
+    said = []
+    monkeypatch.setattr(app, "speak", said.append)
+    monkeypatch.setattr(app, "beep", lambda *args: None)
+    monkeypatch.setattr(app, "path_gate", FreePathGatedDetector(CountingDetector(Detections.empty(app.class_names()))))
+    monkeypatch.setattr(app, "path_blocked_announced", False)
+    return said
+
+
+def test_unnamed_obstacle_is_announced_once_per_blockage(spoken):
+    frames = [packet(floor(), i) for i in range(5)] + [packet(blocked(), i) for i in range(5, 15)] + \
+             [packet(floor(), i) for i in range(15, 25)] + [packet(blocked(), i) for i in range(25, 35)]
+    for frame_packet in frames:
+        app.path_gate.observe(frame_packet)
+        frame_packet.detections = app.path_gate.infer_packet(frame_packet)
+        app.announce_objects(frame_packet)
+    assert spoken == ["Something is blocking your path."] * 2
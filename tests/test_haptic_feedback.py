@@ -0,0 +1,89 @@
+import sys
+import time
+
+import pytest
+
+from haptic_feedback import (FRAME_SIZE, STOP, HapticDriver, HapticPattern, NullBackend, PtyBackend,
+                             encode_pattern, pack_frame, unpack_frames)
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_far_or_unknown_obstacles_are_silent():
+    assert encode_pattern(None) == STOP
+    assert encode_pattern(float("inf")) == STOP
+    assert encode_pattern(5.0) == STOP
+
+
+def test_closer_obstacles_vibrate_harder_and_faster():
+    near, far = encode_pattern(0.8), encode_pattern(2.5)
+    assert near.left > far.left and near.right > far.right
+    assert near.off_ms < far.off_ms
+    assert encode_pattern(0.5).off_ms == 0
+
+
+def test_bearing_pans_between_motors():
+    left = encode_pattern(1.0, bearing=-31.0)
+    assert left.left > 0 and left.right == 0
+    ahead = encode_pattern(1.0)
+    assert ahead.left == ahead.right
+
+
+def test_frames_round_trip():
+    patterns = [encode_pattern(1.0, -10.0), STOP, HapticPattern(255, 0, 100, 2550, 3)]
+    data = b"".join(pack_frame(pattern) for pattern in patterns)
+    assert len(data) == 3 * FRAME_SIZE
+    decoded, leftover = unpack_frames(data)
+    assert decoded == patterns
+    assert leftover == b""
+
+
+def test_unpack_skips_corrupt_frames_and_keeps_partial_ones():
+    good = pack_frame(encode_pattern(1.0))
+    corrupt = bytearray(good)
+    corrupt[3] ^= 0xFF
+    decoded, leftover = unpack_frames(b"noise" + bytes(corrupt) + good + good[:4])
+    assert decoded == [encode_pattern(1.0)]
+    assert leftover == good[:4]
+
+
+def test_driver_merges_bursts_into_the_newest_pattern():
+    backend = NullBackend()
+    driver = HapticDriver(backend, min_interval=0.2, hold=5.0)
+    try:
+        for distance in (2.5, 2.0, 1.5, 1.0):
+            driver.update(distance)
+        assert wait_until(lambda: backend.sent and backend.sent[-1] == encode_pattern(1.0))
+        assert driver.writes < 4
+    finally:
+        driver.stop()
+    assert backend.sent[-1] == STOP
+
+
+def test_driver_stops_motors_after_hold():
+    backend = NullBackend()
+    driver = HapticDriver(backend, min_interval=0.0, hold=0.1)
+    try:
+        driver.update(1.0)
+        assert wait_until(lambda: encode_pattern(1.0) in backend.sent)
+        assert wait_until(lambda: backend.sent[-1] == STOP)
+    finally:
+        driver.stop()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs a pseudo-terminal")
+def test_driver_writes_frames_to_pty():
+    backend = PtyBackend()
+    driver = HapticDriver(backend, min_interval=0.0, hold=5.0)
+    try:
+        driver.update(0.8, bearing=10.0)
+        received = []
+        # The writer first stops the motors, then sends the obstacle's pattern
+        assert wait_until(lambda: received.extend(backend.read(timeout=0.05)) or encode_pattern(0.8, 10.0) in received)
+    finally:
+        driver.stop()
@@ -0,0 +1,67 @@
+import threading
+
+import numpy as np
+import pytest
+
+from inference_pool import InferencePool
+from standin_model import StandInModel
+
+
+def frame_with_object(seed):
+    frame = np.full((96, 128, 3), 40, dtype=np.uint8)
+    frame[24:48, (seed % 4) * 32:(seed % 4) * 32 + 32] = 250
+    return frame
+
+
+@pytest.fixture
+def pool():
+    with InferencePool(workers=2, max_frame_shape=(96, 128, 3), source="standin",
+                       model_kwargs={"call_overhead": 0.0, "per_image_cost": 0.0}) as pool:
+        assert pool.wait_ready(timeout=60)
+        yield pool
+
+
+def test_results_come_back_in_submission_order(pool):
+    frames = [frame_with_object(i) for i in range(pool.slots)]
+    for frame in frames:
+        pool.submit(frame)
+    model = StandInModel(call_overhead=0.0, per_image_cost=0.0)
+    for i, frame in enumerate(frames):
+        seq, detections = pool.get(timeout=10)
+        assert seq == i
+        np.testing.assert_allclose(detections.boxes, model(frame[:, :, ::-1]).xyxy[0][:, :4])
+
+
+def test_calls_from_many_threads_get_their_own_frames(pool):
+    model = StandInModel(call_overhead=0.0, per_image_cost=0.0)
+    errors = []
+
+    def run(seed):
+        for _ in range(5):
+            rgb = frame_with_object(seed)
+            if not np.array_equal(pool(rgb).xyxy[0], model(rgb).xyxy[0]):
+                errors.append(seed)
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    assert not errors
+    assert pool.in_flight == 0
+
+
+def test_dead_worker_raises_instead_of_blocking(pool):
+    pool._processes[0].kill()
+    pool._processes[0].join(timeout=5)
+    with pytest.raises(RuntimeError, match="inference-0"):
+        for _ in range(pool.slots + 1):
+            pool.submit(frame_with_object(0))
+        pool.get()
+
+
+def test_failed_model_load_raises_from_wait_ready():
+    with InferencePool(workers=1, max_frame_shape=(96, 128, 3), source="standin",
+                       model_kwargs={"no_such_argument": 1}) as pool:
+        with pytest.raises(RuntimeError, match="exited"):
+            pool.wait_ready()
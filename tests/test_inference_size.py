@@ -0,0 +1,20 @@
+import numpy as np
+
+from inference_size import InferenceSizePolicy, RoiDetector
+from standin_model import StandInModel
+
+
+def test_policy_steps_down_when_over_budget():
+    policy = InferenceSizePolicy(budget_ms=100.0, sizes=(320, 640))
+    assert policy.record(640, 0.2) == 320
+    assert policy.record(320, 0.05) == 320
+
+
+def test_fixed_size_model_pins_the_policy():
+    model = StandInModel(call_overhead=0.0, per_image_cost=0.0)
+    model.fixed_size = 416
+    detector = RoiDetector(policy=InferenceSizePolicy(budget_ms=1.0), model=model)
+    for _ in range(3):
+        detector(np.zeros((480, 640, 3), dtype=np.uint8))
+    assert detector.policy.size == 416
+    assert list(detector.policy.latency) == [416]
@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("kivy")
+
+from kivy_display import VideoDisplay  # noqa: E402
+
+
+class FakeImage:
+    """Stands in for a `kivy.uix.image.Image` so no window or GL context is needed."""
+
+    def __init__(self, shown=True):
+        self.shown = shown
+        self.opacity = 1.0
+        self.width = 640
+        self.height = 480
+
+    def get_parent_window(self):
+        return object() if self.shown else None
+
+
+def frame_with_value(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    uploaded = []
+    monkeypatch.setattr(VideoDisplay, "_upload", lambda self, frame: uploaded.append(frame))
+    return uploaded
+
+
+def test_frames_between_refreshes_collapse_into_one_upload(uploads):
+    display = VideoDisplay(FakeImage())
+    frames = [frame_with_value(value) for value in (1, 2, 3)]
+    for frame in frames:
+        display.show(frame)
+    assert display.replaced == 2
+
+    display._update(0)
+    assert uploads == [frames[-1]]  # The newest frame, not a copy
+    assert display.shown == 1
+
+    display._update(0)  # Nothing new since the last refresh
+    assert display.shown == 1
+
+
+def test_hidden_widget_skips_the_upload(uploads):
+    widget = FakeImage(shown=False)
+    display = VideoDisplay(widget)
+    display.show(frame_with_value(1))
+    display._update(0)
+    assert uploads == []
+    assert display.hidden == 1
+
+    widget.shown = True
+    display.show(frame_with_value(2))
+    display._update(0)
+    assert len(uploads) == 1
+
+
+def test_max_fps_defers_the_next_upload(uploads):
+    display = VideoDisplay(FakeImage(), max_fps=1)
+    display.show(frame_with_value(1))
+    display._update(0)
+    display.show(frame_with_value(2))
+    display._update(0)  # Too soon: rescheduled instead of uploaded
+    assert len(uploads) == 1
@@ -0,0 +1,100 @@
+import pytest
+
+import app
+from metrics import DEFAULT_BUCKETS, Histogram, Metrics
+
+
+def exposition(text):
+    """Sample lines of a Prometheus exposition as a {name{labels}: value} dict."""
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_puts_values_in_the_first_bucket_that_holds_them():
+    histogram = Histogram(buckets=(0.01, 0.1))
+    for seconds in (0.005, 0.01, 0.05, 2.0):
+        histogram.observe(seconds)
+    counts, total, count = histogram.snapshot()
+    assert counts == [2, 1, 1]  # Bounds are inclusive (le), the last slot is +Inf
+    assert total == pytest.approx(2.065)
+    assert count == 4
+    assert histogram.last == 2.0
+
+
+def test_buckets_are_exported_cumulatively():
+    registry = Metrics(prefix="test")
+    for seconds in (0.0005, 0.003, 0.003, 0.2, 10.0):
+        registry.observe("inference", seconds)
+    text = registry.render_prometheus()
+    samples = exposition(text)
+
+    assert "# TYPE test_stage_seconds histogram" in text
+    bucket = 'test_stage_seconds_bucket{stage="inference",le="%s"}'
+    assert samples[bucket % 0.001] == 1
+    assert samples[bucket % 0.0025] == 1
+    assert samples[bucket % 0.005] == 3
+    assert samples[bucket % 0.25] == 4
+    assert samples[bucket % 5.0] == 4
+    assert samples[bucket % "+Inf"] == 5
+    assert samples['test_stage_seconds_count{stage="inference"}'] == 5
+    assert samples['test_stage_seconds_sum{stage="inference"}'] == pytest.approx(10.2065)
+
+    bounds = [samples[bucket % bound] for bound in DEFAULT_BUCKETS]
+    assert bounds == sorted(bounds)
+
+
+def test_counters_and_gauges_are_exported():
+    registry = Metrics(prefix="test")
+    registry.count("frames")
+    registry.count("frames", 2)
+    registry.gauge("viewers", lambda: 3)
+    registry.gauge("broken", lambda: 1 / 0)
+    text = registry.render_prometheus()
+    samples = exposition(text)
+
+    assert "# TYPE test_frames_total counter" in text
+    assert samples["test_frames_total"] == 3
+    assert samples["test_viewers"] == 3
+    assert "test_broken" not in samples  # A failing gauge is skipped, not fatal
+    assert samples["test_metrics_enabled"] == 1
+
+
+def test_disabled_metrics_record_nothing():
+    registry = Metrics(enabled=False, prefix="test")
+    with registry.timer("inference"):
+        pass
+    registry.observe("inference", 0.1)
+    registry.count("frames")
+    assert registry.stages == {}
+    assert registry.counters == {}
+    assert exposition(registry.render_prometheus()) == {"test_metrics_enabled": 0}
+
+    assert registry.toggle()
+    with registry.timer("inference"):
+        pass
+    assert registry.stages["inference"].count == 1
+
+
+def test_timer_records_into_the_stage_and_the_sampler():
+    samples = []
+    registry = Metrics(sampler=lambda stage, seconds: samples.append(stage))
+    with registry.timer("display"):
+        pass
+    assert samples == ["display"]
+    assert "display" in registry.summary()
+
+
+def test_metrics_endpoint_serves_the_text_format(monkeypatch):
+    registry = Metrics()
+    registry.observe("inference", 0.02)
+    monkeypatch.setattr(app, "metrics", registry)
+    response = app.app.test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    samples = exposition(response.get_data(as_text=True))
+    assert samples['nav_stage_seconds_bucket{stage="inference",le="0.025"}'] == 1
+    assert samples['nav_stage_seconds_count{stage="inference"}'] == 1
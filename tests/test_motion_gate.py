@@ -0,0 +1,63 @@
+import numpy as np
+
+from motion_gate import MotionGate, MotionGatedDetector
+
+
+def textured_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 255, (24, 32, 3), dtype=np.uint8)
+    return np.repeat(np.repeat(small, 20, axis=0), 20, axis=1)
+
+
+def test_static_scene_is_skipped():
+    gate = MotionGate()
+    frame = textured_frame()
+    assert gate.should_detect(frame, now=0.0)
+    assert not gate.should_detect(frame.copy(), now=0.1)
+    assert not gate.should_detect(frame.copy(), now=0.2)
+    assert gate.stats() == {"checks": 3, "detections": 1, "skipped": 2, "skip_ratio": 2 / 3}
+
+
+def test_changed_region_triggers_detection():
+    gate = MotionGate()
+    frame = textured_frame()
+    gate.should_detect(frame, now=0.0)
+    changed = frame.copy()
+    changed[160:320, 240:400] = 255 - changed[160:320, 240:400]
+    assert gate.should_detect(changed, now=0.1)
+    assert gate.last_changed >= gate.changed_fraction
+
+
+def test_camera_turn_triggers_detection():
+    gate = MotionGate(changed_fraction=1.0)  # Only the global shift can trigger
+    frame = textured_frame()
+    gate.should_detect(frame, now=0.0)
+    assert gate.should_detect(np.roll(frame, 40, axis=1), now=0.1)
+    assert gate.last_shift >= gate.max_shift
+
+
+def test_slow_drift_adds_up_against_the_reference():
+    gate = MotionGate()
+    frame = textured_frame().astype(np.int16)
+    gate.should_detect(frame.astype(np.uint8), now=0.0)
+    results = [gate.should_detect(np.clip(frame + 6 * step, 0, 255).astype(np.uint8), now=0.1 * step)
+               for step in range(1, 6)]
+    assert not results[0] and any(results)
+
+
+def test_old_reference_forces_detection():
+    gate = MotionGate(max_age=2.0)
+    frame = textured_frame()
+    gate.should_detect(frame, now=0.0)
+    assert not gate.should_detect(frame, now=1.0)
+    assert gate.should_detect(frame, now=2.5)
+
+
+def test_gated_detector_reuses_the_last_result():
+    runs = []
+    gated = MotionGatedDetector(lambda frame: runs.append(frame) or len(runs))
+    frame = textured_frame()
+    assert gated(frame) == 1
+    assert gated(frame) == 1
+    assert gated(textured_frame(seed=1)) == 2
+    assert len(runs) == 2
@@ -0,0 +1,107 @@
+import threading
+import time
+
+import numpy as np
+
+from object_detection import MicroBatcher, detect_objects_batch
+
+NAMES = ["person", "chair"]
+
+
+class BatchModel:
+    """Stub model: one box per image whose x1 is the image's pixel value, so results are traceable."""
+
+    names = NAMES
+
+    def __init__(self):
+        self.batch_sizes = []
+        self._lock = threading.Lock()
+
+    def __call__(self, imgs):
+        with self._lock:
+            self.batch_sizes.append(len(imgs))
+
+        class Results:
+            xyxy = [np.array([[float(img[0, 0, 0]), 0, 100, 100, 0.9, 1]], dtype=np.float32) for img in imgs]
+
+        return Results()
+
+
+def frame(marker):
+    return np.full((8, 8, 3), marker, dtype=np.uint8)
+
+
+def marker_of(detections):
+    return int(detections.boxes[0, 0])
+
+
+def test_batch_results_stay_in_frame_order():
+    model = BatchModel()
+    results = detect_objects_batch([frame(i) for i in range(5)], detector=model)
+    assert [marker_of(result) for result in results] == [0, 1, 2, 3, 4]
+    assert results[0].labels == ["chair"]
+    assert model.batch_sizes == [5]
+    assert detect_objects_batch([], detector=model) == []
+
+
+def test_full_batch_is_flushed_without_waiting():
+    model = BatchModel()
+    batcher = MicroBatcher(lambda frames: detect_objects_batch(frames, model), max_batch_size=4, max_wait=10.0)
+    try:
+        start = time.monotonic()
+        futures = [batcher.submit(frame(i)) for i in range(4)]
+        assert [marker_of(f.result(timeout=2.0)) for f in futures] == [0, 1, 2, 3]
+        assert time.monotonic() - start < 2.0
+        assert model.batch_sizes == [4]
+    finally:
+        batcher.close()
+
+
+def test_partial_batch_is_flushed_at_the_deadline():
+    model = BatchModel()
+    batcher = MicroBatcher(lambda frames: detect_objects_batch(frames, model), max_batch_size=8, max_wait=0.05)
+    try:
+        start = time.monotonic()
+        futures = [batcher.submit(frame(i)) for i in range(3)]
+        assert [marker_of(f.result(timeout=2.0)) for f in futures] == [0, 1, 2]
+        assert time.monotonic() - start >= 0.05
+        assert model.batch_sizes == [3]
+        assert batcher.mean_batch_size == 3.0
+    finally:
+        batcher.close()
+
+
+def test_each_caller_gets_its_own_frames_detections():
+    model = BatchModel()
+    batcher = MicroBatcher(lambda frames: detect_objects_batch(frames, model), max_batch_size=4, max_wait=0.02)
+    wrong = []
+
+    def caller(marker):
+        for _ in range(5):
+            if marker_of(batcher.detect(frame(marker), timeout=2.0)) != marker:
+                wrong.append(marker)
+
+    threads = [threading.Thread(target=caller, args=(marker,)) for marker in range(12)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10.0)
+        assert not wrong
+        assert sum(model.batch_sizes) == 60 and max(model.batch_sizes) <= 4
+        assert batcher.batches < 60  # Some forward passes were shared
+    finally:
+        batcher.close()
+
+
+def test_model_error_reaches_every_caller_in_the_batch():
+    def fail(frames):
+        raise RuntimeError("out of memory")
+
+    batcher = MicroBatcher(fail, max_batch_size=2, max_wait=1.0)
+    try:
+        futures = [batcher.submit(frame(i)) for i in range(2)]
+        for future in futures:
+            assert isinstance(future.exception(timeout=2.0), RuntimeError)
+    finally:
+        batcher.close()
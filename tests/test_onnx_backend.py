@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+
+from onnx_backend import OnnxDetector, compare_detections, letterbox, postprocess
+
+CLASSES = 3
+
+
+def raw_row(cx, cy, w, h, objectness, class_id, class_score=1.0):
+    """One row of a raw YOLOv5 output: xywh, objectness, one score per class."""
+    row = np.zeros(5 + CLASSES, dtype=np.float32)
+    row[:5] = cx, cy, w, h, objectness
+    row[5 + class_id] = class_score
+    return row
+
+
+def test_postprocess_decodes_and_filters_by_confidence():
+    prediction = np.stack([raw_row(50, 50, 20, 40, 0.9, 1), raw_row(200, 200, 10, 10, 0.2, 0)])
+    rows = postprocess(prediction)
+    np.testing.assert_allclose(rows, [[40, 30, 60, 70, 0.9, 1]], rtol=1e-6)
+
+
+def test_nms_suppresses_within_a_class_only():
+    prediction = np.stack([raw_row(50, 50, 20, 40, 0.9, 0), raw_row(51, 50, 20, 40, 0.8, 0),
+                           raw_row(50, 51, 20, 40, 0.7, 2)])
+    rows = postprocess(prediction)
+    assert rows[:, 5].tolist() == [0, 2]
+    assert rows[:, 4].tolist() == pytest.approx([0.9, 0.7])
+
+
+def test_letterbox_pads_and_scales():
+    canvas, scale, pad_x, pad_y = letterbox(np.zeros((240, 640, 3), dtype=np.uint8), 320)
+    assert canvas.shape == (320, 320, 3)
+    assert (scale, pad_x, pad_y) == (0.5, 0, 100)
+    assert canvas[0, 0, 0] == 114 and canvas[160, 160, 0] == 0
+
+
+class FakeSession:
+    """Returns a fixed raw output in letterboxed coordinates for every image."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.inputs = []
+
+    def run(self, outputs, feed):
+        tensor = feed["images"]
+        self.inputs.append(tensor.shape)
+        return [np.repeat(self.rows[None], len(tensor), axis=0)]
+
+
+def fake_detector(rows, fixed_size=None):
+    detector = object.__new__(OnnxDetector)
+    detector.session = FakeSession(rows)
+    detector.input_name = "images"
+    detector.fixed_size = fixed_size
+    detector.dynamic_batch = True
+    detector.conf_threshold, detector.iou_threshold = 0.25, 0.45
+    detector.names = ["person", "bicycle", "car"]
+    return detector
+
+
+def test_boxes_are_mapped_back_from_the_letterbox():
+    # A 640x240 image at size 320: scale 0.5, 100 px of padding above and below
+    detector = fake_detector(np.stack([raw_row(160, 160, 100, 50, 0.9, 2)]))
+    results = detector(np.zeros((240, 640, 3), dtype=np.uint8), size=320)
+    assert detector.session.inputs == [(1, 3, 320, 320)]
+    np.testing.assert_allclose(results.xyxy[0][:, :4], [[220, 70, 420, 170]], rtol=1e-6)
+    assert results.names[int(results.xyxy[0][0, 5])] == "car"
+
+
+def test_fixed_size_model_ignores_the_requested_size():
+    detector = fake_detector(np.stack([raw_row(320, 320, 100, 100, 0.9, 0)]), fixed_size=640)
+    results = detector([np.zeros((480, 640, 3), dtype=np.uint8)] * 2, size=320)
+    assert detector.session.inputs == [(2, 3, 640, 640)]
+    assert len(results.xyxy) == 2
+
+
+def test_compare_detections():
+    reference = np.array([[10, 10, 50, 50, 0.9, 0], [100, 100, 150, 150, 0.8, 1]], dtype=np.float32)
+    assert compare_detections(reference, reference.copy()) == []
+
+    shifted = reference.copy()
+    shifted[1, 4] = 0.6
+    assert compare_detections(reference, shifted) == ["class 1 confidence 0.800 vs 0.600"]
+
+    other_class = reference.copy()
+    other_class[1, 5] = 2
+    problems = compare_detections(reference, other_class)
+    assert len(problems) == 2 and problems[0].startswith("missing class 1") and problems[1].startswith("extra class 2")
+
+
+def test_one_candidate_matches_one_reference_only():
+    # Two near-identical reference boxes, but the candidate found only one of them
+    reference = np.array([[10, 10, 50, 50, 0.9, 0], [10, 10, 50, 51, 0.85, 0]], dtype=np.float32)
+    candidate = reference[:1].copy()
+    assert compare_detections(reference, candidate) == ["missing class 0 at [10.0, 10.0, 50.0, 51.0]"]
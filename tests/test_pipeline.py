@@ -0,0 +1,83 @@
+import json
+import threading
+import time
+
+import numpy as np
+
+import app
+from pipeline import DetectionBoard, FramePacket
+
+
+def publish(board, labels, captured_at=None, index=1):
+    packet = FramePacket(index, np.zeros((4, 4, 3), dtype=np.uint8), captured_at)
+    board.publish(packet, [{"label": label, "confidence": 0.9, "box": [0, 0, 1, 1]} for label in labels])
+
+
+def test_each_publish_bumps_the_version():
+    board = DetectionBoard()
+    assert board.latest() is None
+    publish(board, ["chair"])
+    publish(board, ["person"], index=2)
+    snapshot = board.latest()
+    assert board.version == snapshot["version"] == 2
+    assert snapshot["frame_index"] == 2 and snapshot["objects"][0]["label"] == "person"
+    assert snapshot["age"] >= 0.0
+
+
+def test_stale_snapshot_is_rejected():
+    board = DetectionBoard()
+    publish(board, ["chair"], captured_at=time.monotonic() - 2.0)
+    assert board.latest(max_age=1.0) is None
+    assert board.latest(max_age=5.0)["version"] == 1
+    assert board.latest()["age"] >= 2.0
+
+
+def test_wait_times_out_without_a_newer_version():
+    board = DetectionBoard()
+    publish(board, ["chair"])
+    start = time.monotonic()
+    assert board.wait(1, timeout=0.05) is None
+    assert time.monotonic() - start >= 0.05
+    assert board.wait(0, timeout=0.05)["version"] == 1  # Already newer: no waiting
+
+
+def test_wait_wakes_on_publish():
+    board = DetectionBoard()
+    timer = threading.Timer(0.05, publish, args=(board, ["dog"]))
+    timer.start()
+    snapshot = board.wait(0, timeout=2.0)
+    timer.join()
+    assert snapshot["version"] == 1 and snapshot["objects"][0]["label"] == "dog"
+
+
+def test_sse_stream_sends_each_version_and_keeps_alive():
+    board = DetectionBoard()
+    stream = app.generate_detections("sse", keepalive=0.01, board=board)
+    assert next(stream) == ": keep-alive\n\n"
+    publish(board, ["chair"])
+    event = next(stream)
+    header, data = event.split("data: ")
+    assert header == "id: 1\nevent: detection\n"
+    payload = json.loads(data)
+    assert payload["version"] == 1 and "captured_at" not in payload
+    assert next(stream) == ": keep-alive\n\n"  # Nothing new since version 1
+
+
+def test_ndjson_stream():
+    board = DetectionBoard()
+    publish(board, ["chair"])
+    stream = app.generate_detections("ndjson", keepalive=0.01, board=board)
+    assert json.loads(next(stream))["objects"][0]["label"] == "chair"
+    assert next(stream) == "\n"
+
+
+def test_detections_route_streams_server_sent_events(monkeypatch):
+    board = DetectionBoard()
+    publish(board, ["chair"])
+    monkeypatch.setattr(app, "detection_board", board)
+    response = app.app.test_client().get("/detections")
+    assert response.mimetype == "text/event-stream"
+    first = next(response.response)
+    first = first.decode() if isinstance(first, bytes) else first
+    assert first.startswith("id: 1\nevent: detection\n")
+    response.close()
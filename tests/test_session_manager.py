@@ -0,0 +1,99 @@
+import time
+
+import pytest
+
+import app
+import session_manager
+from session_manager import AdmissionError, SessionManager, checked_source
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    # Sessions are admitted and listed, but no capture thread is started
+    monkeypatch.setattr(session_manager.NavigationSession, "start", lambda self: None)
+    return SessionManager()
+
+
+def test_default_session_is_admitted_on_fresh_server(manager, monkeypatch):
+    monkeypatch.setattr(app, "sessions", manager)
+    response = app.app.test_client().get("/sessions/alice/start")
+    assert response.status_code == 200
+    assert response.get_json()["max_fps"] == 5.0
+
+
+def test_session_over_capacity_gets_503(manager, monkeypatch):
+    monkeypatch.setattr(app, "sessions", manager)
+    client = app.app.test_client()
+    assert client.get("/sessions/alice/start").status_code == 200
+    response = client.get("/sessions/bob/start?fps=5")
+    assert response.status_code == 503
+    assert response.get_json()["capacity_fps"] == 8.0
+    assert manager.refused == 1
+
+
+def test_first_session_is_admitted_even_above_initial_capacity(manager):
+    manager.start("alice", max_fps=30.0)
+    with pytest.raises(AdmissionError):
+        manager.start("bob", max_fps=1.0)
+
+
+def test_duplicate_session_id_is_rejected(manager):
+    manager.start("alice")
+    with pytest.raises(KeyError):
+        manager.start("alice")
+
+
+def test_shared_detector_runs_count_against_capacity(manager):
+    detect = lambda frame: time.sleep(0.01)
+    for _ in range(5):
+        manager.run_shared(detect, None)
+    assert manager.shared_fps > 0
+    assert manager.committed_fps == pytest.approx(manager.shared_fps)
+    with pytest.raises(AdmissionError):
+        manager.start("alice", max_fps=manager.capacity_fps)
+
+
+def test_shared_load_expires(manager):
+    manager.shared_timeout = 0.0
+    manager.run_shared(lambda frame: None, None)
+    manager.run_shared(lambda frame: None, None)
+    time.sleep(0.01)
+    assert manager.shared_fps == 0.0
+
+
+def test_budgets_are_divided_by_priority(manager):
+    manager.start("low", max_fps=4.0, priority=2)
+    manager.start("high", max_fps=3.0, priority=0)
+    manager.latency = 0.2  # Capacity drops to 4 fps
+    manager._rebalance()
+    assert manager.get("high").effective_fps == 3.0
+    assert manager.get("low").effective_fps == 1.0
+
+
+def test_local_devices_and_rtsp_sources_are_allowed():
+    assert checked_source("0") == "0"
+    assert checked_source("rtsp://127.0.0.1:8554/cam") == "rtsp://127.0.0.1:8554/cam"
+    assert checked_source("rtsp://localhost/cam") == "rtsp://localhost/cam"
+    for source in ("rtsp://10.0.0.5/cam", "http://127.0.0.1/video", "file:///etc/passwd"):
+        with pytest.raises(ValueError):
+            checked_source(source)
+
+
+def test_files_only_from_the_media_directory(tmp_path):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "walk.mp4").write_bytes(b"")
+    (tmp_path / "secret.mp4").write_bytes(b"")
+    assert checked_source("walk.mp4", str(media)) == str((media / "walk.mp4").resolve())
+    for source in ("../secret.mp4", str(tmp_path / "secret.mp4"), "missing.mp4"):
+        with pytest.raises(ValueError):
+            checked_source(source, str(media))
+    with pytest.raises(ValueError):
+        checked_source(str(media / "walk.mp4"), None)
+
+
+def test_disallowed_source_gets_400(manager, monkeypatch):
+    monkeypatch.setattr(app, "sessions", manager)
+    response = app.app.test_client().get("/sessions/alice/start?source=/etc/passwd")
+    assert response.status_code == 400
+    assert not manager.sessions
@@ -0,0 +1,112 @@
+import os
+
+import numpy as np
+
+from detections import Detections
+from session_recorder import SessionReader, SessionRecorder
+
+NAMES = {0: "person", 1: "chair"}
+
+
+def frame_with_value(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def detections_for(i):
+    boxes = np.array([[10.0 + i, 20.0, 30.0 + i, 40.0], [0.0, 0.0, 8.0, 8.0]])
+    return Detections(boxes, np.array([0.9, 0.5]), np.array([0, 1]), NAMES)
+
+
+def record(directory, count, **kwargs):
+    recorder = SessionRecorder(str(directory), **kwargs)
+    for i in range(count):
+        recorder.record(frame_with_value(10 * i), detections_for(i), i, timestamp=1000.0 + i)
+    recorder.close()
+    return recorder
+
+
+def test_round_trip_through_the_replay_format(tmp_path):
+    recorder = record(tmp_path, 5, scale=1.0, frame_every=2, queue_size=8)
+    assert recorder.records == 5
+    assert recorder.dropped == 0
+
+    reader = SessionReader(str(tmp_path))
+    try:
+        assert len(reader) == 5
+        assert reader.names == ["person", "chair"]
+        assert [reader.frame_index(i) for i in range(5)] == list(range(5))
+        np.testing.assert_array_equal(reader.timestamps, 1000.0 + np.arange(5))
+
+        dets = reader.detections(3)
+        np.testing.assert_allclose(dets.boxes, detections_for(3).boxes)
+        np.testing.assert_allclose(dets.confidences, [0.9, 0.5], rtol=1e-6)
+        np.testing.assert_array_equal(dets.class_ids, [0, 1])
+
+        # Only every second image was stored; JPEG is lossy, so compare loosely
+        assert reader.frame(1) is None
+        frame = reader.frame(2)
+        assert frame.shape == (48, 64, 3)
+        assert abs(int(frame.mean()) - 20) <= 2
+
+        assert reader.seek(1002.5) == 3
+    finally:
+        reader.close()
+
+
+def test_boxes_are_scaled_with_the_stored_frames(tmp_path):
+    record(tmp_path, 1, scale=0.5)
+    reader = SessionReader(str(tmp_path))
+    try:
+        assert reader.scale == 0.5
+        assert reader.frame(0).shape == (24, 32, 3)
+        np.testing.assert_allclose(reader.detections(0).boxes[0], [5.0, 10.0, 15.0, 20.0])
+    finally:
+        reader.close()
+
+
+def test_truncated_chunk_is_ignored(tmp_path):
+    record(tmp_path, 3, scale=1.0)
+    (segment,) = [os.path.join(tmp_path, name) for name in os.listdir(tmp_path)]
+    with open(segment, "r+b") as f:
+        f.truncate(os.path.getsize(segment) - 10)
+
+    reader = SessionReader(segment)
+    try:
+        assert len(reader) == 2
+        assert reader.frame(1) is not None
+    finally:
+        reader.close()
+
+
+def test_rolling_mode_keeps_the_recording_under_its_limit(tmp_path):
+    recorder = SessionRecorder(str(tmp_path), scale=1.0, max_bytes=8 * 1024, queue_size=64)
+    rng = np.random.default_rng(0)
+    for i in range(40):
+        # Noise does not compress, so every record is a few kilobytes
+        recorder.record(rng.integers(0, 255, (48, 64, 3), dtype=np.uint8), detections_for(i), i, 1000.0 + i)
+    recorder.close()
+
+    total = sum(os.path.getsize(os.path.join(tmp_path, name)) for name in os.listdir(tmp_path))
+    assert total <= 8 * 1024 + recorder.segment_bytes * 2
+    reader = SessionReader(str(tmp_path))
+    try:
+        assert 0 < len(reader) < 40
+        assert reader.frame_index(len(reader) - 1) == 39
+    finally:
+        reader.close()
+
+
+def test_replay_as_a_capture(tmp_path):
+    record(tmp_path, 3, scale=1.0)
+    reader = SessionReader(str(tmp_path))
+    try:
+        capture = reader.as_capture()
+        assert capture.isOpened()
+        frames = []
+        ok, frame = capture.read()
+        while ok:
+            frames.append(frame)
+            ok, frame = capture.read()
+        assert len(frames) == 3
+    finally:
+        reader.close()
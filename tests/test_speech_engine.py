@@ -0,0 +1,151 @@
+import threading
+import time
+
+from speech_engine import PRIORITY_INFO, PRIORITY_STATUS, PRIORITY_WARNING, SpeechEngine
+
+
+def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+class FakeBackend:
+    """Records what is said; each sentence lasts until `finish()` unless `instant` is set."""
+
+    def __init__(self, instant=False):
+        self.instant = instant
+        self.said = []
+        self.stops = 0
+        self.fail_pump = 0
+        self._busy = False
+        self._lock = threading.Lock()
+
+    def open(self):
+        pass
+
+    def say(self, text):
+        self.said.append(text)
+        self._busy = not self.instant
+
+    def busy(self):
+        return self._busy
+
+    def pump(self):
+        with self._lock:
+            if self.fail_pump:
+                self.fail_pump -= 1
+                raise RuntimeError("driver error")
+
+    def stop(self):
+        self.stops += 1
+        self._busy = False
+
+    def close(self):
+        pass
+
+    def finish(self):
+        self._busy = False
+
+
+def speaking(engine, backend, text):
+    return wait_until(lambda: backend.said[-1:] == [text] and engine._current is not None)
+
+
+def test_most_urgent_waiting_message_is_spoken_first():
+    backend = FakeBackend()
+    engine = SpeechEngine(backend, interrupt_priority=-1)
+    try:
+        engine.say("first", PRIORITY_STATUS)
+        assert speaking(engine, backend, "first")
+        engine.say("summary", PRIORITY_STATUS)
+        engine.say("chair", PRIORITY_INFO)
+        engine.say("wall", PRIORITY_WARNING)
+        for text in ("first", "wall", "chair"):
+            assert speaking(engine, backend, text)
+            backend.finish()
+        assert wait_until(lambda: backend.said == ["first", "wall", "chair", "summary"])
+        assert backend.stops == 0
+    finally:
+        engine.stop()
+
+
+def test_identical_waiting_messages_merge():
+    backend = FakeBackend()
+    engine = SpeechEngine(backend)
+    try:
+        engine.say("first")
+        assert speaking(engine, backend, "first")
+        assert engine.say("chair", PRIORITY_STATUS)
+        assert not engine.say("chair", PRIORITY_INFO)
+        assert engine.merged == 1 and engine.pending == 1
+        assert engine._pending["chair"].priority == PRIORITY_INFO
+    finally:
+        engine.stop()
+
+
+def test_stale_message_is_dropped():
+    backend = FakeBackend()
+    engine = SpeechEngine(backend)
+    try:
+        engine.say("first")
+        assert speaking(engine, backend, "first")
+        engine.say("old news", max_age=0.01)
+        time.sleep(0.05)
+        backend.finish()
+        assert wait_until(lambda: engine.expired == 1)
+        assert backend.said == ["first"]
+    finally:
+        engine.stop()
+
+
+def test_warning_interrupts_a_less_urgent_sentence():
+    backend = FakeBackend()
+    engine = SpeechEngine(backend)
+    try:
+        engine.say("objects detected", PRIORITY_STATUS)
+        assert speaking(engine, backend, "objects detected")
+        engine.say("stop, wall ahead", PRIORITY_WARNING)
+        assert speaking(engine, backend, "stop, wall ahead")
+        assert engine.interrupted == 1 and backend.stops == 1
+    finally:
+        engine.stop()
+
+
+def test_new_message_dropped_from_a_full_queue_is_reported():
+    backend = FakeBackend()
+    engine = SpeechEngine(backend, max_pending=1)
+    try:
+        engine.say("first")
+        assert speaking(engine, backend, "first")
+        assert engine.say("chair", PRIORITY_INFO)
+        assert not engine.say("summary", PRIORITY_STATUS)  # Least urgent: dropped itself
+        assert engine.say("wall", PRIORITY_WARNING)  # Pushes "chair" out instead
+        assert list(engine._pending) == ["wall"] and engine.overflowed == 2
+    finally:
+        engine.stop()
+
+
+def test_backend_error_does_not_stop_the_worker():
+    backend = FakeBackend(instant=True)
+    backend.fail_pump = 1
+    engine = SpeechEngine(backend)
+    try:
+        engine.say("lost")
+        assert wait_until(lambda: backend.said == ["lost"] and backend.fail_pump == 0)
+        assert engine.say("next")
+        assert wait_until(lambda: engine.spoken == 1)
+        assert backend.said == ["lost", "next"]
+    finally:
+        engine.stop()
+
+
+def test_failed_backend_refuses_messages():
+    class Broken(FakeBackend):
+        def open(self):
+            raise OSError("no audio device")
+
+    engine = SpeechEngine(Broken())
+    assert wait_until(lambda: not engine._thread.is_alive())
+    assert not engine.say("anyone there?")
@@ -0,0 +1,98 @@
+import numpy as np
+
+from detections import Detections
+from tracker import ObjectTracker, TrackingDetector, TrackUpdate, iou_matrix
+
+NAMES = ["person", "chair"]
+
+
+def detections(*boxes, class_id=0):
+    return Detections(np.array(boxes, dtype=np.float32).reshape(-1, 4), [0.9] * len(boxes),
+                      [class_id] * len(boxes), NAMES)
+
+
+def test_iou_matrix():
+    iou = iou_matrix(np.array([[0, 0, 10, 10]], dtype=np.float32),
+                     np.array([[0, 0, 10, 10], [5, 0, 15, 10], [20, 20, 30, 30]], dtype=np.float32))
+    np.testing.assert_allclose(iou, [[1.0, 1 / 3, 0.0]], atol=1e-6)
+    assert iou_matrix(np.zeros((0, 4)), np.zeros((2, 4))).shape == (0, 2)
+
+
+def test_track_keeps_its_id_and_appears_once_confirmed():
+    tracker = ObjectTracker(min_hits=2)
+    assert not tracker.update(detections([100, 100, 150, 200]))
+    update = tracker.update(detections([104, 100, 154, 200]))
+    assert [t.label for t in update.appeared] == ["person"]
+    track_id = update.appeared[0].id
+    tracker.update(detections([108, 100, 158, 200]))
+    assert [t.id for t in tracker.confirmed()] == [track_id]
+
+
+def test_other_class_is_not_matched():
+    tracker = ObjectTracker(min_hits=1)
+    tracker.update(detections([100, 100, 150, 200]))
+    update = tracker.update(detections([100, 100, 150, 200], class_id=1))
+    assert [t.label for t in update.appeared] == ["chair"]
+    assert len(tracker.tracks) == 2
+
+
+def test_growing_box_is_reported_closer():
+    tracker = ObjectTracker(min_hits=1, closer_ratio=1.3)
+    tracker.update(detections([100, 100, 150, 200]))
+    assert not tracker.update(detections([98, 98, 152, 204]))
+    update = tracker.update(detections([90, 90, 160, 220]))
+    assert [t.label for t in update.closer] == ["person"]
+
+
+def test_track_disappears_after_max_misses():
+    tracker = ObjectTracker(min_hits=1, max_misses=2)
+    tracker.update(detections([100, 100, 150, 200]))
+    empty = detections()
+    assert not tracker.update(empty)
+    assert not tracker.update(empty)
+    update = tracker.update(empty)
+    assert [t.label for t in update.disappeared] == ["person"]
+    assert not tracker.tracks
+
+
+def test_predict_extrapolates_by_velocity():
+    tracker = ObjectTracker(min_hits=1)
+    tracker.update(detections([100, 100, 150, 200]))
+    tracker.update(detections([110, 100, 160, 200]))
+    np.testing.assert_allclose(tracker.predict().boxes, [[120, 100, 170, 200]])
+
+
+def test_merge_drops_tracks_that_disappeared_since():
+    tracker = ObjectTracker(min_hits=1)
+    first = tracker.update(detections([100, 100, 150, 200]))
+    track = first.appeared[0]
+    merged = TrackUpdate(appeared=[track]).merge(TrackUpdate(disappeared=[track]))
+    assert not merged.appeared and merged.disappeared == [track]
+
+
+def test_detector_runs_every_nth_frame_and_events_accumulate():
+    calls = []
+
+    def detect(frame):
+        calls.append(frame)
+        return detections([100, 100, 150, 200])
+
+    tracking = TrackingDetector(detect, detect_every=3, tracker=ObjectTracker(min_hits=2))
+    for frame in range(7):
+        tracking(frame)
+    assert calls == [0, 3, 6]
+    update = tracking.drain()
+    assert [t.label for t in update.appeared] == ["person"]
+    assert not tracking.drain()
+
+
+def test_callable_detect_every_is_asked_each_frame():
+    every = [3]
+    runs = []
+    tracking = TrackingDetector(lambda frame: runs.append(frame) or detections(), detect_every=lambda: every[0])
+    for frame in range(3):
+        tracking(frame)
+    every[0] = 1
+    for frame in range(3, 6):
+        tracking(frame)
+    assert runs == [0, 3, 4, 5]
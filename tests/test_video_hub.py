@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+
+import app
+from video_hub import BOUNDARY, FrameHub
+
+
+def frame_with_value(value):
+    return np.full((48, 64, 3), value, dtype=np.uint8)
+
+
+def jpeg_of(chunk):
+    assert chunk.startswith(BOUNDARY + b"Content-Type: image/jpeg\r\n\r\n")
+    return chunk[len(BOUNDARY) + 28:-2]
+
+
+def test_two_subscribers_share_one_capture_and_one_encode():
+    drawn = []
+    hub = FrameHub(overlay=lambda frame: drawn.append(frame))
+    first, second = hub.stream(idle_timeout=0.05), hub.stream(idle_timeout=0.05)
+
+    for value in (10, 200):
+        captured = frame_with_value(value)
+        hub.publish(captured)
+        a, b = next(first), next(second)
+        assert jpeg_of(a) == jpeg_of(b)
+        assert drawn[-1] is not captured  # The overlay draws on a copy
+
+    assert hub.subscribers == 2
+    assert hub.encodes == 2
+    assert len(drawn) == 2
+
+    first.close()
+    second.close()
+    assert hub.subscribers == 0
+
+
+def test_concurrent_clients_wait_for_the_same_encode():
+    hub = FrameHub()
+    hub.publish(frame_with_value(50))
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(hub.get_jpeg())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert hub.encodes == 1
+    assert len({jpeg for _, jpeg in results}) == 1
+
+
+def test_each_quality_is_encoded_once():
+    hub = FrameHub(default_quality=80)
+    hub.publish(frame_with_value(120))
+    hub.get_jpeg()
+    hub.get_jpeg(80)
+    assert hub.peek_jpeg(30) is None
+    hub.get_jpeg(30)
+    assert hub.encodes == 2
+    assert hub.peek_jpeg(30) is not None
+
+
+def test_slow_client_gets_the_newest_frame():
+    hub = FrameHub()
+    stream = hub.stream(idle_timeout=0.05)
+    for value in (10, 20, 30):
+        hub.publish(frame_with_value(value))
+    next(stream)
+    assert hub.encodes == 1  # Frames 1 and 2 were never encoded
+    assert hub.peek_jpeg()[0] == 3
+    stream.close()
+
+
+def camera_must_stay_closed():
+    raise AssertionError("a video client opened the camera")
+
+
+def test_video_feed_clients_never_open_the_camera(monkeypatch):
+    hub = FrameHub()
+    monkeypatch.setattr(app, "video_hub", hub)
+    monkeypatch.setattr(app, "show_camera", True)
+    monkeypatch.setattr(app, "open_camera", camera_must_stay_closed)
+
+    first, second = app.generate_frames(), app.generate_frames()
+    hub.publish(frame_with_value(90))
+    assert next(first) == next(second)
+    assert hub.encodes == 1
+
+    monkeypatch.setattr(app, "show_camera", False)
+    hub.publish(frame_with_value(91))
+    assert next(first, None) is None  # Hiding the camera ends the stream
+    second.close()
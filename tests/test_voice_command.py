@@ -0,0 +1,103 @@
+import wave
+
+import numpy as np
+import speech_recognition as sr
+
+from voice_command import BackgroundListener, EnergyVAD, SphinxSpotter, WavMicrophone, match_command
+
+
+def test_match_command_matches_whole_words():
+    assert match_command("please start") == "start"
+    assert match_command("Stop!") == "stop"
+    assert match_command("restart") is None
+    assert match_command("it detected a chair") is None
+    assert match_command("") is None
+
+
+def test_match_command_prefers_longest_phrase():
+    assert match_command("what's in front of me") == "what_is_in_front"
+    assert match_command("detect what is in front") == "what_is_in_front"
+
+
+class ListSource:
+    sample_rate = 16000
+    sample_width = 2
+
+
+class TextSpotter:
+    def __init__(self, texts):
+        self.texts = iter(texts)
+
+    def transcribe(self, audio, sample_rate, sample_width=2):
+        return next(self.texts)
+
+
+def test_events_are_bounded_without_callback():
+    listener = BackgroundListener(source=ListSource(), spotter=TextSpotter(["start"] * 20), events_size=3)
+    for _ in range(20):
+        listener._handle(b"")
+    assert len(listener.events) == 3
+    assert listener.events.dropped == 17
+
+
+def test_events_are_not_queued_with_callback():
+    heard = []
+    listener = BackgroundListener(on_command=lambda command, text: heard.append(command),
+                                  source=ListSource(), spotter=TextSpotter(["stop"]))
+    listener._handle(b"")
+    assert heard == ["stop"]
+    assert len(listener.events) == 0
+
+
+def test_sphinx_request_error_keeps_listening(capsys):
+    spotter = SphinxSpotter()
+
+    def fail(*args, **kwargs):
+        raise sr.RequestError("missing PocketSphinx module")
+
+    spotter.recognizer.recognize_sphinx = fail
+    listener = BackgroundListener(source=ListSource(), spotter=spotter)
+    listener._handle(b"\0\0" * 160)
+    listener._handle(b"\0\0" * 160)
+    assert listener.utterances == 2
+    assert capsys.readouterr().out.count("missing PocketSphinx") == 1
+
+
+def write_utterance_wav(path, sample_rate=16000):
+    # Half a second of silence, half a second of a 440 Hz tone, then a second of silence
+    t = np.arange(sample_rate // 2) / sample_rate
+    tone = (8000 * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+    silence = np.zeros(sample_rate // 2, dtype=np.int16)
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(np.concatenate([silence, tone, silence, silence]).tobytes())
+
+
+class RecordingSpotter:
+    def __init__(self, text):
+        self.text = text
+        self.calls = []
+
+    def transcribe(self, audio, sample_rate, sample_width=2):
+        self.calls.append((len(audio), sample_rate, sample_width))
+        return self.text
+
+
+def test_wav_microphone_through_vad_fires_command_once(tmp_path):
+    path = tmp_path / "start.wav"
+    write_utterance_wav(path)
+    heard = []
+    spotter = RecordingSpotter("start")
+    listener = BackgroundListener(on_command=lambda command, text: heard.append((command, text)),
+                                  source=WavMicrophone(str(path), realtime=False), spotter=spotter,
+                                  vad=EnergyVAD()).start()
+    listener.join(timeout=5.0)
+    assert not listener._thread.is_alive()
+    assert heard == [("start", "start")]
+    assert listener.utterances == 1
+    # The utterance covers the tone (0.5 s of 16-bit samples) plus the hangover
+    length, sample_rate, sample_width = spotter.calls[0]
+    assert sample_rate == 16000 and sample_width == 2
+    assert length >= 16000
@@ -0,0 +1,253 @@
+import itertools
+import threading
+
+import numpy as np
+
+from detections import Detections
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between `(N, 4)` and `(M, 4)` xyxy boxes, as an `(N, M)` array."""
+    if len(boxes_a) == 0 or len(boxes_b) == 0:
+        return np.zeros((len(boxes_a), len(boxes_b)), dtype=np.float32)
+    a = boxes_a[:, None, :]
+    b = boxes_b[None, :, :]
+    iw = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    ih = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = iw * ih
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / np.maximum(area_a + area_b - inter, 1e-6)
+
+
+class Track:
+    """One object followed across frames under a stable `id`."""
+
+    def __init__(self, track_id, box, confidence, class_id, label, frame_index):
+        self.id = track_id
+        self.box = np.asarray(box, dtype=np.float32)
+        self.detected_box = self.box.copy()  # Last box seen by the detector, not extrapolated
+        self.confidence = float(confidence)
+        self.class_id = int(class_id)
+        self.label = label
+        self.velocity = np.zeros(4, dtype=np.float32)  # Box change per frame
+        self.first_seen = frame_index
+        self.last_seen = frame_index
+        self.hits = 1
+        self.misses = 0
+        self.announced_area = None  # Box area when this track was last announced
+
+    @property
+    def area(self):
+        return float((self.box[2] - self.box[0]) * (self.box[3] - self.box[1]))
+
+    @property
+    def center(self):
+        return (self.box[:2] + self.box[2:]) / 2.0
+
+    def __repr__(self):
+        return f"Track({self.id}, {self.label})"
+
+
+class TrackUpdate:
+    """What changed in one tracker step, for deciding what to announce."""
+
+    def __init__(self, appeared=None, disappeared=None, closer=None):
+        self.appeared = appeared or []
+        self.disappeared = disappeared or []
+        self.closer = closer or []
+
+    def __bool__(self):
+        return bool(self.appeared or self.disappeared or self.closer)
+
+    def merge(self, other):
+        """Fold a later update into this one; a track that has since disappeared is not announced."""
+        gone = {t.id for t in other.disappeared}
+        self.appeared = [t for t in self.appeared if t.id not in gone]
+        self.closer = [t for t in self.closer if t.id not in gone]
+        known = {t.id for t in self.appeared + self.closer}
+        self.appeared += other.appeared
+        self.closer += [t for t in other.closer if t.id not in known]
+        self.disappeared += other.disappeared
+        return self
+
+
+class ObjectTracker:
+    """
+    Lightweight IoU/centroid tracker that gives detections stable IDs.
+
+    Detections are matched to existing tracks of the same class greedily by
+    IoU, falling back to centroid distance for fast-moving boxes. Between
+    detector runs `predict()` carries every track forward by its velocity, so
+    the detector can skip frames.
+
+    Args:
+        iou_threshold (float): Minimum IoU for a match.
+        centroid_threshold (float): Maximum centroid distance, as a fraction of the track's
+                                    box diagonal, for a match when IoU is too low.
+        max_misses (int): Detector runs a track survives without a matching detection.
+        min_hits (int): Detections needed before a track is reported as appeared.
+        closer_ratio (float): Box area growth since the last announcement that counts as
+                              "getting closer".
+    """
+
+    def __init__(self, iou_threshold=0.3, centroid_threshold=0.5, max_misses=10, min_hits=2, closer_ratio=1.3):
+        self.iou_threshold = iou_threshold
+        self.centroid_threshold = centroid_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.closer_ratio = closer_ratio
+
+        self.tracks = []
+        self.frame_index = 0
+        self.names = {}
+        self._ids = itertools.count(1)
+
+    def _match(self, detections):
+        if not self.tracks or not len(detections):
+            return []
+        track_boxes = np.stack([t.box for t in self.tracks])
+        track_classes = np.array([t.class_id for t in self.tracks])
+
+        iou = iou_matrix(track_boxes, detections.boxes)
+        track_centers = (track_boxes[:, :2] + track_boxes[:, 2:]) / 2.0
+        diag = np.hypot(track_boxes[:, 2] - track_boxes[:, 0], track_boxes[:, 3] - track_boxes[:, 1])
+        dist = np.linalg.norm(track_centers[:, None, :] - detections.centers[None, :, :], axis=2)
+        norm_dist = dist / np.maximum(diag[:, None], 1e-6)
+
+        # IoU matches always beat centroid-only matches
+        score = np.where(iou >= self.iou_threshold, 1.0 + iou,
+                         np.where(norm_dist <= self.centroid_threshold, 1.0 - norm_dist, 0.0))
+        score[track_classes[:, None] != detections.class_ids[None, :]] = 0.0
+
+        matches = []
+        while score.size and score.max() > 0:
+            t, d = np.unravel_index(int(np.argmax(score)), score.shape)
+            matches.append((t, d))
+            score[t, :] = 0.0
+            score[:, d] = 0.0
+        return matches
+
+    def update(self, detections):
+        """
+        Associate a fresh set of detections with the current tracks.
+
+        Returns:
+            TrackUpdate: Tracks that newly appeared, disappeared or got closer.
+        """
+        self.frame_index += 1
+        self.names = detections.names or self.names
+        update = TrackUpdate()
+
+        matches = self._match(detections)
+        matched_tracks = {t for t, _ in matches}
+        matched_dets = {d for _, d in matches}
+
+        for t, d in matches:
+            track = self.tracks[t]
+            box = detections.boxes[d]
+            frames = max(1, self.frame_index - track.last_seen)
+            track.velocity = (box - track.detected_box) / frames
+            track.box = box.copy()
+            track.detected_box = box.copy()
+            track.confidence = float(detections.confidences[d])
+            track.last_seen = self.frame_index
+            track.hits += 1
+            track.misses = 0
+            if track.hits == self.min_hits:
+                track.announced_area = track.area
+                update.appeared.append(track)
+            elif track.announced_area and track.area > track.announced_area * self.closer_ratio:
+                track.announced_area = track.area
+                update.closer.append(track)
+
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+
+        labels = detections.labels
+        for d in range(len(detections)):
+            if d not in matched_dets:
+                track = Track(next(self._ids), detections.boxes[d], detections.confidences[d],
+                              detections.class_ids[d], labels[d], self.frame_index)
+                self.tracks.append(track)
+                if self.min_hits <= 1:
+                    track.announced_area = track.area
+                    update.appeared.append(track)
+
+        self._prune(update)
+        return update
+
+    def predict(self):
+        """Carry all tracks forward one frame without a detector pass."""
+        self.frame_index += 1
+        for track in self.tracks:
+            track.box = track.box + track.velocity
+        return self.as_detections()
+
+    def _prune(self, update):
+        alive = []
+        for track in self.tracks:
+            if track.misses > self.max_misses:
+                if track.hits >= self.min_hits:
+                    update.disappeared.append(track)
+            else:
+                alive.append(track)
+        self.tracks = alive
+
+    def confirmed(self):
+        return [t for t in self.tracks if t.hits >= self.min_hits]
+
+    def as_detections(self):
+        """Confirmed tracks as a `Detections`, in track order."""
+        tracks = self.confirmed()
+        if not tracks:
+            return Detections.empty(self.names)
+        return Detections(np.stack([t.box for t in tracks]), [t.confidence for t in tracks],
+                          [t.class_id for t in tracks], self.names)
+
+
+class TrackingDetector:
+    """
+    Runs `detect(frame)` only every `detect_every` frames and tracks in between.
+
+    Calling it returns the tracked boxes for the frame as `Detections`; on
+    skipped frames they are extrapolated from each track's velocity. Track
+    events accumulate until `drain()` is called, so a feedback stage that
+    skips frames still hears about every object that appeared, disappeared
+    or got closer.
+
+    `detect_every` may also be a callable that is asked before every frame,
+    e.g. to detect on every frame once a frame governor has already slowed
+    the frames down.
+    """
+
+    def __init__(self, detect, detect_every=3, tracker=None):
+        self.detect = detect
+        self.detect_every = detect_every
+        self.tracker = tracker or ObjectTracker()
+        self.frames = 0
+        self.detector_runs = 0
+        self._skipped = None
+        self._pending = TrackUpdate()
+        self._lock = threading.Lock()
+
+    def __call__(self, frame):
+        every = self.detect_every() if callable(self.detect_every) else self.detect_every
+        self.frames += 1
+        if self._skipped is not None and self._skipped + 1 < max(1, every):
+            self._skipped += 1
+            return self.tracker.predict()
+
+        self._skipped = 0
+        self.detector_runs += 1
+        update = self.tracker.update(self.detect(frame))
+        with self._lock:
+            self._pending.merge(update)
+        return self.tracker.as_detections()
+
+    def drain(self):
+        """Return and clear the track events collected since the last call."""
+        with self._lock:
+            update, self._pending = self._pending, TrackUpdate()
+        return update
@@ -0,0 +1,134 @@
+import threading
+import time
+
+from model_registry import LazyModule
+
+cv2 = LazyModule("cv2")
+
+BOUNDARY = b'--frame\r\n'
+
+
+class FrameHub:
+    """
+    Broadcast one camera feed to many MJPEG clients.
+
+    The producer calls `publish(frame)` once per captured frame. The overlay
+    is drawn once per frame (on a copy, so the detector never sees it) and the
+    JPEG is encoded at most once per frame per quality level, no matter how
+    many clients are watching. Clients always get the newest frame: a slow
+    client skips frames rather than building up a backlog.
+
+    Args:
+        overlay (callable, optional): `overlay(frame)` draws on a frame in place.
+        default_quality (int): JPEG quality used when a client does not ask for one.
+    """
+
+    def __init__(self, overlay=None, default_quality=80):
+        self.overlay = overlay
+        self.default_quality = default_quality
+
+        self.seq = 0
+        self.published_at = 0.0
+        self.encodes = 0
+        self.subscribers = 0
+
+        self._frame = None
+        self._overlaid = None
+        self._jpegs = {}
+        self._cond = threading.Condition()
+        self._encode_lock = threading.Lock()
+
+    def publish(self, frame):
+        with self._cond:
+            self._frame = frame
+            self._overlaid = None
+            self._jpegs = {}
+            self.seq += 1
+            self.published_at = time.monotonic()
+            self._cond.notify_all()
+
+    def wait_for(self, after_seq, timeout=None):
+        """Block until a frame newer than `after_seq` is published. Returns the latest seq."""
+        with self._cond:
+            if self.seq <= after_seq:
+                self._cond.wait(timeout)
+            return self.seq
+
+    def peek_jpeg(self, quality=None):
+        """Return `(seq, jpeg_bytes)` if the latest frame is already encoded at `quality`, else None."""
+        quality = quality or self.default_quality
+        with self._cond:
+            jpeg = self._jpegs.get(quality)
+            return (self.seq, jpeg) if jpeg is not None else None
+
+    def get_jpeg(self, quality=None):
+        """Return `(seq, jpeg_bytes)` for the latest frame, encoding it only once per quality."""
+        quality = quality or self.default_quality
+        with self._cond:
+            seq, frame = self.seq, self._frame
+            cached = self._jpegs.get(quality)
+        if frame is None:
+            return seq, None
+        if cached is not None:
+            return seq, cached
+
+        # One encoder at a time, so concurrent clients wait for the same encode instead of repeating it
+        with self._encode_lock:
+            with self._cond:
+                if self.seq != seq:
+                    seq, frame = self.seq, self._frame
+                cached = self._jpegs.get(quality)
+                overlaid = self._overlaid
+            if cached is not None:
+                return seq, cached
+
+            if overlaid is None:
+                overlaid = frame
+                if self.overlay is not None:
+                    overlaid = frame.copy()
+                    self.overlay(overlaid)
+            ok, buffer = cv2.imencode('.jpg', overlaid, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+            if not ok:
+                return seq, None
+            jpeg = buffer.tobytes()
+            self.encodes += 1
+
+            with self._cond:
+                if self.seq == seq:
+                    self._overlaid = overlaid
+                    self._jpegs[quality] = jpeg
+        return seq, jpeg
+
+    def stream(self, quality=None, max_fps=None, active=None, idle_timeout=1.0):
+        """
+        Generate multipart MJPEG chunks for one client.
+
+        Args:
+            quality (int, optional): JPEG quality for this client.
+            max_fps (float, optional): Per-client frame-rate limit.
+            active (callable, optional): The stream ends once this returns False.
+            idle_timeout (float): How often to re-check `active` when no frames arrive.
+        """
+        interval = 1.0 / max_fps if max_fps else 0.0
+        last_seq = 0
+        next_at = 0.0
+        with self._cond:
+            self.subscribers += 1
+        try:
+            while active is None or active():
+                if interval:
+                    delay = next_at - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                if self.wait_for(last_seq, idle_timeout) <= last_seq:
+                    continue
+
+                seq, jpeg = self.get_jpeg(quality)
+                if jpeg is None:
+                    continue
+                last_seq = seq
+                next_at = time.monotonic() + interval
+                yield (BOUNDARY + b'Content-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n')
+        finally:
+            with self._cond:
+                self.subscribers -= 1
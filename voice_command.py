@@ -1,5 +1,27 @@
+import json
+import os
+import re
+import threading
+import time
+import wave
+
+import numpy as np
 import speech_recognition as sr
 
+from pipeline import LatestQueue
+
+# Command names and the phrases that trigger them, longest phrases matched first
+COMMANDS = {
+    "what_is_in_front": ["what is in front of me", "what's in front of me", "what is in front"],
+    "detect": ["detect"],
+    "start": ["start"],
+    "stop": ["stop"],
+}
+
+VOSK_MODEL_PATH = os.environ.get(
+    "VOSK_MODEL", os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "models", "vosk"))
+
+
 def listen_for_command():
     r = sr.Recognizer()
     with sr.Microphone() as source:
@@ -15,3 +37,276 @@ def listen_for_command():
         except sr.RequestError:
             print("Error with the speech recognition service")
             return None
+
+
+def match_command(text, commands=COMMANDS):
+    """
+    Map a transcript to a command name, or None if it contains no known phrase.
+
+    Phrases match whole words only, so "restart" or "detected" trigger nothing.
+    """
+    if not text:
+        return None
+    words = re.findall(r"[a-z']+", text.lower())
+    candidates = [(phrase.split(), name) for name, phrases in commands.items() for phrase in phrases]
+    for tokens, name in sorted(candidates, key=lambda c: -len(" ".join(c[0]))):
+        if any(words[i:i + len(tokens)] == tokens for i in range(len(words) - len(tokens) + 1)):
+            return name
+    return None
+
+
+class MicrophoneSource:
+    """Live microphone through speech_recognition/PyAudio, read in fixed-size chunks."""
+
+    def __init__(self, sample_rate=16000, chunk_size=480):
+        self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.sample_width = 2
+        self._mic = None
+
+    def open(self):
+        self._mic = sr.Microphone(sample_rate=self.sample_rate, chunk_size=self.chunk_size)
+        self._mic.__enter__()
+        self.sample_width = self._mic.SAMPLE_WIDTH
+
+    def read(self):
+        return self._mic.stream.read(self.chunk_size)
+
+    def close(self):
+        if self._mic is not None:
+            self._mic.__exit__(None, None, None)
+            self._mic = None
+
+
+class WavMicrophone:
+    """
+    Stand-in microphone that plays a WAV file as if it were live audio.
+
+    Returns empty bytes once the file is exhausted (the listener then stops).
+    With `realtime=True` chunks are paced at the file's sample rate.
+    """
+
+    def __init__(self, path, chunk_size=480, realtime=True):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.realtime = realtime
+        self.sample_rate = 16000
+        self.sample_width = 2
+        self._wav = None
+        self._next_at = 0.0
+
+    def open(self):
+        self._wav = wave.open(self.path, "rb")
+        if self._wav.getnchannels() != 1:
+            raise ValueError("WavMicrophone needs a mono WAV file")
+        self.sample_rate = self._wav.getframerate()
+        self.sample_width = self._wav.getsampwidth()
+        self._next_at = time.monotonic()
+
+    def read(self):
+        data = self._wav.readframes(self.chunk_size)
+        if self.realtime and data:
+            self._next_at += self.chunk_size / self.sample_rate
+            delay = self._next_at - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._wav = None
+
+
+class EnergyVAD:
+    """
+    Energy-based voice activity detector with an adaptive noise floor.
+
+    Feed it 16-bit PCM chunks; it returns a complete utterance (bytes) when
+    speech that started with `start_chunks` loud chunks is followed by
+    `hangover_chunks` quiet ones, and None otherwise.
+    """
+
+    def __init__(self, ratio=3.0, min_rms=300.0, start_chunks=3, hangover_chunks=20, max_chunks=300):
+        self.ratio = ratio
+        self.min_rms = min_rms
+        self.start_chunks = start_chunks
+        self.hangover_chunks = hangover_chunks
+        self.max_chunks = max_chunks
+
+        self.noise_floor = min_rms / ratio
+        self._chunks = []
+        self._loud = 0
+        self._quiet = 0
+        self._in_speech = False
+
+    def rms(self, chunk):
+        samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32)
+        return float(np.sqrt(np.mean(samples * samples))) if samples.size else 0.0
+
+    def feed(self, chunk):
+        energy = self.rms(chunk)
+        loud = energy > max(self.min_rms, self.noise_floor * self.ratio)
+
+        if not self._in_speech:
+            if loud:
+                self._loud += 1
+                self._chunks.append(chunk)
+                if self._loud >= self.start_chunks:
+                    self._in_speech = True
+                    self._quiet = 0
+            else:
+                # Track background noise only while nobody is talking
+                self.noise_floor = 0.95 * self.noise_floor + 0.05 * energy
+                self._loud = 0
+                self._chunks = self._chunks[-self.start_chunks:] + [chunk]
+            return None
+
+        self._chunks.append(chunk)
+        self._quiet = 0 if loud else self._quiet + 1
+        if self._quiet >= self.hangover_chunks or len(self._chunks) >= self.max_chunks:
+            utterance = b"".join(self._chunks)
+            self.reset()
+            return utterance
+        return None
+
+    def reset(self):
+        self._chunks = []
+        self._loud = 0
+        self._quiet = 0
+        self._in_speech = False
+
+
+class VoskSpotter:
+    """On-device recognizer restricted to the command vocabulary, so it works offline."""
+
+    def __init__(self, model_path=VOSK_MODEL_PATH, commands=COMMANDS):
+        from vosk import Model
+        self.model = Model(model_path)
+        words = sorted({word for phrases in commands.values() for phrase in phrases for word in phrase.split()})
+        self.grammar = json.dumps(words + ["[unk]"])
+
+    def transcribe(self, audio, sample_rate, sample_width=2):
+        from vosk import KaldiRecognizer
+        recognizer = KaldiRecognizer(self.model, sample_rate, self.grammar)
+        recognizer.AcceptWaveform(audio)
+        return json.loads(recognizer.FinalResult()).get("text", "")
+
+
+class SphinxSpotter:
+    """
+    Offline keyword spotting through speech_recognition's PocketSphinx backend.
+
+    If PocketSphinx is missing or fails, the error is printed once and every
+    utterance transcribes as empty, so the listener keeps running.
+    """
+
+    def __init__(self, commands=COMMANDS, sensitivity=0.8):
+        self.keywords = [(phrase, sensitivity) for phrases in commands.values() for phrase in phrases]
+        self.recognizer = sr.Recognizer()
+        self.error = None
+
+    def transcribe(self, audio, sample_rate, sample_width=2):
+        audio_data = sr.AudioData(audio, sample_rate, sample_width)
+        try:
+            return self.recognizer.recognize_sphinx(audio_data, keyword_entries=self.keywords)
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            if self.error is None:
+                print(f"Error in offline speech recognition: {str(e)}")
+            self.error = str(e)
+            return ""
+
+
+def default_spotter():
+    if os.path.isdir(VOSK_MODEL_PATH):
+        try:
+            return VoskSpotter()
+        except ImportError:
+            pass
+    return SphinxSpotter()
+
+
+class BackgroundListener:
+    """
+    Listen for voice commands on a background thread without touching the camera loop.
+
+    Audio is read from `source` in small chunks, segmented by `EnergyVAD`, and
+    each utterance is transcribed by the on-device `spotter`. Recognized
+    commands are posted as `(command, transcript)` events to `on_command`,
+    or, without a callback, to the `events` queue, which keeps only the
+    newest `events_size` of them.
+
+    Args:
+        on_command (callable, optional): `on_command(command, transcript)`, called on the
+                                         listener thread.
+        source (object, optional): Audio source with `open`, `read`, `close`, `sample_rate`
+                                   and `sample_width`. Defaults to the microphone.
+        spotter (object, optional): Recognizer with `transcribe(audio, rate, width)`.
+                                    Defaults to Vosk if a model is installed, else PocketSphinx.
+        vad (EnergyVAD, optional): Voice activity detector.
+        events_size (int): Unread events kept in `events` before the oldest is dropped.
+    """
+
+    def __init__(self, on_command=None, source=None, spotter=None, vad=None, commands=COMMANDS, events_size=8):
+        self.on_command = on_command
+        self.source = source or MicrophoneSource()
+        self.spotter = spotter
+        self.vad = vad or EnergyVAD()
+        self.commands = commands
+        self.events = LatestQueue(events_size)
+
+        self.utterances = 0
+        self.recognized = 0
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="voice-listener", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        try:
+            if self.spotter is None:
+                self.spotter = default_spotter()
+            self.source.open()
+        except Exception as e:
+            print(f"Error starting voice listener: {str(e)}")
+            return
+
+        try:
+            while not self._stop.is_set():
+                chunk = self.source.read()
+                if not chunk:
+                    break
+                utterance = self.vad.feed(chunk)
+                if utterance is not None:
+                    self._handle(utterance)
+        except Exception as e:
+            print(f"Error in voice listener: {str(e)}")
+        finally:
+            self.source.close()
+
+    def _handle(self, utterance):
+        self.utterances += 1
+        text = self.spotter.transcribe(utterance, self.source.sample_rate, self.source.sample_width)
+        command = match_command(text, self.commands)
+        if command is None:
+            return
+        self.recognized += 1
+        print(f"Command: {command} ({text})")
+        if self.on_command is not None:
+            self.on_command(command, text)
+        else:
+            self.events.put((command, text))
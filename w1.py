@@ -1,63 +1,68 @@
 from flask import Flask, render_template, Response
-import cv2
-import torch
-from gtts import gTTS
-import os
-import platform
 import threading
+from pipeline import NavigationPipeline
+from model_registry import LazyModule, warm_up
+from inference_size import RoiDetector, InferenceSizePolicy
+from phrase_cache import play_phrase
+from distance import estimator as distance_estimator
+from audio_cues import get_engine as audio_cues
+
+# Heavy modules are imported on first use so the server can answer right away
+cv2 = LazyModule("cv2")
 
 app = Flask(__name__)
 
 # Global variables
 camera_running = False
 cap = None
+pipeline = None
+
+# Latency budget per inference; the model input size is picked to stay within it
+INFERENCE_BUDGET_MS = 120
 
-# Load YOLOv5 model
-model = torch.hub.load('ultralytics/yolov5', 'yolov5s')
+# The YOLOv5 model is shared between modules and loaded on first use (see model_registry)
 
-# Function to generate a beep sound
-def beep():
-    system_platform = platform.system()
-    if system_platform == "Windows":
-        import winsound
-        winsound.Beep(1000, 500)  # Frequency: 1000Hz, Duration: 500ms
-    else:
-        os.system('echo -e "\a"')  # Linux/Mac
+# Function to play a beep, panned towards the closest object and faster the closer it is
+def beep(detections, frame_shape):
+    distances = distance_estimator(detections, frame_shape)
+    audio_cues().cue_closest(distances, distance_estimator.bearings(detections.boxes, frame_shape))
 
 # Function to speak object names
 def speak(text):
-    tts = gTTS(text=text, lang='en')
-    tts.save("object.mp3")
-    os.system("mpg321 object.mp3")  # Use 'mpg321' or any audio player
+    # Repeated phrases are served from the phrase cache, no synthesis or temp file
+    if not play_phrase(text):
+        print(f"Could not speak: {text}")
+
+# Capture stage: open the shared camera
+def open_camera():
+    global cap
+    cap = cv2.VideoCapture(0)
+    return cap
+
+# Inference stage: perform object detection
+detector = RoiDetector(policy=InferenceSizePolicy(budget_ms=INFERENCE_BUDGET_MS))
+
+# Feedback stage: check for obstacles and speak object names
+def announce_obstacles(packet):
+    detections = packet.detections.with_confidence(0.5)  # Confidence threshold
+    if detections:
+        print(f"Detected: {', '.join(detections.labels)}")
+
+    # Obstacle warning (beep sound)
+    obstacles = detections.with_classes(['person', 'cell phone' , 'chair'])  # Add more objects as needed
+    for label in obstacles.labels:
+        print(f"Beep! {label} detected.")
+    if obstacles:
+        beep(obstacles, packet.frame.shape)  # One cue for the closest; the cue engine never overlaps beeps
 
 # Function to run the navigation system
 def run_navigation():
-    global camera_running, cap
-    cap = cv2.VideoCapture(0)
-    while camera_running:
-        ret, frame = cap.read()
-        if not ret:
-            break
-
-        # Perform object detection
-        results = model(frame)
-        detections = results.xyxy[0].numpy()
-
-        # Check for obstacles and speak object names
-        for detection in detections:
-            x1, y1, x2, y2, conf, cls = detection
-            if conf > 0.5:  # Confidence threshold
-                label = model.names[int(cls)]
-                print(f"Detected: {label}")
-
-                # Obstacle warning (beep sound)
-                if label in ['person', 'cell phone' , 'chair']:  # Add more objects as needed
-                    print(f"Beep! {label} detected.")
-                    beep()  # Call the beep function
-
-    # Release the camera when stopped
-    if cap:
-        cap.release()
+    global camera_running, pipeline
+    pipeline = NavigationPipeline(open_camera, detector, announce_obstacles)
+    pipeline.run()
+
+    camera_running = False
+    print(pipeline.latency_report())
     print("Navigation stopped.")
 
 # Route for the home page
@@ -81,8 +86,12 @@ def stop():
     global camera_running
     if camera_running:
         camera_running = False
+        if pipeline:
+            pipeline.stop()
         return "Navigation stopped!"
     return "Navigation is not running!"
 
 if __name__ == '__main__':
+    # Load the model and run one inference in the background while the server starts
+    warm_up()
     app.run(debug=True)
\ No newline at end of file
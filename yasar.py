@@ -1,29 +1,24 @@
 import threading
 import time
-import cv2
 from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.button import Button
 from kivy.uix.label import Label
 from kivy.uix.image import Image
-from kivy.graphics.texture import Texture
-from kivy.core.audio import SoundLoader
-import pyttsx3  # for text-to-speech
-from object_detection import detect_objects  # This function will use YOLOv5
-from voice_command import listen_for_command  # This will handle voice commands
+from object_detection import detect  # This function will use YOLOv5
 from haptic_feedback import trigger_haptic_feedback  # Handle feedback when obstacles are close
+from metrics import metrics  # Per-stage timings
+from kivy_display import VideoDisplay  # Reused BGR texture, updated on the UI thread
+from distance import estimator as distance_estimator  # Calibrated distances from per-class sizes
+from frame_governor import FrameGovernor, device_hints  # Frame rate from hazard level, load and battery
+from audio_cues import AudioCueEngine  # Preloaded, panned beeps played by one mixer thread
+from model_registry import LazyModule  # Defer heavy imports until first use
+
+cv2 = LazyModule("cv2")
 
 # Initialize the navigation state
 navigation_running = False
 
-# Simple distance estimation for object proximity (using a hypothetical conversion factor to meters)
-def estimate_distance(center_x, center_y, frame_width, frame_height, conversion_factor=0.05):
-    # Using a basic proportional method based on frame center and a conversion factor for meters
-    distance_pixels = ((frame_width / 2 - center_x) ** 2 + (frame_height / 2 - center_y) ** 2) ** 0.5
-    distance_meters = distance_pixels * conversion_factor
-    return distance_meters
-
-
 class NavigationApp(BoxLayout):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -36,6 +31,7 @@ class NavigationApp(BoxLayout):
         # Create video feed section
         self.image_widget = Image(size_hint=(1, 0.7))
         self.add_widget(self.image_widget)
+        self.video = VideoDisplay(self.image_widget)
 
         # Create the bottom section with control buttons
         control_layout = BoxLayout(size_hint=(1, 0.2), orientation='horizontal')
@@ -48,6 +44,12 @@ class NavigationApp(BoxLayout):
 
         self.add_widget(control_layout)
 
+        # Slow down in empty corridors, speed up as soon as something is close or approaching
+        self.governor = FrameGovernor(hints=device_hints)
+
+        # Cue buffers are synthesized once; every beep goes through the engine's single mixer thread
+        self.cues = AudioCueEngine()
+
         # Start voice command listener in a separate thread
         self.voice_thread = threading.Thread(target=self.beep_feedback, daemon=True)
         self.voice_thread.start()
@@ -68,52 +70,45 @@ class NavigationApp(BoxLayout):
     def run_navigation(self):
         cap = cv2.VideoCapture(0)  # Open the camera
         if not cap.isOpened():
-            self.provide_feedback(is_very_close=True)  # Play warning beep if the camera is not accessible
+            self.cues.play("error")  # Play warning beeps if the camera is not accessible
             return
 
         while navigation_running:
-            ret, frame = cap.read()
+            with metrics.timer("capture"):
+                ret, frame = cap.read()
             if not ret:
                 continue
 
-            frame_resized = cv2.resize(frame, (640, 480))
-            objects = detect_objects(frame_resized)
+            with metrics.timer("resize"):
+                frame_resized = cv2.resize(frame, (640, 480))
+            start = time.monotonic()
+            detections = detect(frame_resized).with_confidence(0.5)  # Only consider objects with confidence > 50%
+            latency = time.monotonic() - start
 
-            for obj_name, conf, center_x, center_y in objects:
-                if conf > 0.5:  # Only consider objects with confidence > 50%
-                    distance = estimate_distance(center_x, center_y, frame_resized.shape[1], frame_resized.shape[0])
+            distances = distance_estimator(detections, frame_resized.shape)
+            self.governor.observe(distances, latency)
 
-                    if distance < 1.0:
-                        self.provide_feedback(is_very_close=True)  # Beep 5 times for close obstacles
-                    else:
-                        self.provide_feedback(is_very_close=False)  # Single beep for other objects
+            # Beep for the closest object: panned towards it, faster and higher pitched the closer it is
+            bearings = distance_estimator.bearings(detections.boxes, frame_resized.shape)
+            self.provide_feedback(distances, bearings)
 
             # Display the video feed in the Kivy window
             self.display_video(frame_resized)
 
-            time.sleep(0.1)
+            # Wait for the next frame at the governed rate (returns at once if a hazard raised it)
+            self.governor.wait()
 
     def display_video(self, frame):
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        texture = Texture.create(size=(frame.shape[1], frame.shape[0]), colorfmt='rgb')
-        texture.blit_buffer(frame_rgb.tobytes(), colorfmt='rgb', bufferfmt='ubyte')
-        self.image_widget.texture = texture
-
-    def provide_feedback(self, is_very_close=False):
-        sound = SoundLoader.load('alert_sound.wav')
-        if not sound:
-            print("Error: alert_sound.wav not found.")
-            return
-
-        def beep_feedback():
-            if is_very_close:
-                for _ in range(5):  # Beep 5 times for very close obstacles
-                    sound.play()
-                    time.sleep(0.6)  # 0.6-second interval
-            else:
-                sound.play()  # Single beep for detected objects
-
-        threading.Thread(target=beep_feedback, daemon=True).start()
+        # Runs on the navigation thread; the UI thread uploads the newest frame per refresh
+        self.video.show(frame)
+
+    def provide_feedback(self, distances, bearings):
+        # Never blocks: the cue is queued and replaces any older cue for the same distance band
+        self.cues.cue_closest(distances, bearings)
+        if len(distances):
+            # Vibrate towards the closest object; bursts merge into the newest pattern
+            closest = int(distances.argmin())
+            trigger_haptic_feedback(float(distances[closest]), float(bearings[closest]))
 
 
 class MainApp(App):